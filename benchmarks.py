@@ -0,0 +1,495 @@
+"""
+Benchmark suite for the store's hot paths.
+
+Run ``python benchmarks.py`` to time ordering, listing, counting, every
+promotion, compiled promotion rules, integer against float order pricing,
+bulk catalog import, catalog writes and lookups under writes, and a mixed
+multi-threaded workload. Results are printed as JSON with ops/sec and
+p50/p99 latency per benchmark. Save them with ``--save`` and later pass
+``--baseline`` to fail (exit code 1) when a benchmark's throughput drops by
+more than ``--tolerance``.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from products import (
+    Product, NonStockedProduct, LimitedProduct,
+    PercentDiscount, SecondHalfPrice, ThirdOneFree
+)
+from catalog_import import bulk_import
+from rules import compile_rules
+from store import Store
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+STOCK = 10 ** 12  # Large enough that benchmark orders never run out
+
+
+def build_catalog(size: int, seed: int = 0) -> Store:
+    """
+    Builds a store with a mix of product types and promotions.
+
+    :param size: Number of products
+    :param seed: Seed for the random choices
+    :return: The store
+    """
+    return Store(build_products(size, seed))
+
+
+def build_products(size: int, seed: int = 0, stock: int = STOCK) -> List[Product]:
+    """
+    Builds products of every type with randomly chosen promotions.
+
+    Every tenth product is non-stocked and every tenth a limited product
+    allowing up to 5 per order; the rest are regular products.
+
+    :param size: Number of products
+    :param seed: Seed for prices and promotions
+    :param stock: Initial quantity of every stocked product
+    :return: The products
+    """
+    rng = random.Random(seed)
+    promotions = [None, SecondHalfPrice("Second Half price!"),
+                  ThirdOneFree("Third One Free!"), PercentDiscount("30% off!", 30)]
+    products = []
+    for index in range(size):
+        price = round(rng.uniform(1, 2000), 2)
+        kind = index % 10
+        if kind == 8:
+            product = NonStockedProduct(f"Product {index}", price)
+        elif kind == 9:
+            product = LimitedProduct(f"Product {index}", price, stock, maximum=5)
+        else:
+            product = Product(f"Product {index}", price, stock)
+        product.promotion = rng.choice(promotions)
+        products.append(product)
+    return products
+
+
+def percentile(sorted_latencies: List[int], fraction: float) -> float:
+    """
+    Returns a percentile of sorted latencies in microseconds.
+
+    :param sorted_latencies: Latencies in nanoseconds, sorted ascending
+    :param fraction: The percentile as a fraction, e.g. 0.99
+    :return: The latency in microseconds, or 0 if there are none
+    """
+    if not sorted_latencies:
+        return 0.0
+    index = min(len(sorted_latencies) - 1, int(fraction * len(sorted_latencies)))
+    return sorted_latencies[index] / 1000
+
+
+def summarize(latencies: List[int], elapsed: float) -> dict:
+    """
+    Summarizes a run of timed operations.
+
+    :param latencies: Latency of each operation in nanoseconds
+    :param elapsed: Wall-clock seconds for the whole run
+    :return: Operation count, ops/sec, and p50/p99 latency in microseconds
+    """
+    latencies = sorted(latencies)
+    return {
+        "ops": len(latencies),
+        "ops_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_us": percentile(latencies, 0.50),
+        "p99_us": percentile(latencies, 0.99),
+    }
+
+
+def measure(operation: Callable[[], object], ops: int) -> dict:
+    """
+    Times an operation repeatedly.
+
+    :param operation: The operation to time
+    :param ops: Number of repetitions
+    :return: The summary produced by ``summarize``
+    """
+    clock = time.perf_counter_ns
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(ops):
+        before = clock()
+        operation()
+        latencies.append(clock() - before)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def _random_order(rng: random.Random, products: List[Product], lines: int = 3) -> list:
+    """
+    Picks a random order of distinct products.
+
+    :param rng: The random generator
+    :param products: The products to choose from
+    :param lines: Number of order lines
+    :return: A list of tuples [(Product, quantity)]
+    """
+    return [(product, rng.randint(1, 5)) for product in rng.sample(products, lines)]
+
+
+def bench_store(size: int, ops: int, seed: int) -> Dict[str, dict]:
+    """
+    Times ordering, listing and counting on a catalog of the given size.
+
+    :param size: Number of products
+    :param ops: Number of operations per benchmark
+    :param seed: Seed for the random choices
+    :return: Results keyed by benchmark name
+    """
+    store = build_catalog(size, seed)
+    products = store.products
+    rng = random.Random(seed)
+    orders = [_random_order(rng, products) for _ in range(ops)]
+    order_iter = iter(orders)
+    return {
+        f"store.order[{size}]": measure(lambda: store.order(next(order_iter)), ops),
+        f"store.get_all_products[{size}]": measure(store.get_all_products, max(1, ops // 100)),
+        f"store.get_total_quantity[{size}]": measure(store.get_total_quantity, ops),
+    }
+
+
+def bench_promotions(ops: int) -> Dict[str, dict]:
+    """
+    Times ``apply_promotion`` of every promotion type.
+
+    :param ops: Number of operations per benchmark
+    :return: Results keyed by benchmark name
+    """
+    product = Product("Benchmark product", 1450, STOCK)
+    results = {}
+    for promotion in (PercentDiscount("30% off!", 30), SecondHalfPrice("Second Half price!"),
+                      ThirdOneFree("Third One Free!")):
+        quantities = iter([index % 7 + 1 for index in range(ops)])
+        results[f"promotion.{type(promotion).__name__}"] = measure(
+            lambda: promotion.apply_promotion(product, next(quantities)), ops)
+    return results
+
+
+def _equivalent_rules(products: List[Product]) -> List[dict]:
+    """
+    Describes the promotions of a catalog as rule definitions.
+
+    ``SecondHalfPrice`` has no rule of its own and becomes a 25% discount,
+    which it equals on even quantities.
+
+    :param products: The products
+    :return: One rule per promotion type, naming the products that have it
+    """
+    names: Dict[type, List[str]] = {}
+    for product in products:
+        if product.promotion is not None:
+            names.setdefault(type(product.promotion), []).append(product.name)
+    return [
+        {"type": "percent", "percent": 30, "products": names.get(PercentDiscount, [])},
+        {"type": "percent", "percent": 25, "products": names.get(SecondHalfPrice, [])},
+        {"type": "buy_x_get_y", "buy": 2, "free": 1, "products": names.get(ThirdOneFree, [])},
+    ]
+
+
+def bench_rules(size: int, ops: int, seed: int, lines: int = 100) -> Dict[str, dict]:
+    """
+    Times quoting large orders with per-product promotions and with compiled rules.
+
+    :param size: Number of products
+    :param ops: Number of quotes per benchmark
+    :param seed: Seed for the random choices
+    :param lines: Number of lines per order
+    :return: Results keyed by benchmark name
+    """
+    store = build_catalog(size, seed)
+    products = store.products
+    rng = random.Random(seed)
+    lines = min(lines, size)
+    orders = [_random_order(rng, products, lines) for _ in range(ops)]
+    rules = compile_rules(_equivalent_rules(products))
+    results = {}
+    for name, rule_set in (("promotions", None), ("rules", rules)):
+        store.rules = rule_set
+        order_iter = iter(orders)
+        results[f"order_pricing.{name}[{lines}lines]"] = measure(
+            lambda: store.quote(next(order_iter)), ops)
+    return results
+
+
+def _float_line_price(promotion, price: float, quantity: int) -> float:
+    """
+    Prices a line with the float arithmetic promotions used before prices were integer cents.
+
+    :param promotion: The product's promotion or None
+    :param price: The unit price
+    :param quantity: The quantity
+    :return: The line price
+    """
+    if promotion is None:
+        return price * quantity
+    if type(promotion) is PercentDiscount:
+        return price * quantity * (1 - promotion.percent / 100)
+    if type(promotion) is SecondHalfPrice:
+        return (quantity // 2 + quantity % 2) * price + quantity // 2 * price * 0.5
+    return (quantity - quantity // 3) * price
+
+
+def bench_money(size: int, ops: int, seed: int, lines: int = 1000) -> Dict[str, dict]:
+    """
+    Times pricing large batch orders in integer cents and in the old float arithmetic.
+
+    :param size: Number of products
+    :param ops: Number of orders per benchmark
+    :param seed: Seed for the random choices
+    :param lines: Number of lines per order
+    :return: Results keyed by benchmark name
+    """
+    store = build_catalog(size, seed)
+    rng = random.Random(seed)
+    products = store.products
+    lines = min(lines, size)
+    orders = [_random_order(rng, products, lines) for _ in range(ops)]
+
+    def cents(order):
+        total = 0
+        for product, quantity in order:
+            promotion = product.promotion
+            total += (product.price_cents * quantity if promotion is None
+                      else promotion.apply_promotion_cents(product, quantity))
+        return total
+
+    def floats(order):
+        total = 0.0
+        for product, quantity in order:
+            total += _float_line_price(product.promotion, product.price, quantity)
+        return total
+
+    results = {}
+    for name, price_order in (("cents", cents), ("float", floats)):
+        order_iter = iter(orders)
+        results[f"money.{name}[{lines}lines]"] = measure(lambda: price_order(next(order_iter)), ops)
+    return results
+
+
+def bench_import(size: int, seed: int) -> Dict[str, dict]:
+    """
+    Times repricing a whole catalog and adding a fifth as many new products,
+    one object at a time and as one bulk import.
+
+    :param size: Number of products
+    :param seed: Seed for the random choices
+    :return: Results keyed by benchmark name
+    """
+    new_count = max(1, size // 5)
+    store = build_catalog(size, seed)
+
+    def per_object():
+        for product in store.products:
+            product.price = product.price + 1
+        for index in range(new_count):
+            store.add_product(Product(f"New product {index}", 5.0, 3))
+
+    results = {f"catalog_import.per_object[{size}]": measure(per_object, 1)}
+    store = build_catalog(size, seed)
+    products = store.products
+    columns = {
+        "name": [product.name for product in products]
+                + [f"New product {index}" for index in range(new_count)],
+        "price": [product.price + 1 for product in products] + [5.0] * new_count,
+        "quantity": [None] * len(products) + [3] * new_count,
+    }
+    results[f"catalog_import.bulk[{size}]"] = measure(lambda: bulk_import(store, columns), 1)
+    return results
+
+
+def bench_catalog(size: int, ops: int, threads: int, seed: int) -> Dict[str, dict]:
+    """
+    Times catalog writes, and lookups on several threads while a writer keeps
+    adding and removing products.
+
+    :param size: Number of products
+    :param ops: Number of operations per benchmark and per thread
+    :param threads: Number of reading threads
+    :param seed: Seed for the random choices
+    :return: Results keyed by benchmark name
+    """
+    store = build_catalog(size, seed)
+    extras = iter([Product(f"Extra product {index}", 5.0, 3) for index in range(ops)])
+
+    def add_remove():
+        product = next(extras)
+        store.add_product(product)
+        store.remove_product(product)
+
+    results = {f"catalog.add_remove[{size}]": measure(add_remove, ops)}
+
+    names = [product.name for product in store.products]
+    latencies: List[List[int]] = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+    done = threading.Event()
+
+    def reader(index: int):
+        rng = random.Random(seed + index)
+        lookups = [rng.choice(names) for _ in range(ops)]
+        barrier.wait()
+        clock = time.perf_counter_ns
+        for name in lookups:
+            before = clock()
+            store.get(name)
+            latencies[index].append(clock() - before)
+
+    def writer():
+        churn = Product("Churn product", 5.0, 3)
+        while not done.is_set():
+            store.add_product(churn)
+            store.remove_product(churn)
+
+    readers = [threading.Thread(target=reader, args=(index,)) for index in range(threads)]
+    churner = threading.Thread(target=writer)
+    for thread in readers:
+        thread.start()
+    churner.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in readers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    churner.join()
+    results[f"catalog.lookup[{size}x{threads}threads]"] = summarize(
+        [latency for per_thread in latencies for latency in per_thread], elapsed)
+    return results
+
+
+def bench_mixed(size: int, ops: int, threads: int, seed: int) -> Dict[str, dict]:
+    """
+    Times a mixed workload of orders and reads running on several threads.
+
+    Every fourth operation on each thread is an order; the others alternate
+    between listing and counting.
+
+    :param size: Number of products
+    :param ops: Number of operations per thread
+    :param threads: Number of threads
+    :param seed: Seed for the random choices
+    :return: Results keyed by benchmark name
+    """
+    store = build_catalog(size, seed)
+    products = store.products
+    latencies: List[List[int]] = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index: int):
+        rng = random.Random(seed + index)
+        operations = []
+        for step in range(ops):
+            if step % 4 == 0:
+                order = _random_order(rng, products)
+                operations.append(lambda order=order: store.order(order))
+            elif step % 2:
+                operations.append(store.get_total_quantity)
+            else:
+                operations.append(store.get_all_products)
+        barrier.wait()
+        clock = time.perf_counter_ns
+        for operation in operations:
+            before = clock()
+            operation()
+            latencies[index].append(clock() - before)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {f"mixed[{size}x{threads}threads]": summarize(
+        [latency for per_thread in latencies for latency in per_thread], elapsed)}
+
+
+def run(sizes: List[int], ops: int, threads: int, seed: int = 0) -> dict:
+    """
+    Runs the whole suite.
+
+    :param sizes: Catalog sizes to benchmark
+    :param ops: Number of operations per benchmark
+    :param threads: Number of threads for the mixed workload
+    :param seed: Seed for the random choices
+    :return: Machine-readable results with run metadata
+    """
+    results = {}
+    for size in sizes:
+        results.update(bench_store(size, ops, seed))
+    results.update(bench_promotions(ops))
+    results.update(bench_rules(min(sizes), max(1, ops // 10), seed))
+    results.update(bench_money(min(sizes), max(1, ops // 10), seed))
+    results.update(bench_import(min(sizes), seed))
+    results.update(bench_catalog(min(sizes), ops, threads, seed))
+    results.update(bench_mixed(min(sizes), ops, threads, seed))
+    return {
+        "meta": {"python": platform.python_version(), "sizes": sizes, "ops": ops,
+                 "threads": threads, "seed": seed},
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Lists benchmarks whose throughput regressed against a baseline.
+
+    :param current: Results of this run
+    :param baseline: Results of the saved baseline run
+    :param tolerance: Allowed relative drop in ops/sec, e.g. 0.1 for 10%
+    :return: A description of each regression
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None or not before["ops_per_sec"]:
+            continue
+        change = result["ops_per_sec"] / before["ops_per_sec"] - 1
+        result["change"] = change
+        if change < -tolerance:
+            regressions.append(f"{name}: {before['ops_per_sec']:.0f} -> "
+                               f"{result['ops_per_sec']:.0f} ops/sec ({change:+.1%})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point.
+
+    :param argv: Command-line arguments, defaulting to ``sys.argv[1:]``
+    :return: The process exit code
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the store's hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Catalog sizes to benchmark (e.g. 1000 1000000)")
+    parser.add_argument("--ops", type=int, default=10_000, help="Operations per benchmark")
+    parser.add_argument("--threads", type=int, default=4, help="Threads for the mixed workload")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for reproducible runs")
+    parser.add_argument("--save", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed relative throughput drop before failing")
+    arguments = parser.parse_args(argv)
+
+    current = run(arguments.sizes, arguments.ops, arguments.threads, arguments.seed)
+    regressions = []
+    if arguments.baseline:
+        with open(arguments.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare(current, json.load(baseline_file), arguments.tolerance)
+        current["regressions"] = regressions
+    if arguments.save:
+        with open(arguments.save, "w", encoding="utf-8") as save_file:
+            json.dump(current, save_file, indent=2)
+    json.dump(current, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
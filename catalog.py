@@ -0,0 +1,171 @@
+"""
+Immutable, versioned catalogs.
+
+A store publishes which products it holds, under which names and SKUs and
+in which order, as a ``CatalogVersion``. A version never changes once it is
+built: writers build the next version and swap it in with one attribute
+assignment, so readers take the current version and use it without any
+lock, seeing the catalog entirely before or entirely after every write.
+
+Versions share structure. Names and SKUs are hashed into a fixed number of
+small dicts, and products are kept in chunks of at most ``CHUNK_SIZE``.
+Adding or removing a product copies only the name dict, SKU dict and chunk
+it touches and reuses every other one, so a write costs about
+``n / INDEX_SHARDS + CHUNK_SIZE`` steps rather than ``n``.
+"""
+
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from products import Product
+
+INDEX_SHARDS = 256
+CHUNK_SIZE = 256
+_EMPTY_INDEX = tuple({} for _ in range(INDEX_SHARDS))  # Copied before any write, so shareable
+
+
+class CatalogVersion:
+    """One immutable version of a store's catalog."""
+
+    __slots__ = ("number", "_names", "_skus", "_chunks", "_size")
+
+    def __init__(self, number: int, names: Tuple[Dict[str, Tuple[Product, int]], ...],
+                 skus: Tuple[Dict[str, Product], ...], chunks: Tuple[Tuple[Product, ...], ...],
+                 size: int):
+        """
+        Initializes a version from its parts. Use ``build`` or the ``with_``
+        and ``without_`` methods to create one.
+
+        :param number: The version number, one higher for every write
+        :param names: Dicts of name -> (product, chunk index), one per index shard
+        :param skus: Dicts of SKU -> product, one per index shard
+        :param chunks: The products in catalog order
+        :param size: The number of products
+        """
+        self.number = number
+        self._names = names
+        self._skus = skus
+        self._chunks = chunks
+        self._size = size
+
+    @classmethod
+    def build(cls, products: Iterable[Product], number: int = 0) -> "CatalogVersion":
+        """
+        Builds a version holding the given products.
+
+        :param products: The products, in catalog order, with distinct names and SKUs
+        :param number: The version number
+        :return: The version
+        """
+        return cls(number - 1, _EMPTY_INDEX, _EMPTY_INDEX, (), 0).with_products(products)
+
+    def __len__(self) -> int:
+        """Return the number of products in the catalog."""
+        return self._size
+
+    def __iter__(self) -> Iterator[Product]:
+        """Iterate over the products in catalog order."""
+        return chain.from_iterable(self._chunks)
+
+    def __contains__(self, name: str) -> bool:
+        """
+        Checks whether the catalog has a product with a name.
+
+        :param name: The product name
+        :return: True if there is such a product
+        """
+        return name in self._names[hash(name) % INDEX_SHARDS]
+
+    def get(self, name: str) -> Optional[Product]:
+        """
+        Looks up a product by name.
+
+        :param name: The product name
+        :return: The product or None if there is none with that name
+        """
+        entry = self._names[hash(name) % INDEX_SHARDS].get(name)
+        return entry[0] if entry is not None else None
+
+    def get_by_sku(self, sku: str) -> Optional[Product]:
+        """
+        Looks up a product by SKU.
+
+        :param sku: The product SKU
+        :return: The product or None if there is none with that SKU
+        """
+        return self._skus[hash(sku) % INDEX_SHARDS].get(sku)
+
+    def products(self) -> List[Product]:
+        """
+        Lists the products.
+
+        :return: The products in catalog order
+        """
+        return list(chain.from_iterable(self._chunks))
+
+    def with_products(self, products: Iterable[Product]) -> "CatalogVersion":
+        """
+        Builds the next version with products appended.
+
+        :param products: The new products; their names and SKUs must not be in the catalog yet
+        :return: The new version
+        """
+        names, skus, chunks = list(self._names), list(self._skus), list(self._chunks)
+        copied_names, copied_skus = set(), set()
+        tail = list(chunks.pop()) if chunks and len(chunks[-1]) < CHUNK_SIZE else []
+        size = self._size
+        for product in products:
+            if len(tail) == CHUNK_SIZE:
+                chunks.append(tuple(tail))
+                tail = []
+            name, sku = product.name, product.sku
+            shard = hash(name) % INDEX_SHARDS
+            if shard not in copied_names:
+                names[shard] = dict(names[shard])
+                copied_names.add(shard)
+            names[shard][name] = (product, len(chunks))
+            if sku is not None:
+                shard = hash(sku) % INDEX_SHARDS
+                if shard not in copied_skus:
+                    skus[shard] = dict(skus[shard])
+                    copied_skus.add(shard)
+                skus[shard][sku] = product
+            tail.append(product)
+            size += 1
+        if tail:
+            chunks.append(tuple(tail))
+        return CatalogVersion(self.number + 1, tuple(names), tuple(skus), tuple(chunks), size)
+
+    def without_product(self, product: Product) -> "CatalogVersion":
+        """
+        Builds the next version without a product.
+
+        Chunks left sparse by removals are compacted once there are more
+        than twice as many as the products need.
+
+        :param product: The product to remove
+        :return: The new version
+        :raises ValueError: If the product is not in the catalog
+        """
+        name, sku = product.name, product.sku
+        name_shard = hash(name) % INDEX_SHARDS
+        entry = self._names[name_shard].get(name)
+        if entry is None or entry[0] is not product:
+            raise ValueError(f"Product '{name}' is not in the catalog.")
+        names, chunks = list(self._names), list(self._chunks)
+        names[name_shard] = dict(names[name_shard])
+        del names[name_shard][name]
+        chunk = chunks[entry[1]]
+        position = chunk.index(product)
+        chunks[entry[1]] = chunk[:position] + chunk[position + 1:]
+        skus = self._skus
+        if sku is not None:
+            skus = list(skus)
+            sku_shard = hash(sku) % INDEX_SHARDS
+            skus[sku_shard] = dict(skus[sku_shard])
+            del skus[sku_shard][sku]
+            skus = tuple(skus)
+        size = self._size - 1
+        if len(chunks) > 2 * (size // CHUNK_SIZE + 1):
+            return CatalogVersion.build(chain.from_iterable(chunks), self.number + 1)
+        return CatalogVersion(self.number + 1, tuple(names), skus, tuple(chunks), size)
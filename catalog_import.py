@@ -0,0 +1,306 @@
+"""
+Bulk catalog import.
+
+Imports read rows of ``name, price, quantity, sku, kind, maximum`` from CSV,
+JSON Lines, or columns already in memory (a dict of equally long lists).
+A row naming a product the store has updates its price and/or quantity; any
+other row adds a product of the given kind (``product``, ``non_stocked`` or
+``limited``). Missing or empty values are left unchanged for updates.
+
+The whole batch is validated first with the rules of ``Product.__init__``
+and the price and quantity setters, and rejected as a whole if any row is
+invalid. It is then applied while every product lock is held, so orders see
+the catalog entirely before or entirely after the import. Rows are written
+straight into the store's table, and the price index is rebuilt once rather
+than once per product. Run as ``python catalog_import.py FILE`` to check a
+file without a store.
+"""
+
+import csv
+import json
+import sys
+from typing import Dict, List, Optional, TextIO, Tuple, Union
+
+from money import to_cents
+from products import Product, NonStockedProduct, LimitedProduct, locked_all
+from product_table import NO_MAXIMUM
+from store import Store
+
+COLUMNS = ("name", "price", "quantity", "sku", "kind", "maximum")
+KINDS = {"product": Product, "non_stocked": NonStockedProduct, "limited": LimitedProduct}
+_MAX_REPORTED_ERRORS = 20
+
+
+def _open(source: Union[str, TextIO]) -> TextIO:
+    """
+    Opens a path for reading, or passes an open file through.
+
+    :param source: A path or an open text file
+    :return: The open file
+    """
+    return open(source, encoding="utf-8", newline="") if isinstance(source, str) else source
+
+
+def read_csv(source: Union[str, TextIO]) -> Dict[str, list]:
+    """
+    Reads import rows from CSV with a header line.
+
+    :param source: A path or an open text file
+    :return: The columns; empty cells become None
+    :raises ValueError: If the header names an unknown column or has no name column
+    """
+    csv_file = _open(source)
+    try:
+        reader = csv.reader(csv_file)
+        header = next(reader, [])
+        unknown = set(header) - set(COLUMNS)
+        if unknown or "name" not in header:
+            raise ValueError(f"CSV header must include 'name' and only {COLUMNS}, got {header}.")
+        columns: Dict[str, list] = {column: [] for column in header}
+        lists = [columns[column] for column in header]
+        for record in reader:
+            for values, value in zip(lists, record):
+                values.append(value or None)
+        return columns
+    finally:
+        if csv_file is not source:
+            csv_file.close()
+
+
+def read_jsonl(source: Union[str, TextIO]) -> Dict[str, list]:
+    """
+    Reads import rows from JSON Lines, one object per product.
+
+    :param source: A path or an open text file
+    :return: The columns; missing keys become None
+    :raises ValueError: If a line is not valid JSON
+    """
+    jsonl_file = _open(source)
+    try:
+        records = [json.loads(line) for line in jsonl_file if line.strip()]
+    finally:
+        if jsonl_file is not source:
+            jsonl_file.close()
+    return {column: [record.get(column) for record in records] for column in COLUMNS}
+
+
+def read_file(path: str) -> Dict[str, list]:
+    """
+    Reads import rows from a file, choosing the format by its extension.
+
+    :param path: A ``.csv`` or ``.jsonl`` file
+    :return: The columns
+    :raises ValueError: If the extension is not recognized
+    """
+    if path.endswith(".csv"):
+        return read_csv(path)
+    if path.endswith((".jsonl", ".ndjson")):
+        return read_jsonl(path)
+    raise ValueError(f"Cannot tell the format of '{path}'; use .csv or .jsonl.")
+
+
+def _number(value, convert, field: str, errors: List[str], line: int):
+    """
+    Converts an optional value, recording a conversion failure.
+
+    :param value: The raw value or None
+    :param convert: The number type, e.g. ``int``
+    :param field: The column name, for error messages
+    :param errors: The list errors are added to
+    :param line: The row number, for error messages
+    :return: The converted value, or None if it was missing or invalid
+    """
+    if type(value) is convert:
+        return value
+    if value is None or value == "":
+        return None
+    try:
+        converted = convert(value)
+    except (TypeError, ValueError):
+        errors.append(f"Row {line}: {field} '{value}' is not a number.")
+        return None
+    if convert is int and converted != float(value):
+        errors.append(f"Row {line}: {field} '{value}' is not a whole number.")
+        return None
+    return converted
+
+
+def _cents(value, errors: List[str], line: int) -> Optional[int]:
+    """
+    Converts an optional price to cents, recording a conversion failure.
+
+    :param value: The raw price or None
+    :param errors: The list errors are added to
+    :param line: The row number, for error messages
+    :return: The price in cents, or None if it was missing or invalid
+    """
+    if value is None or value == "":
+        return None
+    try:
+        return to_cents(value)
+    except (ArithmeticError, TypeError, ValueError):
+        errors.append(f"Row {line}: price '{value}' is not a number.")
+        return None
+
+
+def validate(store: Store, columns: Dict[str, list]
+             ) -> Tuple[List[Tuple[Product, Optional[float], Optional[int]]], List[tuple]]:
+    """
+    Checks every row of an import against the store without changing anything.
+
+    :param store: The store to import into
+    :param columns: The columns to import
+    :return: The updates as (product, new price in cents, new quantity) and the
+             new products as (class, name, sku, price in cents, quantity, maximum)
+    :raises ValueError: Listing the invalid rows, if there are any
+    """
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("Import columns must all have the same length.")
+    unknown = set(columns) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown import columns: {sorted(unknown)}.")
+    rows = lengths.pop() if lengths else 0
+    empty = [None] * rows
+    names, skus, kinds = (columns.get(column, empty) for column in ("name", "sku", "kind"))
+
+    errors: List[str] = []
+    updates = []
+    additions = []
+    seen_names = set()
+    seen_skus = set()
+    catalog = store.catalog
+    for row in range(rows):
+        line = row + 1
+        name = names[row]
+        price = _cents(columns.get("price", empty)[row], errors, line)
+        quantity = _number(columns.get("quantity", empty)[row], int, "quantity", errors, line)
+        maximum = _number(columns.get("maximum", empty)[row], int, "maximum", errors, line)
+        if not name:
+            errors.append(f"Row {line}: product name cannot be empty.")
+            continue
+        if name in seen_names:
+            errors.append(f"Row {line}: product '{name}' appears more than once.")
+            continue
+        seen_names.add(name)
+        if price is not None and price < 0:
+            errors.append(f"Row {line}: product price cannot be negative.")
+        if quantity is not None and quantity < 0:
+            errors.append(f"Row {line}: product quantity cannot be negative.")
+
+        product = catalog.get(name)
+        if product is not None:
+            if skus[row] is not None and skus[row] != product.sku:
+                errors.append(f"Row {line}: the SKU of '{name}' cannot be changed.")
+            if quantity is not None and isinstance(product, NonStockedProduct):
+                errors.append(f"Row {line}: non-stocked products cannot have a quantity.")
+            updates.append((product, price, quantity))
+            continue
+
+        kind = KINDS.get(kinds[row] or "product")
+        sku = skus[row]
+        if kind is None:
+            errors.append(f"Row {line}: unknown product kind '{kinds[row]}'.")
+        elif kind is NonStockedProduct and quantity:
+            errors.append(f"Row {line}: non-stocked products cannot have a quantity.")
+        elif kind is LimitedProduct and maximum is None:
+            errors.append(f"Row {line}: limited products need a maximum.")
+        if price is None:
+            errors.append(f"Row {line}: new product '{name}' needs a price.")
+        if quantity is None and kind is not NonStockedProduct:
+            errors.append(f"Row {line}: new product '{name}' needs a quantity.")
+        if sku is not None and (sku in seen_skus or catalog.get_by_sku(sku) is not None):
+            errors.append(f"Row {line}: SKU '{sku}' is already in the store.")
+        seen_skus.add(sku)
+        additions.append((kind, name, sku, price, quantity or 0,
+                          maximum if kind is LimitedProduct else NO_MAXIMUM))
+
+    if errors:
+        more = len(errors) - _MAX_REPORTED_ERRORS
+        raise ValueError("Import rejected:\n" + "\n".join(errors[:_MAX_REPORTED_ERRORS])
+                         + (f"\n... and {more} more" if more > 0 else ""))
+    return updates, additions
+
+
+def bulk_import(store: Store, columns: Dict[str, list]) -> Dict[str, int]:
+    """
+    Validates and applies an import atomically.
+
+    :param store: The store to import into
+    :param columns: The columns to import, e.g. from ``read_csv``
+    :return: The number of products updated and added
+    :raises ValueError: If any row is invalid; nothing is changed then
+    """
+    store._ensure_loaded()
+    with store._catalog_lock:
+        return _apply(store, *validate(store, columns))
+
+
+def _apply(store: Store, updates: List[tuple], additions: List[tuple]) -> Dict[str, int]:
+    """
+    Applies a validated import. Callers must hold the store's catalog lock.
+
+    :param store: The store to import into
+    :param updates: The updates returned by ``validate``
+    :param additions: The new products returned by ``validate``
+    :return: The number of products updated and added
+    :raises ValueError: If a new quantity is below the stock reserved for a product;
+                        nothing is changed then
+    """
+    table = store._table
+    with locked_all():
+        below_held = [f"'{product.name}' has {table.held[product._row]} reserved"
+                      for product, _, quantity in updates
+                      if quantity is not None and quantity < table.held[product._row]]
+        if below_held:
+            raise ValueError("Import rejected: quantities cannot be less than the reserved "
+                             "quantity: " + ", ".join(below_held) + ".")
+        for product, price, quantity in updates:
+            row = product._row
+            if price is not None and price != table.prices[row]:
+                old_price = table.prices[row]
+                product._forget_prices(table.promotions[table.promotion_ids[row]], old_price)
+                table.prices[row] = price
+                table.displays[row] = None
+                for observer in product._observers:
+                    if observer is not store:  # The store re-sorts its price index once below
+                        observer.price_changed(product, old_price)
+            if quantity is not None:
+                product._write_quantity(quantity)
+
+        if additions:
+            kinds, names, skus, prices, quantities, maximums = map(list, zip(*additions))
+            actives = [quantity > 0 or kind is NonStockedProduct
+                       for kind, quantity in zip(kinds, quantities)]
+            rows = table.allocate_many(kinds, names, skus, prices, quantities, maximums, actives)
+            view, observers = Product._view, (store,)
+            products = [view(table, row, observers) for row in rows]
+            store._place(products)
+            with store._tracking_lock:
+                for product, quantity, active in zip(products, quantities, actives):
+                    if active:
+                        store._total_quantity += quantity
+                        store._available[product] = None
+            store._catalog = store._catalog.with_products(products)
+        store._rebuild_price_index()
+    return {"updated": len(updates), "added": len(additions)}
+
+
+def import_file(store: Store, path: str) -> Dict[str, int]:
+    """
+    Imports a CSV or JSON Lines file into a store.
+
+    :param store: The store to import into
+    :param path: The file
+    :return: The number of products updated and added
+    :raises ValueError: If the file cannot be read or any row is invalid
+    """
+    return bulk_import(store, read_file(path))
+
+
+if __name__ == "__main__":
+    try:
+        result = import_file(Store([]), sys.argv[1])
+    except ValueError as error:
+        sys.exit(str(error))
+    print(json.dumps(result))
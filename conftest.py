@@ -0,0 +1,33 @@
+import pytest
+from benchmarks import build_products
+from products import Product, NonStockedProduct, LimitedProduct
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Provide a fake clock for code that takes an injectable time source."""
+    return FakeClock()
+
+
+def _fresh_catalog(extra: int = 0):
+    """Build fresh products: a laptop, a mouse, a license, shipping and ``extra`` benchmark products."""
+    products = [Product("Laptop", 1000, 50), Product("Mouse", 20, 100),
+                NonStockedProduct("Windows License", 100),
+                LimitedProduct("Shipping", 10, 100, maximum=1)]
+    return products + build_products(extra, stock=50)
+
+
+@pytest.fixture
+def make_catalog():
+    """Provide the catalog factory, for tests that need several fresh copies."""
+    return _fresh_catalog
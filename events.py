@@ -0,0 +1,191 @@
+"""
+Stock event notifications.
+
+An ``EventBus`` turns product changes into events and delivers them to
+subscribers in batches on a background thread. It observes products like a
+store does, either directly (``product.subscribe(bus)``) or through a store
+created with ``Store(products, events=bus)``, which forwards the changes of
+every product it holds. Three kinds of event are published:
+
+- ``stock_changed`` whenever a product's quantity changes
+- ``low_stock`` when a quantity falls to or below the bus's threshold from above it
+- ``deactivated`` when a product stops being active, e.g. because it sold out
+
+Each event is a ``(kind, product, quantity, old_quantity)`` tuple holding the
+quantities at the time of the change. Publishing only appends to a queue, so
+orders never wait for subscribers; the worker wakes every ``interval``
+seconds and hands each subscriber the events of the kinds it asked for.
+"""
+
+import threading
+from collections import deque
+from typing import Callable, Iterable, List, Optional, Tuple
+
+STOCK_CHANGED = "stock_changed"
+LOW_STOCK = "low_stock"
+DEACTIVATED = "deactivated"
+KINDS = (STOCK_CHANGED, LOW_STOCK, DEACTIVATED)
+
+Event = Tuple[str, object, int, int]  # (kind, product, quantity, old quantity)
+Subscriber = Callable[[List[Event]], None]
+
+
+class EventBus:
+    """Queue of stock events and the worker delivering them to subscribers."""
+
+    def __init__(self, low_stock_threshold: int = 5, interval: float = 0.05,
+                 max_batch: int = 1000):
+        """
+        Initializes the bus and starts its worker.
+
+        :param low_stock_threshold: Quantity at or below which a product is low on stock
+        :param interval: Longest time in seconds an event waits before being delivered
+        :param max_batch: Largest number of events handed to a subscriber at once
+        """
+        self._low_stock_threshold = low_stock_threshold
+        self._interval = interval
+        self._max_batch = max_batch
+        self._pending = deque()  # Events and flush markers; appends are thread-safe
+        self._subscribers: List[Tuple[Subscriber, Optional[frozenset]]] = []
+        self._errors = 0
+        self._wake = threading.Event()  # Set to deliver before the interval is up
+        self._closed = threading.Event()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    @property
+    def low_stock_threshold(self) -> int:
+        """
+        Get the quantity at or below which a product is low on stock.
+
+        :return: The threshold
+        """
+        return self._low_stock_threshold
+
+    @property
+    def errors(self) -> int:
+        """
+        Get the number of subscriber calls that raised an exception.
+
+        :return: The error count
+        """
+        return self._errors
+
+    def subscribe(self, subscriber: Subscriber, kinds: Optional[Iterable[str]] = None):
+        """
+        Registers a function to receive batches of events.
+
+        :param subscriber: Called on the worker thread with a list of events
+        :param kinds: The event kinds to receive, or None for every kind
+        :raises ValueError: If an event kind is unknown
+        """
+        if kinds is not None:
+            kinds = frozenset(kinds)
+            if not kinds <= set(KINDS):
+                raise ValueError(f"Unknown event kinds: {sorted(kinds - set(KINDS))}.")
+        self._subscribers = self._subscribers + [(subscriber, kinds)]
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """
+        Removes a previously registered function.
+
+        :param subscriber: The function to stop calling
+        :raises ValueError: If the function is not subscribed
+        """
+        subscribers = [entry for entry in self._subscribers if entry[0] is not subscriber]
+        if len(subscribers) == len(self._subscribers):
+            raise ValueError("The function is not subscribed.")
+        self._subscribers = subscribers
+
+    def product_changed(self, product, old_quantity: int, old_active: bool):
+        """
+        Observer callback publishing the events of one stock or status change.
+
+        :param product: The product that changed
+        :param old_quantity: The quantity before the change
+        :param old_active: The active status before the change
+        """
+        quantity = product.quantity
+        pending = self._pending
+        if quantity != old_quantity:
+            pending.append((STOCK_CHANGED, product, quantity, old_quantity))
+            if quantity <= self._low_stock_threshold < old_quantity:
+                pending.append((LOW_STOCK, product, quantity, old_quantity))
+        if old_active and not product.is_active:
+            pending.append((DEACTIVATED, product, quantity, old_quantity))
+
+    def price_changed(self, product, old_price: int):
+        """
+        Observer callback for price changes, which publish no events.
+
+        :param product: The product that changed
+        :param old_price: The price in cents before the change
+        """
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every event published so far has been delivered.
+
+        :param timeout: Longest time to wait in seconds, or None to wait forever
+        :return: True if the events were delivered in time
+        """
+        delivered = threading.Event()
+        self._pending.append(delivered)
+        self._wake.set()
+        if self._closed.is_set():  # No worker left to deliver them
+            self._worker.join()
+            self._drain()
+        return delivered.wait(timeout)
+
+    def close(self):
+        """Delivers the outstanding events and stops the worker."""
+        self._closed.set()
+        self._wake.set()
+        self._worker.join()
+
+    def _run(self):
+        """Delivers queued events every interval, or when woken, until the bus is closed."""
+        while True:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            closed = self._closed.is_set()
+            self._drain()
+            if closed:
+                return
+
+    def _drain(self):
+        """Delivers every queued event in batches and releases waiting flushes."""
+        pending = self._pending
+        batch: List[Event] = []
+        while pending:
+            item = pending.popleft()
+            if isinstance(item, threading.Event):
+                self._deliver(batch)
+                batch = []
+                item.set()
+                continue
+            batch.append(item)
+            if len(batch) >= self._max_batch:
+                self._deliver(batch)
+                batch = []
+        self._deliver(batch)
+
+    def _deliver(self, batch: List[Event]):
+        """
+        Hands a batch to every subscriber, filtered by the kinds each asked for.
+
+        An exception raised by one subscriber is counted and does not stop
+        delivery to the others.
+
+        :param batch: The events
+        """
+        if not batch:
+            return
+        for subscriber, kinds in self._subscribers:
+            events = batch if kinds is None else [event for event in batch if event[0] in kinds]
+            if not events:
+                continue
+            try:
+                subscriber(events)
+            except Exception:  # Subscriber failures must not stop the worker
+                self._errors += 1
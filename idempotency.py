@@ -0,0 +1,149 @@
+"""
+Idempotency keys for orders.
+
+Clients that retry an order after a timeout cannot tell whether the first
+attempt went through. Passing the same idempotency key with every attempt
+makes the retries safe: the first attempt to succeed is remembered, and
+every later one returns its result without placing the order again. An
+attempt arriving while another with the same key is still running waits for
+it instead of running alongside it. Rejected orders are not remembered,
+since they changed nothing and may succeed when retried.
+
+Keys are remembered for ``ttl`` seconds and at most ``maxsize`` of them are
+kept; when the cache is full the key closest to expiring is evicted. Entries
+are held in insertion order, which is also expiry order, so dropping
+expired keys costs amortized O(1) however many keys churn through. Keys of
+attempts still running are never dropped, since a retry would then run the
+operation again; the cache may exceed ``maxsize`` until they finish.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+MAX_KEY_LENGTH = 256  # Longest accepted key, bounding the memory each entry can take
+
+_PENDING = object()  # Result of an attempt that is still running
+_FAILED = object()  # Result of an attempt that raised
+
+
+class _Entry:
+    """What is remembered about one key."""
+
+    __slots__ = ("fingerprint", "expires_at", "result")
+
+    def __init__(self, fingerprint: Hashable, expires_at: float):
+        """
+        Initializes the entry of an attempt that is about to run.
+
+        :param fingerprint: Identifies the request the key was used for
+        :param expires_at: When the key is forgotten, on the cache's clock
+        """
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.result = _PENDING
+
+
+class IdempotencyCache:
+    """Bounded, expiring memory of the results of keyed operations."""
+
+    def __init__(self, ttl: float = 24 * 3600, maxsize: int = 100_000,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initializes an empty cache.
+
+        :param ttl: Seconds a key is remembered after its first attempt started
+        :param maxsize: Maximum number of remembered keys
+        :param clock: Source of the current time in seconds
+        :raises ValueError: If the TTL or the size is not positive
+        """
+        if ttl <= 0 or maxsize <= 0:
+            raise ValueError("Idempotency TTL and size must be greater than zero.")
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._condition = threading.Condition()  # Guards the entries; notified when attempts end
+        self.hits = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """Return the number of remembered keys, including expired ones not yet dropped."""
+        return len(self._entries)
+
+    def execute(self, key: str, fingerprint: Hashable, operation: Callable[[], object]) -> object:
+        """
+        Runs an operation once per key, returning the remembered result on repeats.
+
+        :param key: The idempotency key chosen by the client
+        :param fingerprint: Identifies the request, e.g. its consolidated order lines
+        :param operation: Performs the request and returns its result
+        :return: The result of the operation, now or from an earlier attempt
+        :raises ValueError: If the key is invalid or was used for a different request,
+                            or the operation raised it
+        """
+        if not isinstance(key, str) or not 0 < len(key) <= MAX_KEY_LENGTH:
+            raise ValueError(f"Idempotency keys must be strings of 1 to {MAX_KEY_LENGTH} characters.")
+        with self._condition:
+            while True:
+                now = self._clock()
+                self._expire(now)
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._entries[key] = _Entry(fingerprint, now + self._ttl)
+                    if len(self._entries) > self._maxsize:
+                        self._evict()
+                    break
+                if entry.fingerprint != fingerprint:
+                    raise ValueError(f"Idempotency key '{key}' was already used for a different order.")
+                if entry.result is _PENDING:
+                    self._condition.wait_for(lambda: entry.result is not _PENDING)
+                if entry.result is _FAILED:
+                    continue  # The earlier attempt changed nothing, so this one runs
+                self.hits += 1
+                return entry.result
+
+        try:
+            result = operation()
+        except BaseException:
+            with self._condition:
+                entry.result = _FAILED
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            entry.result = result
+            self._condition.notify_all()
+        return result
+
+    def _expire(self, now: float):
+        """
+        Drops the keys whose time is up, stopping at the first one still running.
+        Callers must hold the condition's lock.
+
+        :param now: The current time on the cache's clock
+        """
+        entries = self._entries
+        while entries:
+            key, entry = next(iter(entries.items()))
+            if entry.expires_at > now or entry.result is _PENDING:
+                return
+            del entries[key]
+
+    def _evict(self):
+        """
+        Drops the oldest finished keys until the cache is within its size.
+        Callers must hold the condition's lock.
+        """
+        excess = len(self._entries) - self._maxsize
+        finished = []
+        for key, entry in self._entries.items():
+            if entry.result is not _PENDING:
+                finished.append(key)
+                if len(finished) == excess:
+                    break
+        for key in finished:
+            del self._entries[key]
+        self.evictions += len(finished)
@@ -0,0 +1,118 @@
+"""
+Streaming replay of order logs.
+
+An order log is a JSON Lines file where every line is one order, written as
+a list of [product, quantity] pairs; the product is referenced by name or by
+SKU. Lines are read lazily and fed to the store in fixed-size chunks, so
+memory use depends on the chunk size and not on the length of the log.
+"""
+
+import argparse
+import json
+import sys
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+
+from products import Product
+from store import Store
+
+
+def parse_order(store: Store, line: str) -> List[Tuple[Product, int]]:
+    """
+    Parses one log line into a shopping list.
+
+    :param store: The store whose products the line refers to
+    :param line: The JSON text of the order
+    :return: A list of tuples [(Product, quantity)]
+    :raises ValueError: If the line is malformed or references an unknown product
+    """
+    try:
+        items = json.loads(line)
+    except ValueError:
+        raise ValueError("Malformed JSON.") from None
+    if not isinstance(items, list):
+        raise ValueError("An order must be a list of [product, quantity] pairs.")
+
+    shopping_list = []
+    for item in items:
+        if (not isinstance(item, list) or len(item) != 2 or not isinstance(item[0], str)
+                or not isinstance(item[1], int) or isinstance(item[1], bool)):
+            raise ValueError("Each item must be a [product, quantity] pair.")
+        reference, quantity = item
+        product = store.get(reference) or store.get_by_sku(reference)
+        if product is None:
+            raise ValueError(f"Unknown product '{reference}'.")
+        shopping_list.append((product, quantity))
+    return shopping_list
+
+
+def replay_orders(store: Store, lines: Iterable[str], chunk_size: int = 1000) -> Iterator[dict]:
+    """
+    Replays a stream of order log lines against a store.
+
+    Parsed orders are placed ``chunk_size`` at a time through
+    ``Store.order_many``, which gives the same outcome as calling
+    ``Store.order`` on each of them in turn. Blank lines are skipped.
+
+    :param store: The store to place the orders in
+    :param lines: The log lines, e.g. an open file
+    :param chunk_size: Number of lines read and placed together
+    :return: One record per order, in log order: ``{"line", "ok", "total"}``
+             for accepted orders and ``{"line", "ok", "error"}`` for rejected ones
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be greater than zero.")
+
+    numbered = enumerate(lines, start=1)
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+
+        records: List[dict] = []
+        orders = []
+        positions = []  # Index into records of each order passed to the store
+        for line_number, line in chunk:
+            if not line.strip():
+                continue
+            try:
+                orders.append(parse_order(store, line))
+            except ValueError as error:
+                records.append({"line": line_number, "ok": False, "error": str(error)})
+                continue
+            positions.append(len(records))
+            records.append({"line": line_number, "ok": True})
+
+        totals, failures = store.order_many(orders)
+        for index, position in enumerate(positions):
+            record = records[position]
+            if index in failures:
+                record["ok"] = False
+                record["error"] = str(failures[index])
+            else:
+                record["total"] = totals[index]
+        yield from records
+
+
+def replay_file(store: Store, path: str, chunk_size: int = 1000) -> Iterator[dict]:
+    """
+    Replays an order log file against a store.
+
+    :param store: The store to place the orders in
+    :param path: Path of the JSON Lines order log
+    :param chunk_size: Number of lines read and placed together
+    :return: One record per order, as produced by ``replay_orders``
+    """
+    with open(path, encoding="utf-8") as log:
+        yield from replay_orders(store, log, chunk_size)
+
+
+if __name__ == "__main__":
+    from main import best_buy
+
+    parser = argparse.ArgumentParser(description="Replay a JSON Lines order log against the store.")
+    parser.add_argument("log", help="Path of the order log")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Orders placed per batch")
+    arguments = parser.parse_args()
+    for result in replay_file(best_buy, arguments.log, arguments.chunk_size):
+        sys.stdout.write(json.dumps(result) + "\n")
@@ -0,0 +1,271 @@
+"""
+Write-ahead journal of committed orders.
+
+Every order the store commits is appended to a JSON Lines file as
+``{"seq": n, "lines": [[product name, quantity], ...]}``. Appending only
+buffers the order in memory; a background thread writes and fsyncs all
+buffered entries together ("group commit") at most ``max_delay`` seconds
+after the first of them arrived, so one fsync covers many orders. A store
+with a synchronous journal (the default) makes every order wait, after its
+locks are released, until the group holding it is on disk, so an order
+reported as placed survives a crash; an asynchronous journal returns at
+once and may lose the last ``max_delay`` seconds of orders.
+If writing or syncing fails, the journal stops accepting entries and every
+later ``record`` or ``wait_durable`` call raises the failure.
+
+On startup, ``recover`` rebuilds a store by loading a snapshot (or taking a
+freshly built catalog) and re-applying the stock changes of every journaled
+order newer than it.
+"""
+
+import json
+import os
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+from products import locked
+from store import Store
+
+_TAIL_BYTES = 64 * 1024  # How much of an existing journal is read to find its last entry
+
+
+def read_entries(path: str) -> Iterator[dict]:
+    """
+    Reads the entries of a journal file in order.
+
+    A final line cut short by a crash is ignored.
+
+    :param path: The journal file
+    :return: The entries as dicts with ``seq`` and ``lines``
+    """
+    with open(path, "rb") as journal_file:
+        for line in journal_file:
+            if not line.endswith(b"\n"):
+                return  # Torn write at the end of the file
+            yield json.loads(line)
+
+
+def _open_tail(path: str) -> int:
+    """
+    Prepares an existing journal file for appending.
+
+    A final line cut short by a crash is cut off so new entries start on a
+    line of their own.
+
+    :param path: The journal file
+    :return: The sequence number of the last complete entry, or 0 if there is none
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r+b") as journal_file:
+        journal_file.seek(0, os.SEEK_END)
+        size = journal_file.tell()
+        start = max(0, size - _TAIL_BYTES)
+        journal_file.seek(start)
+        tail = journal_file.read()
+        complete_length = tail.rfind(b"\n") + 1
+        if start + complete_length < size and (complete_length or start == 0):
+            journal_file.truncate(start + complete_length)
+    for line in reversed(tail[:complete_length].splitlines()):
+        try:
+            return json.loads(line)["seq"]
+        except (ValueError, KeyError):
+            continue  # Partial first line of the tail
+    return 0
+
+
+class OrderJournal:
+    """Append-only, group-committed journal of orders."""
+
+    def __init__(self, path: str, max_delay: float = 0.005, max_batch: int = 4096,
+                 start_sequence: int = 0, synchronous: bool = True):
+        """
+        Opens a journal for appending, continuing the sequence of any existing entries.
+
+        :param path: The journal file
+        :param max_delay: Longest time in seconds an entry waits before being flushed
+        :param max_batch: Number of buffered entries that triggers an immediate flush
+        :param start_sequence: Lowest sequence number to continue from, e.g. the
+                               journal sequence of the snapshot the store was loaded from
+        :param synchronous: Whether orders wait until their entry is on disk
+        """
+        self._path = path
+        self.synchronous = synchronous
+        self._max_delay = max_delay
+        self._max_batch = max_batch
+        self._sequence = max(_open_tail(path), start_sequence)
+        self._durable_sequence = self._sequence
+        self._pending: List[Tuple[int, List[Tuple[str, int]]]] = []
+        self._closed = False
+        self._error: Optional[Exception] = None  # Why the flusher stopped, if it failed
+        self._condition = threading.Condition()
+        self._file = open(path, "ab")
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    @property
+    def last_sequence(self) -> int:
+        """
+        Get the sequence number of the last recorded entry.
+
+        :return: The sequence number
+        """
+        return self._sequence
+
+    @property
+    def durable_sequence(self) -> int:
+        """
+        Get the sequence number up to which entries are on disk.
+
+        :return: The sequence number
+        """
+        return self._durable_sequence
+
+    def record(self, lines: List[Tuple[str, int]]) -> int:
+        """
+        Appends an order to the journal without waiting for the disk.
+
+        :param lines: The order's consolidated (product name, quantity) lines
+        :return: The entry's sequence number
+        :raises ValueError: If the journal is closed or failed to write earlier entries
+        """
+        with self._condition:
+            self._raise_error()
+            if self._closed:
+                raise ValueError("The order journal is closed.")
+            self._sequence += 1
+            self._pending.append((self._sequence, lines))
+            if len(self._pending) == 1 or len(self._pending) >= self._max_batch:
+                self._condition.notify_all()
+            return self._sequence
+
+    def wait_durable(self, sequence: int, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until an entry has been written and synced.
+
+        :param sequence: The entry's sequence number
+        :param timeout: Longest time to wait in seconds, or None to wait forever
+        :return: True if the entry is durable
+        :raises ValueError: If the journal failed before the entry was written
+        """
+        with self._condition:
+            durable = self._condition.wait_for(
+                lambda: self._durable_sequence >= sequence or self._error is not None, timeout)
+            if self._durable_sequence < sequence:
+                self._raise_error()
+            return durable and self._durable_sequence >= sequence
+
+    def close(self):
+        """Flushes every buffered entry and closes the file."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._flusher.join()
+        self._file.close()
+
+    def _flush_loop(self):
+        """Writes buffered entries in groups until the journal is closed."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                # Give concurrent orders up to the latency budget to join this group
+                self._condition.wait_for(
+                    lambda: len(self._pending) >= self._max_batch or self._closed,
+                    self._max_delay)
+                batch, self._pending = self._pending, []
+                last_sequence = self._sequence
+            try:
+                encode = json.JSONEncoder().encode
+                self._file.write("".join(encode({"seq": sequence, "lines": lines}) + "\n"
+                                         for sequence, lines in batch).encode())
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except Exception as error:  # Reported to every caller instead of lost with the thread
+                with self._condition:
+                    self._error = error
+                    self._pending = []
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                self._durable_sequence = last_sequence
+                self._condition.notify_all()
+
+    def _raise_error(self):
+        """
+        Raises the failure that stopped the flusher, if there was one.
+        Callers must hold the condition's lock.
+
+        :raises ValueError: If the flusher failed
+        """
+        if self._error is not None:
+            raise ValueError(f"The order journal failed: {self._error}") from self._error
+
+
+def replay(store: Store, path: str, after_sequence: int = 0) -> int:
+    """
+    Re-applies the stock changes of journaled orders to a store.
+
+    Orders are not re-priced, but each is checked against the stock left
+    by the entries before it, like an order being placed, so a journal that
+    does not match the starting point cannot drive stock negative. Entries
+    are applied whole or not at all.
+
+    :param store: The store to update
+    :param path: The journal file
+    :param after_sequence: Entries up to and including this sequence number are skipped
+    :return: The sequence number of the last applied entry
+    :raises ValueError: If an entry names a product the store does not have
+                        or could not have been bought from the replayed stock
+    """
+    last_sequence = after_sequence
+    if not os.path.exists(path):
+        return last_sequence
+    for entry in read_entries(path):
+        if entry["seq"] <= after_sequence:
+            continue
+        lines = {}
+        for name, quantity in entry["lines"]:
+            product = store.get(name)
+            if product is None:
+                raise ValueError(f"Journal entry {entry['seq']} names unknown product '{name}'.")
+            lines[product] = lines.get(product, 0) + quantity
+        with locked(lines):
+            try:
+                for product, quantity in lines.items():
+                    product._check_purchase(quantity)
+            except ValueError as error:
+                raise ValueError(f"Journal entry {entry['seq']} cannot be replayed: {error}") from error
+            for product, quantity in lines.items():
+                product._take_stock(quantity)
+        last_sequence = entry["seq"]
+    return last_sequence
+
+
+def recover(journal_path: str, snapshot_path: Optional[str] = None,
+            store: Optional[Store] = None, **journal_options) -> Store:
+    """
+    Rebuilds a store after a restart and reattaches its journal.
+
+    The starting point is the snapshot at ``snapshot_path`` if it exists,
+    otherwise ``store`` (a freshly built catalog). Journaled orders newer
+    than the starting point are then replayed.
+
+    :param journal_path: The journal file
+    :param snapshot_path: An optional snapshot file
+    :param store: The catalog to start from when there is no snapshot
+    :param journal_options: Extra arguments for ``OrderJournal``
+    :return: The recovered store, journaling to ``journal_path``
+    :raises ValueError: If there is neither a snapshot nor a store to start from
+    """
+    after_sequence = 0
+    if snapshot_path is not None and os.path.exists(snapshot_path):
+        from snapshot import load_snapshot, read_header
+        after_sequence = read_header(snapshot_path)["journal_sequence"]
+        store = load_snapshot(snapshot_path)
+    elif store is None:
+        raise ValueError("Recovery needs a snapshot or a store to start from.")
+    last_sequence = replay(store, journal_path, after_sequence)
+    store.journal = OrderJournal(journal_path, start_sequence=last_sequence, **journal_options)
+    return store
@@ -0,0 +1,250 @@
+"""
+Synthetic load generator for capacity planning.
+
+Builds a synthetic catalog mixing every product type and promotion (the
+benchmark suite's ``build_products``), draws a reproducible stream of orders from it, and drives ``Store.order`` with them
+from several threads, reporting throughput, latency percentiles and the
+rate and reasons of rejected orders.
+
+Product popularity follows a Zipf distribution: the product of popularity
+rank ``k`` is picked with probability proportional to ``1 / k ** exponent``.
+Basket sizes are geometric with a configurable mean. Two loop models are
+supported:
+
+- closed loop (default): each of ``concurrency`` clients places its next
+  order as soon as the previous one returns, so the store sets the pace
+- open loop: orders arrive as a Poisson process at ``rate`` per second
+  whatever the store's speed, and latency is measured from each order's
+  scheduled arrival, so time spent waiting behind a slow store is counted
+
+The same seed always produces the same catalog, orders and arrival times.
+Orders can also be written as a JSON Lines log for ``ingest.replay_file``.
+Run ``python loadgen.py --help`` for the command-line options.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import List, Optional, Sequence, TextIO, Tuple
+
+from benchmarks import build_products, percentile
+from products import Product
+from store import Store
+
+Order = List[Tuple[Product, int]]
+
+
+class ZipfSampler:
+    """Draws items with Zipf-distributed popularity."""
+
+    def __init__(self, items: Sequence, exponent: float, rng: random.Random):
+        """
+        Initializes the sampler.
+
+        Popularity ranks are assigned to the items in a random order, so the
+        most popular items are not simply the first ones.
+
+        :param items: The items to draw from
+        :param exponent: The Zipf exponent; 0 is uniform, larger is more skewed
+        :param rng: The random generator used for ranks and draws
+        :raises ValueError: If there are no items or the exponent is negative
+        """
+        if not items:
+            raise ValueError("Cannot sample from an empty catalog.")
+        if exponent < 0:
+            raise ValueError("Zipf exponent cannot be negative.")
+        self._items = list(items)
+        rng.shuffle(self._items)
+        self._rng = rng
+        self._cumulative = list(itertools.accumulate(1 / rank ** exponent
+                                                     for rank in range(1, len(items) + 1)))
+
+    def sample(self) -> object:
+        """
+        Draws one item.
+
+        :return: The item
+        """
+        cumulative = self._cumulative
+        return self._items[bisect_left(cumulative, self._rng.random() * cumulative[-1])]
+
+
+def generate_orders(products: Sequence[Product], count: int, seed: int = 0,
+                    zipf_exponent: float = 1.1, basket_mean: float = 3.0,
+                    max_basket: int = 20, max_quantity: int = 3) -> List[Order]:
+    """
+    Draws a reproducible stream of orders.
+
+    :param products: The products to order
+    :param count: Number of orders
+    :param seed: Seed for every random choice
+    :param zipf_exponent: Skew of product popularity
+    :param basket_mean: Mean number of lines per order, at least 1
+    :param max_basket: Largest number of lines per order
+    :param max_quantity: Largest quantity per line; quantities are uniform from 1
+    :return: The orders, as lists of tuples [(Product, quantity)]
+    :raises ValueError: If a parameter is out of range
+    """
+    if basket_mean < 1 or max_basket < 1 or max_quantity < 1:
+        raise ValueError("Basket mean, basket limit and quantity limit must be at least 1.")
+    rng = random.Random(seed)
+    sampler = ZipfSampler(products, zipf_exponent, rng)
+    continue_probability = 1 - 1 / basket_mean  # Geometric basket sizes with the given mean
+    orders = []
+    for _ in range(count):
+        lines = 1
+        while lines < max_basket and rng.random() < continue_probability:
+            lines += 1
+        orders.append([(sampler.sample(), rng.randint(1, max_quantity)) for _ in range(lines)])
+    return orders
+
+
+def arrival_times(count: int, rate: float, seed: int = 0) -> List[float]:
+    """
+    Schedules the arrivals of a Poisson process.
+
+    :param count: Number of arrivals
+    :param rate: Mean arrivals per second
+    :param seed: Seed for the gaps between arrivals
+    :return: Seconds from the start of the run to each arrival
+    :raises ValueError: If the rate is not positive
+    """
+    if rate <= 0:
+        raise ValueError("Arrival rate must be greater than zero.")
+    rng = random.Random(seed)
+    return list(itertools.accumulate(rng.expovariate(rate) for _ in range(count)))
+
+
+def run_load(store: Store, orders: List[Order], concurrency: int = 1,
+             rate: Optional[float] = None, seed: int = 0) -> dict:
+    """
+    Places orders against a store from several threads and measures the outcome.
+
+    :param store: The store to load
+    :param orders: The orders, e.g. from ``generate_orders``
+    :param concurrency: Number of client threads
+    :param rate: Orders per second for an open loop, or None for a closed loop
+    :param seed: Seed for the open-loop arrival times
+    :return: Throughput, latency percentiles in microseconds and rejections by reason
+    :raises ValueError: If the concurrency is not positive
+    """
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1.")
+    arrivals = arrival_times(len(orders), rate, seed) if rate is not None else None
+    latencies: List[List[int]] = [[] for _ in range(concurrency)]
+    rejections: List[Counter] = [Counter() for _ in range(concurrency)]
+    next_order = itertools.count()  # Shared by the clients; next() is atomic
+    barrier = threading.Barrier(concurrency + 1)
+    started_ns = 0
+
+    def client(index: int):
+        clock = time.perf_counter_ns
+        place = store.order
+        own_latencies, own_rejections = latencies[index], rejections[index]
+        barrier.wait()
+        while True:
+            position = next(next_order)
+            if position >= len(orders):
+                return
+            if arrivals is None:
+                began = clock()
+            else:
+                began = started_ns + int(arrivals[position] * 1e9)
+                delay = began - clock()
+                if delay > 0:
+                    time.sleep(delay / 1e9)
+            try:
+                place(orders[position])
+            except ValueError as error:
+                own_rejections[str(error)] += 1
+            own_latencies.append(clock() - began)
+
+    clients = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    started_ns = time.perf_counter_ns()
+    barrier.wait()
+    for thread in clients:
+        thread.join()
+    elapsed = (time.perf_counter_ns() - started_ns) / 1e9
+
+    all_latencies = sorted(latency for own in latencies for latency in own)
+    reasons = sum(rejections, Counter())
+    rejected = sum(reasons.values())
+    return {
+        "mode": "closed" if rate is None else "open",
+        "concurrency": concurrency,
+        "orders": len(orders),
+        "accepted": len(orders) - rejected,
+        "rejected": rejected,
+        "rejection_rate": rejected / len(orders) if orders else 0.0,
+        "rejections": dict(reasons.most_common()),
+        "elapsed_s": elapsed,
+        "throughput": len(orders) / elapsed if elapsed else 0.0,
+        "p50_us": percentile(all_latencies, 0.50),
+        "p90_us": percentile(all_latencies, 0.90),
+        "p99_us": percentile(all_latencies, 0.99),
+        "max_us": all_latencies[-1] / 1000 if all_latencies else 0.0,
+    }
+
+
+def write_order_log(orders: List[Order], output: TextIO):
+    """
+    Writes orders as a JSON Lines order log, the format ``ingest.replay_file`` reads.
+
+    :param orders: The orders
+    :param output: The text stream to write to
+    """
+    encode = json.JSONEncoder().encode
+    for order in orders:
+        output.write(encode([[product.name, quantity] for product, quantity in order]) + "\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point.
+
+    :param argv: Command-line arguments, defaulting to ``sys.argv[1:]``
+    :return: The process exit code
+    """
+    parser = argparse.ArgumentParser(description="Generate synthetic order load against a store.")
+    parser.add_argument("--products", type=int, default=1000, help="Catalog size")
+    parser.add_argument("--stock", type=int, default=1000, help="Initial quantity per product")
+    parser.add_argument("--orders", type=int, default=10_000, help="Number of orders")
+    parser.add_argument("--concurrency", type=int, default=4, help="Client threads")
+    parser.add_argument("--rate", type=float,
+                        help="Orders per second for an open loop; closed loop if omitted")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of popularity")
+    parser.add_argument("--basket-mean", type=float, default=3.0, help="Mean lines per order")
+    parser.add_argument("--max-basket", type=int, default=20, help="Most lines per order")
+    parser.add_argument("--max-quantity", type=int, default=3, help="Largest quantity per line")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for reproducible runs")
+    parser.add_argument("--write-log", help="Also write the orders as a JSON Lines order log")
+    arguments = parser.parse_args(argv)
+
+    try:
+        store = Store(build_products(arguments.products, arguments.seed, arguments.stock))
+        orders = generate_orders(store.products, arguments.orders, arguments.seed,
+                                 arguments.zipf, arguments.basket_mean,
+                                 arguments.max_basket, arguments.max_quantity)
+        if arguments.write_log:
+            with open(arguments.write_log, "w", encoding="utf-8") as log:
+                write_order_log(orders, log)
+        report = run_load(store, orders, arguments.concurrency, arguments.rate, arguments.seed)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    report["seed"] = arguments.seed
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
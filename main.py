@@ -1,37 +1,77 @@
 """
 Main module for the Best Buy store application.
 
-This module initializes the store with products and promotions,
-and provides a command-line interface for interacting with the store.
+Running ``python main.py`` starts the interactive menu. Subcommands answer
+one request and exit, for scripts and cron jobs:
+
+    python main.py list
+    python main.py total
+    python main.py order "MacBook Air M2=2" "Shipping=1"
+    echo '[["MacBook Air M2", 2]]' | python main.py order
+
+``order`` reads one JSON order per line from standard input, in the order
+log format of ``ingest``, when no items are given. ``--snapshot FILE`` works
+on a snapshot written by ``Store.save`` instead of the demo catalog and
+saves orders back to it. Snapshots load lazily, so ``total`` never creates
+product objects.
+
+Importing this module is cheap: the product and store modules are only
+imported, and the demo catalog only built, when they are first needed.
+``main.best_buy`` builds the demo store on first access.
 """
 
-from products import (
-    Product, NonStockedProduct, LimitedProduct,
-    PercentDiscount, SecondHalfPrice, ThirdOneFree
-)
-from store import Store
-
-# Create promotions
-second_half_price = SecondHalfPrice("Second Half price!")
-third_one_free = ThirdOneFree("Third One Free!")
-thirty_percent_off = PercentDiscount("30% off!", 30)
-
-# Setup initial stock of inventory
-product_list = [
-    Product("MacBook Air M2", price=1450, quantity=100),
-    Product("Bose QuietComfort Earbuds", price=250, quantity=500),
-    Product("Google Pixel 7", price=500, quantity=250),
-    NonStockedProduct("Windows License", price=125),
-    LimitedProduct("Shipping", price=10, quantity=1000, maximum=1)
-]
-
-# Apply promotions to products
-product_list[0].promotion = second_half_price
-product_list[1].promotion = third_one_free
-product_list[3].promotion = thirty_percent_off
-
-# Create a Store instance
-best_buy = Store(product_list)
+import sys
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from products import Product
+    from store import Store
+
+_best_buy = None  # The demo store, once built
+
+
+def build_store() -> "Store":
+    """
+    Builds the demo store with its products and promotions.
+
+    :return: A new store
+    """
+    from products import (
+        Product, NonStockedProduct, LimitedProduct,
+        PercentDiscount, SecondHalfPrice, ThirdOneFree
+    )
+    from store import Store
+
+    # Create promotions
+    second_half_price = SecondHalfPrice("Second Half price!")
+    third_one_free = ThirdOneFree("Third One Free!")
+    thirty_percent_off = PercentDiscount("30% off!", 30)
+
+    # Setup initial stock of inventory
+    product_list = [
+        Product("MacBook Air M2", price=1450, quantity=100),
+        Product("Bose QuietComfort Earbuds", price=250, quantity=500),
+        Product("Google Pixel 7", price=500, quantity=250),
+        NonStockedProduct("Windows License", price=125),
+        LimitedProduct("Shipping", price=10, quantity=1000, maximum=1)
+    ]
+
+    # Apply promotions to products
+    product_list[0].promotion = second_half_price
+    product_list[1].promotion = third_one_free
+    product_list[3].promotion = thirty_percent_off
+
+    return Store(product_list)
+
+
+def __getattr__(name: str):
+    """Build the demo store the first time ``best_buy`` is accessed."""
+    global _best_buy
+    if name == "best_buy":
+        if _best_buy is None:
+            _best_buy = build_store()
+        return _best_buy
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def list_products(store):
     """
@@ -40,12 +80,8 @@ def list_products(store):
     :param store: Store object containing the inventory
     """
     print("------")
-    products = store.get_all_products()
-    if not products:
+    if not store.write_listing(sys.stdout):
         print("🚫 No products available.")
-    else:
-        for idx, product in enumerate(products, start=1):
-            print(f"{idx}. {product}")
     print("------")
 
 def show_total_quantity(store):
@@ -73,8 +109,7 @@ def make_order(store):
         return
 
     print("------")
-    for idx, product in enumerate(products, start=1):
-        print(f"{idx}. {product}")
+    store.write_listing(sys.stdout)
     print("------")
 
     while True:
@@ -112,7 +147,7 @@ def quit_program():
     print("👋 Goodbye! Thank you for shopping at Best Buy 🛒")
     exit()
 
-def start(store: Store):
+def start(store: "Store"):
     """
     Starts the user interface for interacting with the store.
     :param store: Store object containing the inventory
@@ -139,5 +174,100 @@ def start(store: Store):
         else:
             print("❌ Invalid choice, please enter a number between 1-4.")
 
+def parse_items(store: "Store", items: List[str]) -> List[Tuple["Product", int]]:
+    """
+    Parses order items given on the command line.
+
+    :param store: The store whose products the items refer to
+    :param items: Items written as "NAME=QUANTITY"; the name may also be a SKU
+    :return: A list of tuples [(Product, quantity)]
+    :raises ValueError: If an item is malformed or references an unknown product
+    """
+    shopping_list = []
+    for item in items:
+        reference, separator, quantity = item.rpartition("=")
+        if not separator or not quantity.strip().isdigit():
+            raise ValueError(f"Order items must be written as NAME=QUANTITY, got '{item}'.")
+        product = store.get(reference) or store.get_by_sku(reference)
+        if product is None:
+            raise ValueError(f"Unknown product '{reference}'.")
+        shopping_list.append((product, int(quantity)))
+    return shopping_list
+
+
+def run_order(store: "Store", items: List[str]) -> int:
+    """
+    Places the order given as items, or every order read from standard input.
+
+    Each accepted order prints its total; rejected orders are reported on
+    standard error.
+
+    :param store: The store to order from
+    :param items: Items written as "NAME=QUANTITY", or empty to read standard input
+    :return: The process exit code, 1 if any order was rejected
+    """
+    if items:
+        orders = [(None, items)]
+    else:
+        orders = [(number, line) for number, line in enumerate(sys.stdin, start=1)
+                  if line.strip()]
+    failed = False
+    for number, order in orders:
+        try:
+            if number is None:
+                shopping_list = parse_items(store, order)
+            else:
+                from ingest import parse_order
+                shopping_list = parse_order(store, order)
+            total_price = store.order(shopping_list)
+        except ValueError as error:
+            where = "" if number is None else f"Line {number}: "
+            print(f"{where}Order failed: {error}", file=sys.stderr)
+            failed = True
+        else:
+            print(f"{total_price:.2f}")
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point.
+
+    :param argv: Command-line arguments, defaulting to ``sys.argv[1:]``
+    :return: The process exit code
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Best Buy store.")
+    parser.add_argument("--snapshot", help="Use this store snapshot instead of the demo catalog")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("list", help="Print the available products")
+    commands.add_parser("total", help="Print the total quantity in stock")
+    order_parser = commands.add_parser("order", help="Place orders and print their totals")
+    order_parser.add_argument("items", nargs="*",
+                              help="Items as NAME=QUANTITY; without items, one JSON order "
+                                   "per line is read from standard input")
+    arguments = parser.parse_args(argv)
+
+    if arguments.snapshot:
+        from store import Store
+        store = Store.load(arguments.snapshot)
+    else:
+        store = build_store()
+
+    if arguments.command is None:
+        start(store)
+    elif arguments.command == "list":
+        store.write_listing(sys.stdout)
+    elif arguments.command == "total":
+        print(store.get_total_quantity())
+    else:
+        exit_code = run_order(store, arguments.items)
+        if arguments.snapshot:
+            store.save(arguments.snapshot)
+        return exit_code
+    return 0
+
+
 if __name__ == "__main__":
-    start(best_buy)
+    sys.exit(main())
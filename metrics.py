@@ -0,0 +1,381 @@
+"""
+Instrumentation of the order and pricing hot paths.
+
+``metrics.enable()`` wraps ``Store.order``, ``Store.order_many``,
+``Store.quote``, ``Product._take_stock`` and every
+``Promotion.apply_promotion_cents`` in timing wrappers that feed latency
+histograms labelled with the class involved and count the orders rejected
+with ``ValueError``. ``_take_stock`` is what every purchase path (``buy``,
+``order``, ``order_many``, journal replay) runs once per product, so the
+stock histograms count store traffic per product class.
+``metrics.disable()`` puts the original methods back, so when
+instrumentation is off the hot paths run exactly the code they would
+without it. Promotion classes defined after ``enable`` are not wrapped.
+
+Each thread records into counters and histograms of its own, so
+instrumented threads never contend on a lock; the shards are merged when
+results are exported with ``snapshot()`` as a dict or ``prometheus()`` in
+the Prometheus text format. ``SamplingProfiler`` is an optional background
+sampler of every thread's stack for finding where the time goes inside an
+operation.
+"""
+
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pricing import pricing_cache
+from products import Product, Promotion
+from store import Store
+
+# Histogram bucket upper bounds in nanoseconds: 1µs, 2µs, 4µs, ... ~1s
+BUCKET_BOUNDS = [1000 * 2 ** power for power in range(21)]
+
+# (base class, method, operation name); every class in the hierarchy defining the method is wrapped
+_TARGETS = [
+    (Store, "order", "store_order"),
+    (Store, "order_many", "store_order_many"),
+    (Store, "quote", "store_quote"),
+    (Product, "_take_stock", "product_take_stock"),
+    (Promotion, "apply_promotion_cents", "promotion_apply"),
+]
+
+
+def _class_tree(base: type) -> List[type]:
+    """
+    Lists a class and all of its subclasses.
+
+    :param base: The class
+    :return: The class followed by every subclass, depth first
+    """
+    classes = [base]
+    for subclass in base.__subclasses__():
+        classes.extend(_class_tree(subclass))
+    return classes
+
+
+class Histogram:
+    """Latency distribution over fixed power-of-two buckets."""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        """Initializes an empty histogram."""
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)  # The last bucket is unbounded
+        self.count = 0
+        self.total = 0
+
+    def observe(self, nanoseconds: int):
+        """
+        Records one latency.
+
+        :param nanoseconds: The latency
+        """
+        self.counts[bisect_left(BUCKET_BOUNDS, nanoseconds)] += 1
+        self.count += 1
+        self.total += nanoseconds
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Estimates a percentile as the upper bound of the bucket holding it.
+
+        :param fraction: The percentile as a fraction, e.g. 0.99
+        :return: The latency in microseconds, or infinity if it is beyond the last bucket
+        """
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound / 1000
+        return float("inf")
+
+    def merge(self, other: "Histogram"):
+        """
+        Adds the latencies recorded by another histogram.
+
+        :param other: The histogram to add
+        """
+        counts = list(other.counts)  # Copied at once, the owning thread may be recording
+        for index, count in enumerate(counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+
+
+class _Shard:
+    """The counters and histograms recorded by one thread."""
+
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        """Initializes an empty shard."""
+        self.counters: Dict[Tuple[str, str], int] = {}
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+
+
+class Metrics:
+    """Counters and latency histograms of the instrumented operations."""
+
+    def __init__(self):
+        """Initializes disabled, empty metrics."""
+        self._shards: List[_Shard] = []
+        self._local = threading.local()  # The calling thread's shard
+        self._originals: List[Tuple[type, str, Callable]] = []
+        self._lock = threading.Lock()  # Guards the shard list and the wrapped methods
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Get whether the hot paths are instrumented.
+
+        :return: True if instrumentation is on
+        """
+        return bool(self._originals)
+
+    def enable(self):
+        """Wraps the instrumented methods in timing wrappers."""
+        with self._lock:
+            if self._originals:
+                return
+            for base, method, operation in _TARGETS:
+                for cls in _class_tree(base):
+                    original = cls.__dict__.get(method)
+                    if original is not None:
+                        self._originals.append((cls, method, original))
+                        setattr(cls, method, self._timed(original, operation))
+
+    def disable(self):
+        """Restores the original methods; recorded metrics are kept."""
+        with self._lock:
+            for cls, method, original in reversed(self._originals):
+                setattr(cls, method, original)
+            self._originals = []
+
+    def reset(self):
+        """Drops every recorded counter and histogram."""
+        with self._lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+    def _shard(self) -> _Shard:
+        """
+        Gets the calling thread's shard, registering it on first use.
+
+        :return: The shard
+        """
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _merged(self) -> Tuple[Dict[Tuple[str, str], int], Dict[Tuple[str, str], Histogram]]:
+        """
+        Adds up the shards of every thread.
+
+        :return: The counters and histograms
+        """
+        counters: Dict[Tuple[str, str], int] = {}
+        histograms: Dict[Tuple[str, str], Histogram] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, histogram in list(shard.histograms.items()):
+                merged = histograms.get(key)
+                if merged is None:
+                    merged = histograms[key] = Histogram()
+                merged.merge(histogram)
+        return counters, histograms
+
+    def increment(self, name: str, label: str = "", amount: int = 1):
+        """
+        Adds to a counter.
+
+        :param name: The counter name
+        :param label: The class or other label the count belongs to
+        :param amount: How much to add
+        """
+        counters = self._shard().counters
+        counters[(name, label)] = counters.get((name, label), 0) + amount
+
+    def observe(self, name: str, label: str, nanoseconds: int):
+        """
+        Records a latency in a histogram.
+
+        :param name: The operation name
+        :param label: The class or other label the latency belongs to
+        :param nanoseconds: The latency
+        """
+        histograms = self._shard().histograms
+        histogram = histograms.get((name, label))
+        if histogram is None:
+            histogram = histograms[(name, label)] = Histogram()
+        histogram.observe(nanoseconds)
+
+    def _timed(self, original: Callable, operation: str) -> Callable:
+        """
+        Builds the timing wrapper of a method.
+
+        The label of each call is the class of the object it was called on.
+
+        :param original: The method
+        :param operation: The operation name its latencies are recorded under
+        :return: The wrapper
+        """
+        clock = time.perf_counter_ns
+        observe, increment = self.observe, self.increment
+
+        @wraps(original)
+        def timed(instance, *args, **kwargs):
+            started = clock()
+            try:
+                return original(instance, *args, **kwargs)
+            except ValueError:
+                increment(f"{operation}_errors", type(instance).__name__)
+                raise
+            finally:
+                observe(operation, type(instance).__name__, clock() - started)
+
+        return timed
+
+    def snapshot(self) -> dict:
+        """
+        Returns the recorded metrics.
+
+        :return: Counters, histograms (count, total and percentiles in
+                 microseconds, bucket counts) and pricing cache statistics
+        """
+        merged_counters, merged_histograms = self._merged()
+        counters = {f"{name}[{label}]" if label else name: value
+                    for (name, label), value in merged_counters.items()}
+        histograms = {
+            f"{name}[{label}]": {
+                "count": histogram.count,
+                "total_us": histogram.total / 1000,
+                "p50_us": histogram.percentile(0.50),
+                "p99_us": histogram.percentile(0.99),
+                "buckets": list(histogram.counts),
+            }
+            for (name, label), histogram in merged_histograms.items()
+        }
+        return {"enabled": self.enabled, "counters": counters, "histograms": histograms,
+                "pricing_cache": {"hits": pricing_cache.hits, "misses": pricing_cache.misses,
+                                  "size": len(pricing_cache)}}
+
+    def prometheus(self) -> str:
+        """
+        Renders the recorded metrics in the Prometheus text exposition format.
+
+        :return: The metrics text
+        """
+        lines = []
+        merged_counters, merged_histograms = self._merged()
+        counters = sorted(merged_counters.items())
+        histograms = sorted(merged_histograms.items(), key=lambda item: item[0])
+        for (name, label), value in counters:
+            lines.append(f"# TYPE {name}_total counter")
+            lines.append(f'{name}_total{{type="{label}"}} {value}')
+        declared = set()
+        for (name, label), histogram in histograms:
+            if name not in declared:
+                lines.append(f"# TYPE {name}_seconds histogram")
+                declared.add(name)
+            cumulative = 0
+            for bound, count in zip(BUCKET_BOUNDS, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_seconds_bucket{{type="{label}",le="{bound / 1e9:g}"}} '
+                             f'{cumulative}')
+            lines.append(f'{name}_seconds_bucket{{type="{label}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_seconds_sum{{type="{label}"}} {histogram.total / 1e9:g}')
+            lines.append(f'{name}_seconds_count{{type="{label}"}} {histogram.count}')
+        lines.append("# TYPE pricing_cache_hits_total counter")
+        lines.append(f"pricing_cache_hits_total {pricing_cache.hits}")
+        lines.append("# TYPE pricing_cache_misses_total counter")
+        lines.append(f"pricing_cache_misses_total {pricing_cache.misses}")
+        return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """Samples the stacks of every other thread at a fixed interval."""
+
+    def __init__(self, interval: float = 0.001, max_depth: int = 32):
+        """
+        Initializes the profiler.
+
+        :param interval: Seconds between samples
+        :param max_depth: Deepest number of frames kept per sample
+        """
+        self._interval = interval
+        self._max_depth = max_depth
+        self._stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Starts sampling."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops sampling; collected samples are kept."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "SamplingProfiler":
+        """Start sampling for the duration of a with statement."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop sampling when leaving a with statement."""
+        self.stop()
+
+    def _run(self):
+        """Takes samples until stopped."""
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self._interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self._max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rpartition('/')[2]}:{code.co_name}")
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """
+        Renders the samples as collapsed stacks, the input format of flame graph tools.
+
+        :return: One "frame;frame;frame count" line per distinct stack
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def top(self, count: int = 10) -> List[Tuple[str, int]]:
+        """
+        Returns the functions most often seen running.
+
+        :param count: How many functions to return
+        :return: (function, samples) pairs, most sampled first
+        """
+        leaves = Counter()
+        for stack, samples in self._stacks.items():
+            leaves[stack.rpartition(";")[2]] += samples
+        return leaves.most_common(count)
+
+
+# Shared by every store
+metrics = Metrics()
@@ -0,0 +1,71 @@
+"""
+Fixed-point money arithmetic.
+
+Prices are stored and computed as integer cents. Amounts enter and leave
+the public API as ordinary numbers in currency units: ``to_cents`` converts
+them on the way in, rounding half up to the nearest cent, and ``from_cents``
+on the way out, which is exact for every amount a float can tell apart from
+its neighbours. Everything in between, including promotions and order
+totals, is integer arithmetic, so totals never drift no matter how many
+lines they add up.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+from functools import lru_cache
+from typing import Tuple, Union
+
+Amount = Union[int, float, Decimal, str]
+
+
+def to_cents(amount: Amount) -> int:
+    """
+    Converts an amount in currency units to cents, rounding half up.
+
+    Floats are converted through their shortest decimal representation, so
+    249.99 becomes 24999 cents rather than whatever its binary value rounds to.
+
+    :param amount: The amount, e.g. 249.99, 1450 or "19.95"
+    :return: The amount in cents
+    """
+    if isinstance(amount, int):
+        return amount * 100
+    if isinstance(amount, float):
+        amount = repr(amount)
+    return int((Decimal(amount) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> float:
+    """
+    Converts cents to an amount in currency units.
+
+    :param cents: The amount in cents
+    :return: The amount, correctly rounded to the nearest float
+    """
+    return cents / 100
+
+
+def scale(cents: int, numerator: int, denominator: int) -> int:
+    """
+    Multiplies an amount by a fraction, rounding half up to the nearest cent.
+
+    :param cents: The amount in cents, not negative
+    :param numerator: The fraction's numerator, not negative
+    :param denominator: The fraction's denominator, positive
+    :return: The scaled amount in cents
+    """
+    return (2 * cents * numerator + denominator) // (2 * denominator)
+
+
+@lru_cache(maxsize=256)
+def remaining_fraction(percent: Amount) -> Tuple[int, int]:
+    """
+    Returns the share of a price left after a percentage discount, as a fraction.
+
+    :param percent: The discount percentage, e.g. 30 or 12.5
+    :return: (numerator, denominator) of ``1 - percent / 100`` in lowest terms
+    """
+    if isinstance(percent, float):
+        percent = repr(percent)
+    remaining = 1 - Fraction(percent) / 100
+    return remaining.numerator, remaining.denominator
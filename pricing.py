@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+
+class PricingCache:
+    """
+    Bounded LRU cache of promotion prices.
+
+    Entries are keyed on (promotion key, unit price, quantity), where the
+    promotion key captures the promotion's type and parameters, so a cached
+    price is only ever reused for an identical calculation. Entries are also
+    grouped by (promotion key, unit price) so that a product changing its
+    price or promotion can drop the entries it no longer needs.
+
+    Lookups take no lock: each dict operation they make is atomic under the
+    GIL, so concurrent orders and quotes never queue behind one another here.
+    Only ``put``, ``invalidate`` and ``clear``, which add or remove entries,
+    serialize on the lock. The hit and miss counters are updated without it
+    and may undercount slightly under contention.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        Initializes an empty cache.
+
+        :param maxsize: Maximum number of cached prices; 0 disables caching
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[Hashable, float, int], float]" = OrderedDict()
+        self._groups: Dict[Tuple[Hashable, float], Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of cached prices."""
+        return len(self._entries)
+
+    def get(self, promotion_key: Hashable, price: float, quantity: int) -> Optional[float]:
+        """
+        Looks up a cached price and marks it as recently used.
+
+        :param promotion_key: The promotion's cache key
+        :param price: The unit price
+        :param quantity: The quantity
+        :return: The cached total price, or None on a miss
+        """
+        key = (promotion_key, price, quantity)
+        total_price = self._entries.get(key)
+        if total_price is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            pass  # Evicted or invalidated since the read; the price is still correct
+        return total_price
+
+    def put(self, promotion_key: Hashable, price: float, quantity: int, total_price: float):
+        """
+        Stores a price, evicting the least recently used entry when full.
+
+        :param promotion_key: The promotion's cache key
+        :param price: The unit price
+        :param quantity: The quantity
+        :param total_price: The total price to cache
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[(promotion_key, price, quantity)] = total_price
+            self._groups.setdefault((promotion_key, price), set()).add(quantity)
+            while len(self._entries) > self.maxsize:
+                (old_promotion_key, old_price, old_quantity), _ = self._entries.popitem(last=False)
+                self._discard_from_group(old_promotion_key, old_price, old_quantity)
+
+    def invalidate(self, promotion_key: Hashable, price: float):
+        """
+        Drops every cached price for a promotion at a given unit price.
+
+        :param promotion_key: The promotion's cache key
+        :param price: The unit price
+        """
+        with self._lock:
+            for quantity in self._groups.pop((promotion_key, price), ()):
+                self._entries.pop((promotion_key, price, quantity), None)
+
+    def clear(self):
+        """Drops every entry and resets the hit and miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _discard_from_group(self, promotion_key: Hashable, price: float, quantity: int):
+        """
+        Removes an evicted entry from its group. Callers must hold the lock.
+
+        :param promotion_key: The promotion's cache key
+        :param price: The unit price
+        :param quantity: The quantity
+        """
+        group = self._groups[(promotion_key, price)]
+        group.discard(quantity)
+        if not group:
+            del self._groups[(promotion_key, price)]
+
+
+# Shared by every product
+pricing_cache = PricingCache()
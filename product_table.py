@@ -0,0 +1,224 @@
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+NO_MAXIMUM = -1  # Stored in the maximum column for products without a purchase limit
+
+
+class ProductTable:
+    """
+    Columnar storage for product state.
+
+    Each product occupies one row: prices, quantities, reserved quantities,
+    purchase limits, promotion ids and product classes live in typed arrays,
+    active flags in a bitmap, and promotions and classes themselves in small
+    registries indexed by id. ``Product`` objects are thin views holding only a
+    reference to their table and row.
+
+    The numeric columns may also be writable memoryviews (for example over
+    a memory-mapped snapshot); they are converted to arrays the first time
+    the table needs to grow.
+    """
+
+    def __init__(self):
+        """Initializes an empty table."""
+        self.names: List[Optional[str]] = []  # None marks a free row
+        self.skus: List[Optional[str]] = []
+        self.displays: List[Optional[str]] = []  # Cached display string of each row, None when stale
+        self.prices = array("q")  # Integer cents
+        self.quantities = array("q")
+        self.held = array("q")  # Units set aside by unexpired reservations
+        self.maximums = array("q")
+        self.promotion_ids = array("I")
+        self.kinds = array("B")
+        self.active = bytearray()  # One bit per row
+        self.promotions: List = [None]  # Promotion id 0 means no promotion
+        self._promotion_ids: Dict = {}
+        self.kind_types: List[type] = []  # Product class of each kind id
+        self._kind_ids: Dict[type, int] = {}
+        self._free: List[int] = []
+        self._lock = threading.Lock()  # Guards row allocation and the promotion registry
+
+    def __len__(self) -> int:
+        """Return the number of rows in use."""
+        return len(self.names) - len(self._free)
+
+    def allocate(self, kind: type, name: str, sku: Optional[str], price: int, quantity: int,
+                 maximum: int = NO_MAXIMUM, active: bool = True, promotion=None) -> int:
+        """
+        Stores a new product row, reusing a free row when there is one.
+
+        :param kind: The product class
+        :param name: The product name
+        :param sku: The product SKU or None
+        :param price: The product price in cents
+        :param quantity: The product quantity
+        :param maximum: The purchase limit per order, or NO_MAXIMUM
+        :param active: The active status
+        :param promotion: The promotion applied to the product or None
+        :return: The row index
+        """
+        promotion_id = self.promotion_id(promotion)
+        kind_id = self.kind_id(kind)
+        with self._lock:
+            if self._free:
+                row = self._free.pop()
+                self.names[row] = name
+                self.skus[row] = sku
+                self.displays[row] = None
+                self.prices[row] = price
+                self.quantities[row] = quantity
+                self.held[row] = 0
+                self.maximums[row] = maximum
+                self.promotion_ids[row] = promotion_id
+                self.kinds[row] = kind_id
+            else:
+                self._make_growable()
+                row = len(self.names)
+                self.names.append(name)
+                self.skus.append(sku)
+                self.displays.append(None)
+                self.prices.append(price)
+                self.quantities.append(quantity)
+                self.held.append(0)
+                self.maximums.append(maximum)
+                self.promotion_ids.append(promotion_id)
+                self.kinds.append(kind_id)
+                if row >> 3 == len(self.active):
+                    self.active.append(0)
+        self.set_active(row, active)
+        return row
+
+    def allocate_many(self, kinds: List[type], names: List[str], skus: List[Optional[str]],
+                      prices: List[int], quantities: List[int], maximums: List[int],
+                      actives: List[bool]) -> range:
+        """
+        Appends many product rows without promotions in one step.
+
+        Free rows are not reused, so the new rows are contiguous.
+
+        :param kinds: The product class of each row
+        :param names: The product names
+        :param skus: The product SKUs or None
+        :param prices: The product prices in cents
+        :param quantities: The product quantities
+        :param maximums: The purchase limits per order, or NO_MAXIMUM
+        :param actives: The active statuses
+        :return: The new row indexes
+        """
+        kind_ids = [self.kind_id(kind) for kind in kinds]
+        count = len(names)
+        with self._lock:
+            self._make_growable()
+            start = len(self.names)
+            self.names.extend(names)
+            self.skus.extend(skus)
+            self.displays.extend([None] * count)
+            self.prices.extend(prices)
+            self.quantities.extend(quantities)
+            self.held.extend([0] * count)
+            self.maximums.extend(maximums)
+            self.promotion_ids.extend([0] * count)
+            self.kinds.extend(kind_ids)
+            self.active.extend(bytes(((start + count + 7) >> 3) - len(self.active)))
+            active = self.active
+            for row, is_active in enumerate(actives, start):
+                if is_active:
+                    active[row >> 3] |= 1 << (row & 7)
+        return range(start, start + count)
+
+    def release(self, row: int):
+        """
+        Frees a row so it can be reused.
+
+        :param row: The row index
+        """
+        with self._lock:
+            self.names[row] = None
+            self.skus[row] = None
+            self.displays[row] = None
+            self.promotion_ids[row] = 0
+            self._free.append(row)
+
+    def is_active(self, row: int) -> bool:
+        """
+        Reads the active flag of a row.
+
+        :param row: The row index
+        :return: The active status
+        """
+        return bool(self.active[row >> 3] & (1 << (row & 7)))
+
+    def set_active(self, row: int, active: bool):
+        """
+        Writes the active flag of a row.
+
+        :param row: The row index
+        :param active: The new active status
+        """
+        with self._lock:  # Neighbouring rows share a byte
+            if active:
+                self.active[row >> 3] |= 1 << (row & 7)
+            else:
+                self.active[row >> 3] &= ~(1 << (row & 7)) & 0xFF
+
+    def promotion_id(self, promotion) -> int:
+        """
+        Returns the id of a promotion, registering it on first use.
+
+        :param promotion: The promotion or None
+        :return: The promotion id (0 for None)
+        """
+        if promotion is None:
+            return 0
+        promotion_id = self._promotion_ids.get(promotion)
+        if promotion_id is None:
+            with self._lock:
+                promotion_id = self._promotion_ids.get(promotion)
+                if promotion_id is None:
+                    promotion_id = len(self.promotions)
+                    self.promotions.append(promotion)
+                    self._promotion_ids[promotion] = promotion_id
+        return promotion_id
+
+    def kind_id(self, kind: type) -> int:
+        """
+        Returns the id of a product class, registering it on first use.
+
+        :param kind: The product class
+        :return: The kind id
+        """
+        kind_id = self._kind_ids.get(kind)
+        if kind_id is None:
+            with self._lock:
+                kind_id = self._kind_ids.get(kind)
+                if kind_id is None:
+                    kind_id = len(self.kind_types)
+                    self.kind_types.append(kind)
+                    self._kind_ids[kind] = kind_id
+        return kind_id
+
+    def rows(self) -> List[int]:
+        """
+        Lists the rows in use.
+
+        :return: Row indexes in ascending order
+        """
+        names = self.names
+        return [row for row in range(len(names)) if names[row] is not None]
+
+    def _make_growable(self):
+        """Converts memoryview columns into arrays so rows can be appended. Callers must hold the lock."""
+        for column, typecode in (("prices", "q"), ("quantities", "q"), ("held", "q"),
+                                 ("maximums", "q"), ("promotion_ids", "I"), ("kinds", "B")):
+            values = getattr(self, column)
+            if not isinstance(values, array):
+                converted = array(typecode)
+                converted.frombytes(values.cast("B"))
+                setattr(self, column, converted)
+        if not isinstance(self.active, bytearray):
+            self.active = bytearray(self.active)
+
+
+# Products that do not belong to a store keep their state here
+default_table = ProductTable()
@@ -1,5 +1,81 @@
+import threading
 from abc import ABC, abstractmethod
-from typing import Optional
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional
+
+from money import from_cents, remaining_fraction, to_cents
+from pricing import pricing_cache
+from product_table import ProductTable, default_table
+
+# Product state is guarded by a fixed pool of re-entrant locks ("lock striping"):
+# every product maps to one stripe by name, so memory stays constant no matter
+# how many products exist, while unrelated products rarely contend.
+LOCK_STRIPES = 64
+_locks = tuple(threading.RLock() for _ in range(LOCK_STRIPES))
+
+
+def _stripe(product) -> int:
+    """
+    Returns the index of the lock stripe guarding a product.
+
+    :param product: The product to look up
+    :return: The stripe index
+    """
+    return hash(product.name) % LOCK_STRIPES
+
+
+def format_price(price: float) -> str:
+    """
+    Formats a price for display, dropping the fraction of whole amounts.
+
+    :param price: The price to format
+    :return: The formatted price, e.g. "1450" or "249.99"
+    """
+    return str(int(price)) if price.is_integer() else str(price)
+
+
+@contextmanager
+def locked_all() -> Iterator[None]:
+    """Holds every lock stripe, pausing all stock and status changes."""
+    for lock in _locks:
+        lock.acquire()
+    try:
+        yield
+    finally:
+        for lock in reversed(_locks):
+            lock.release()
+
+
+@contextmanager
+def locked(products: Iterable) -> Iterator[None]:
+    """
+    Holds the locks of several products at once.
+
+    Stripes are acquired in ascending index order, so concurrent callers
+    locking overlapping sets of products can never deadlock.
+
+    :param products: The products to lock
+    """
+    stripes = sorted({_stripe(product) for product in products})
+    for index in stripes:
+        _locks[index].acquire()
+    try:
+        yield
+    finally:
+        for index in reversed(stripes):
+            _locks[index].release()
+
+
+def _cents_of_apply_promotion(promotion, product, quantity: int) -> int:
+    """
+    Prices a promotion that only implements ``apply_promotion``, rounded to the cent.
+
+    :param promotion: The promotion
+    :param product: The product to apply the promotion to
+    :param quantity: The quantity of the product
+    :return: The discounted price in cents
+    """
+    return to_cents(promotion.apply_promotion(product, quantity))
 
 
 class Promotion(ABC):
@@ -14,7 +90,28 @@ class Promotion(ABC):
         self.name = name
         self._active = True  # Use _active to avoid shadowing is_active property
 
+    def __init_subclass__(cls, **kwargs):
+        """
+        Lets promotions written before prices were kept in cents override only
+        ``apply_promotion``: their price is then rounded to the cent for
+        ``apply_promotion_cents``. Subclasses overriding neither stay abstract.
+        """
+        super().__init_subclass__(**kwargs)
+        if "apply_promotion" in cls.__dict__ and \
+                getattr(cls.apply_promotion_cents, "__isabstractmethod__", False):
+            cls.apply_promotion_cents = _cents_of_apply_promotion
+
     @abstractmethod
+    def apply_promotion_cents(self, product, quantity: int) -> int:
+        """
+        Applies the promotion to the given product and quantity in integer cents.
+
+        :param product: The product to apply the promotion to
+        :param quantity: The quantity of the product
+        :return: The discounted price in cents
+        """
+        pass
+
     def apply_promotion(self, product, quantity: int) -> float:
         """
         Applies the promotion to the given product and quantity.
@@ -23,7 +120,42 @@ class Promotion(ABC):
         :param quantity: The quantity of the product
         :return: The discounted price
         """
-        pass
+        return from_cents(self.apply_promotion_cents(product, quantity))
+
+    def apply_promotion_batch_cents(self, product, quantities: List[int]) -> List[int]:
+        """
+        Applies the promotion to many quantities of the same product at once.
+
+        Subclasses override this with a single expression over the whole
+        batch; every element must equal ``apply_promotion_cents(product, quantity)``.
+
+        :param product: The product to apply the promotion to
+        :param quantities: The quantities to price
+        :return: The discounted price of each quantity in cents
+        """
+        return [self.apply_promotion_cents(product, quantity) for quantity in quantities]
+
+    def apply_promotion_batch(self, product, quantities: List[int]) -> List[float]:
+        """
+        Applies the promotion to many quantities of the same product at once.
+
+        :param product: The product to apply the promotion to
+        :param quantities: The quantities to price
+        :return: The discounted price of each quantity
+        """
+        return [from_cents(cents) for cents in self.apply_promotion_batch_cents(product, quantities)]
+
+    def cache_key(self):
+        """
+        Returns a hashable key identifying this promotion's pricing rule.
+
+        Promotions whose price depends only on the unit price, the quantity
+        and the key may have their results cached; the default of None
+        means the promotion is never cached.
+
+        :return: The cache key or None
+        """
+        return None
 
     def __str__(self):
         """Return the string representation of the promotion."""
@@ -43,76 +175,201 @@ class PercentDiscount(Promotion):
         super().__init__(name)
         self.percent = percent
 
-    def apply_promotion(self, product, quantity: int) -> float:
+    def apply_promotion_cents(self, product, quantity: int) -> int:
         """
-        Applies a percentage discount to the total price.
+        Applies a percentage discount to the total price, rounding half up to the cent.
 
         :param product: The product to apply the promotion to
         :param quantity: The quantity of the product
-        :return: The discounted price
+        :return: The discounted price in cents
         """
-        return product.price * quantity * (1 - self.percent / 100)
+        numerator, denominator = remaining_fraction(self.percent)
+        return (2 * product.price_cents * quantity * numerator + denominator) // (2 * denominator)
+
+    def apply_promotion_batch_cents(self, product, quantities: List[int]) -> List[int]:
+        """
+        Applies the percentage discount to a batch of quantities.
+
+        :param product: The product to apply the promotion to
+        :param quantities: The quantities to price
+        :return: The discounted price of each quantity in cents
+        """
+        price = product.price_cents
+        numerator, denominator = remaining_fraction(self.percent)
+        numerator, denominator = 2 * price * numerator, 2 * denominator
+        half = denominator // 2
+        return [(quantity * numerator + half) // denominator for quantity in quantities]
+
+    def cache_key(self):
+        """
+        Returns a key made of the promotion type and its percentage.
+
+        :return: The cache key
+        """
+        return type(self), self.percent
 
 
 class SecondHalfPrice(Promotion):
     """Promotion that applies 'Second Item at Half Price' discount."""
 
-    def apply_promotion(self, product, quantity: int) -> float:
+    def apply_promotion_cents(self, product, quantity: int) -> int:
         """
         Applies the 'Second Item at Half Price' discount.
 
+        The half-price items are halved together and rounded half up to the cent.
+
         :param product: The product to apply the promotion to
         :param quantity: The quantity of the product
-        :return: The discounted price
+        :return: The discounted price in cents
         """
+        price = product.price_cents
         full_price_items = quantity // 2 + quantity % 2
         half_price_items = quantity // 2
-        return (full_price_items * product.price) + (half_price_items * product.price * 0.5)
+        return full_price_items * price + (half_price_items * price + 1) // 2
+
+    def apply_promotion_batch_cents(self, product, quantities: List[int]) -> List[int]:
+        """
+        Applies the 'Second Item at Half Price' discount to a batch of quantities.
+
+        :param product: The product to apply the promotion to
+        :param quantities: The quantities to price
+        :return: The discounted price of each quantity in cents
+        """
+        price = product.price_cents
+        return [(quantity // 2 + quantity % 2) * price + (quantity // 2 * price + 1) // 2
+                for quantity in quantities]
+
+    def cache_key(self):
+        """
+        Returns a key made of the promotion type, which has no parameters.
+
+        :return: The cache key
+        """
+        return type(self),
 
 
 class ThirdOneFree(Promotion):
     """Promotion that applies 'Buy 2, Get 1 Free' discount."""
 
-    def apply_promotion(self, product, quantity: int) -> float:
+    def apply_promotion_cents(self, product, quantity: int) -> int:
         """
         Applies the 'Buy 2, Get 1 Free' discount.
 
         :param product: The product to apply the promotion to
         :param quantity: The quantity of the product
-        :return: The discounted price
+        :return: The discounted price in cents
         """
         payable_items = quantity - (quantity // 3)
-        return payable_items * product.price
+        return payable_items * product.price_cents
+
+    def apply_promotion_batch_cents(self, product, quantities: List[int]) -> List[int]:
+        """
+        Applies the 'Buy 2, Get 1 Free' discount to a batch of quantities.
+
+        :param product: The product to apply the promotion to
+        :param quantities: The quantities to price
+        :return: The discounted price of each quantity in cents
+        """
+        price = product.price_cents
+        return [(quantity - (quantity // 3)) * price for quantity in quantities]
+
+    def cache_key(self):
+        """
+        Returns a key made of the promotion type, which has no parameters.
+
+        :return: The cache key
+        """
+        return type(self),
 
 
 class Product:
-    """Base class for all products in the store."""
+    """
+    Base class for all products in the store.
+
+    A product is a lightweight view over one row of a ``ProductTable``; its
+    name, price (in integer cents), quantity, status and promotion are stored in the table's
+    columns. Products start out in the shared default table and move into a
+    store's table when they are added to it.
+    """
+
+    __slots__ = ("_table", "_row", "_observers")
 
-    def __init__(self, name: str, price: float, quantity: int):
+    def __init__(self, name: str, price: float, quantity: int, sku: Optional[str] = None):
         """
         Initializes a new product with name, price, and quantity.
 
         :param name: The name of the product
         :param price: The price of the product
         :param quantity: The initial quantity of the product
-        :raises ValueError: If name is empty, price or quantity is negative
+        :param sku: Optional stock keeping unit identifying the product
+        :raises ValueError: If name is empty, price or quantity is negative, or
+                            quantity is not a whole number
         """
         if not name:
             raise ValueError("Product name cannot be empty.")
         if price < 0:
             raise ValueError("Product price cannot be negative.")
+        if not isinstance(quantity, int):
+            raise ValueError("Product quantity must be a whole number.")
         if quantity < 0:
             raise ValueError("Product quantity cannot be negative.")
 
-        self._name = name
-        self._price = price
-        self._quantity = quantity
-        self._active = True  # Product is active when created
-        self._promotion: Optional[Promotion] = None  # Default: No promotion
-
-        # Deactivate product if quantity is 0
-        if quantity == 0:
-            self.deactivate()
+        # Product is active when created, unless there is nothing in stock
+        self._table = default_table
+        self._row = default_table.allocate(type(self), name, sku, to_cents(price), quantity,
+                                           active=quantity > 0)
+        self._observers = ()  # Stores notified when stock or status changes
+
+    @staticmethod
+    def _view(table: ProductTable, row: int, observers: tuple = ()) -> "Product":
+        """
+        Creates the product object for an existing table row.
+
+        The row's recorded product class is used, so the view behaves
+        exactly like the product that was stored there.
+
+        :param table: The table holding the row
+        :param row: The row index
+        :param observers: The observers to subscribe
+        :return: The product
+        """
+        product = object.__new__(table.kind_types[table.kinds[row]])
+        product._table = table
+        product._row = row
+        product._observers = observers
+        return product
+
+    def __reduce__(self):
+        """Pickle the product's values rather than its table and row."""
+        table, row = self._table, self._row
+        return _restore_product, (type(self), table.names[row], table.skus[row], table.prices[row],
+                                  table.quantities[row], table.maximums[row],
+                                  table.is_active(row), self.promotion)
+
+    def __del__(self):
+        """Frees the product's row once nothing refers to the product any more."""
+        table = getattr(self, "_table", None)
+        if table is not None:
+            table.release(self._row)
+
+    def _move_to(self, table: ProductTable):
+        """
+        Moves the product's row into another table, keeping its identity.
+
+        :param table: The table that will hold the product from now on
+        """
+        if table is self._table:
+            return
+        with self._lock:
+            old_table, old_row = self._table, self._row
+            self._row = table.allocate(
+                type(self), old_table.names[old_row], old_table.skus[old_row],
+                old_table.prices[old_row], old_table.quantities[old_row],
+                old_table.maximums[old_row], old_table.is_active(old_row),
+                old_table.promotions[old_table.promotion_ids[old_row]])
+            table.held[self._row] = old_table.held[old_row]
+            self._table = table
+            old_table.release(old_row)
 
     @property
     def name(self) -> str:
@@ -121,7 +378,16 @@ class Product:
 
         :return: The product name
         """
-        return self._name
+        return self._table.names[self._row]
+
+    @property
+    def sku(self) -> Optional[str]:
+        """
+        Get the stock keeping unit of the product (read-only).
+
+        :return: The product SKU or None if the product has none
+        """
+        return self._table.skus[self._row]
 
     @property
     def price(self) -> float:
@@ -130,13 +396,30 @@ class Product:
 
         :return: The product price
         """
-        return self._price
+        return from_cents(self._table.prices[self._row])
 
     @price.setter
     def price(self, new_price: float):
         if new_price < 0:
             raise ValueError("Product price cannot be negative.")
-        self._price = new_price
+        new_price = to_cents(new_price)
+        with self._lock:
+            table, row = self._table, self._row
+            old_price = table.prices[row]
+            self._forget_prices(table.promotions[table.promotion_ids[row]], old_price)
+            table.prices[row] = new_price
+            table.displays[row] = None
+            for observer in self._observers:  # Under the lock, so observers see changes in order
+                observer.price_changed(self, old_price)
+
+    @property
+    def price_cents(self) -> int:
+        """
+        Get the price of the product in integer cents (read-only).
+
+        :return: The product price in cents
+        """
+        return self._table.prices[self._row]
 
     @property
     def quantity(self) -> int:
@@ -145,28 +428,101 @@ class Product:
 
         :return: The product quantity
         """
-        return self._quantity
+        return self._table.quantities[self._row]
 
     @quantity.setter
     def quantity(self, new_quantity: int):
+        if not isinstance(new_quantity, int):
+            raise ValueError("Quantity must be a whole number.")
         if new_quantity < 0:
             raise ValueError("Quantity cannot be negative.")
-        self._quantity = new_quantity
-        if self._quantity == 0:
-            self.deactivate()
+        with self._lock:
+            if new_quantity < self._table.held[self._row]:
+                raise ValueError("Quantity cannot be less than the reserved quantity.")
+            self._write_quantity(new_quantity)
+
+    # 🛒 Reserved and available stock (read-only)
+    @property
+    def held(self) -> int:
+        """
+        Get the quantity set aside by unexpired reservations (read-only).
+
+        :return: The reserved quantity
+        """
+        return self._table.held[self._row]
+
+    @property
+    def available(self) -> int:
+        """
+        Get the quantity that can still be bought, excluding reserved stock.
+
+        :return: The available quantity
+        """
+        table, row = self._table, self._row
+        return table.quantities[row] - table.held[row]
 
     # ✅ Property for active status (read-only)
     @property
     def is_active(self) -> bool:
-        return self._active
+        return self._table.is_active(self._row)
 
     def activate(self):
         """Activates the product."""
-        self._active = True
+        self._set_active(True)
 
     def deactivate(self):
         """Deactivates the product."""
-        self._active = False
+        self._set_active(False)
+
+    def _set_active(self, active: bool):
+        """
+        Changes the active status and notifies observers.
+
+        :param active: The new active status
+        """
+        with self._lock:
+            old_active = self.is_active
+            self._table.set_active(self._row, active)
+            self._notify(self.quantity, old_active)
+
+    @property
+    def _lock(self) -> threading.RLock:
+        """The lock stripe guarding this product's stock and status."""
+        return _locks[_stripe(self)]
+
+    def subscribe(self, observer):
+        """
+        Registers an observer to be told about stock, status and price changes.
+
+        The observer's ``product_changed(product, old_quantity, old_active)``
+        method is called after every change to quantity or active status, and
+        its ``price_changed(product, old_price)`` method, with the old price in
+        cents, after every price change.
+
+        :param observer: The object to notify
+        """
+        self._observers += (observer,)
+
+    def unsubscribe(self, observer):
+        """
+        Removes a previously registered observer.
+
+        :param observer: The object to stop notifying
+        :raises ValueError: If the observer is not subscribed
+        """
+        observers = list(self._observers)
+        observers.remove(observer)
+        self._observers = tuple(observers)
+
+    def _notify(self, old_quantity: int, old_active: bool):
+        """
+        Tells every observer that quantity or active status may have changed.
+
+        :param old_quantity: The quantity before the change
+        :param old_active: The active status before the change
+        """
+        for observer in self._observers:
+            observer.product_changed(self, old_quantity, old_active)
 
     @property
     def promotion(self) -> Optional[Promotion]:
@@ -175,61 +531,215 @@ class Product:
 
         :return: The promotion object or None if no promotion is applied
         """
-        return self._promotion
+        table = self._table
+        return table.promotions[table.promotion_ids[self._row]]
 
     @promotion.setter
     def promotion(self, new_promotion: Promotion):
-        self._promotion = new_promotion
+        with self._lock:
+            table, row = self._table, self._row
+            self._forget_prices(table.promotions[table.promotion_ids[row]], table.prices[row])
+            table.promotion_ids[row] = table.promotion_id(new_promotion)
+            table.displays[row] = None
+
+    @staticmethod
+    def _forget_prices(promotion: Optional[Promotion], price: float):
+        """
+        Drops the cached prices of a promotion and unit price that are going out of use.
+
+        :param promotion: The promotion being replaced, or None
+        :param price: The unit price in cents being replaced
+        """
+        if promotion is not None:
+            promotion_key = promotion.cache_key()
+            if promotion_key is not None:
+                pricing_cache.invalidate(promotion_key, price)
 
     def buy(self, quantity: int) -> float:
         """Processes a purchase and updates the stock."""
+        with self._lock:
+            self._check_purchase(quantity)
+            return from_cents(self._purchase(quantity))
+
+    def quote(self, quantity: int) -> float:
+        """
+        Prices a purchase without buying anything.
+
+        The purchase is validated exactly like ``buy``, but stock is left
+        untouched and no lock is taken, so quotes never wait on orders.
+
+        :param quantity: The quantity to price
+        :return: The total price
+        :raises ValueError: If the purchase could not be fulfilled right now
+        """
+        self._check_purchase(quantity)
+        return from_cents(self._price_for(quantity))
+
+    def _check_purchase(self, quantity: int, claimed: int = 0):
+        """
+        Validates a purchase without changing any state.
+
+        Stock set aside by reservations is not available. Callers must hold
+        the product's lock so the check stays valid until the matching
+        ``_purchase``.
+
+        :param quantity: The quantity to buy
+        :param claimed: Stock already promised to earlier purchases not yet taken
+        :raises ValueError: If the purchase cannot be fulfilled
+        """
+        if not isinstance(quantity, int):
+            raise ValueError("Purchase quantity must be a whole number.")
         if quantity <= 0:
             raise ValueError("Purchase quantity must be greater than zero.")
-        if quantity > self._quantity:
+        table, row = self._table, self._row
+        if quantity > table.quantities[row] - table.held[row] - claimed:
             raise ValueError("Not enough stock available.")
 
-        # Apply promotion if exists
-        if self._promotion:
-            total_price = self._promotion.apply_promotion(self, quantity)
-        else:
-            total_price = self._price * quantity
-        self._quantity -= quantity
+    def _purchase(self, quantity: int) -> int:
+        """
+        Prices a validated purchase and removes it from stock.
+
+        :param quantity: The quantity to buy
+        :return: The total price in cents
+        """
+        total_price = self._price_for(quantity)
+        self._take_stock(quantity)
+        return total_price
+
+    def _price_for(self, quantity: int) -> int:
+        """
+        Prices a quantity of this product, applying its promotion if any.
+
+        :param quantity: The quantity to price
+        :return: The total price in cents
+        """
+        table, row = self._table, self._row
+        promotion = table.promotions[table.promotion_ids[row]]
+        if not promotion:
+            return table.prices[row] * quantity
+
+        # Apply promotion if exists, reusing an earlier identical calculation
+        promotion_key = promotion.cache_key()
+        if promotion_key is None:
+            return promotion.apply_promotion_cents(self, quantity)
+        price = table.prices[row]
+        total_price = pricing_cache.get(promotion_key, price, quantity)
+        if total_price is None:
+            total_price = promotion.apply_promotion_cents(self, quantity)
+            pricing_cache.put(promotion_key, price, quantity, total_price)
         return total_price
 
+    def _price_for_batch(self, quantities: List[int]) -> List[int]:
+        """
+        Prices many quantities of this product in one call.
+
+        :param quantities: The quantities to price
+        :return: The total price of each quantity in cents, as ``_price_for`` would compute it
+        """
+        table, row = self._table, self._row
+        promotion = table.promotions[table.promotion_ids[row]]
+        if promotion:
+            return promotion.apply_promotion_batch_cents(self, quantities)
+        price = table.prices[row]
+        return [price * quantity for quantity in quantities]
+
+    def _take_stock(self, quantity: int):
+        """
+        Removes a validated quantity from stock, deactivating the product when it runs out.
+
+        :param quantity: The quantity to remove; negative quantities return stock
+        """
+        self._write_quantity(self._table.quantities[self._row] - quantity)
+
+    def _write_quantity(self, new_quantity: int):
+        """
+        Stores a validated quantity, deactivating the product when it reaches zero,
+        and tells the observers. Callers must hold the product's lock.
+
+        :param new_quantity: The quantity, at least the reserved quantity
+        """
+        table, row = self._table, self._row
+        old_quantity, old_active = table.quantities[row], table.is_active(row)
+        table.quantities[row] = new_quantity
+        table.displays[row] = None
+        if new_quantity == 0:
+            table.set_active(row, False)
+        self._notify(old_quantity, old_active)
+
+    def _promo_text(self) -> str:
+        """Return the promotion part of the string representation."""
+        promotion = self.promotion
+        if promotion:
+            return f", Promotion: {promotion}"
+        return ", Promotion: None"
+
     # 📝 Magic Method: Convert to string
     def __str__(self) -> str:
-        """Return the string representation of the product."""
-        if self._promotion:
-            promo_text = f", Promotion: {self._promotion}"
-        else:
-            promo_text = ", Promotion: None"
-        return f"{self._name}, Price: ${self._price}, Quantity: {self._quantity}" + promo_text
+        """
+        Return the string representation of the product.
+
+        The string is cached in the table until the price, quantity or
+        promotion changes; it is rendered under the product's lock so a
+        concurrent change cannot leave a stale string behind.
+        """
+        table, row = self._table, self._row
+        text = table.displays[row]
+        if text is None:
+            with self._lock:
+                text = table.displays[row] = self._render()
+        return text
+
+    def _render(self) -> str:
+        """Build the string representation of the product."""
+        return f"{self.name}, Price: ${format_price(self.price)}, Quantity: {self.quantity}" + self._promo_text()
 
     # 🔼🔽 Magic Methods: Compare prices
     def __gt__(self, other) -> bool:
         """Returns True if this product is more expensive than another product."""
         if not isinstance(other, Product):
             return NotImplemented
-        return self._price > other._price
+        return self.price_cents > other.price_cents
 
     def __lt__(self, other) -> bool:
         """Returns True if this product is cheaper than another product."""
         if not isinstance(other, Product):
             return NotImplemented
-        return self._price < other._price
+        return self.price_cents < other.price_cents
+
+def _restore_product(kind: type, name: str, sku: Optional[str], price: float, quantity: int,
+                     maximum: int, active: bool, promotion: Optional[Promotion]) -> Product:
+    """
+    Recreates a pickled product in the default table.
+
+    :param kind: The product class
+    :param name: The product name
+    :param sku: The product SKU or None
+    :param price: The product price in cents
+    :param quantity: The product quantity
+    :param maximum: The purchase limit per order
+    :param active: The active status
+    :param promotion: The promotion or None
+    :return: The product
+    """
+    row = default_table.allocate(kind, name, sku, price, quantity, maximum, active, promotion)
+    return Product._view(default_table, row)
+
 
 class NonStockedProduct(Product):
     """A product that does not have a stock limit (e.g., software licenses)."""
 
-    def __init__(self, name: str, price: float):
+    __slots__ = ()
+
+    def __init__(self, name: str, price: float, sku: Optional[str] = None):
         """
         Initialize a non-stocked product with name and price.
 
         :param name: The name of the product
         :param price: The price of the product
+        :param sku: Optional stock keeping unit identifying the product
         """
-        super().__init__(name, price, quantity=0)  # Always 0 quantity
-        self._active = True  # Always active
+        super().__init__(name, price, quantity=0, sku=sku)  # Always 0 quantity
+        self._table.set_active(self._row, True)  # Always active
 
     @Product.quantity.setter
     def quantity(self, new_quantity: int):
@@ -241,31 +751,36 @@ class NonStockedProduct(Product):
         """
         raise ValueError("Non-stocked products cannot have a quantity.")
 
-    def buy(self, quantity: int) -> float:
+    def _check_purchase(self, quantity: int, claimed: int = 0):
         """
         Non-stocked products have unlimited availability.
 
         :param quantity: The quantity to buy
-        :return: The total price
+        :param claimed: Ignored, there is no stock to claim
+        :raises ValueError: If the quantity is not a whole number
         """
-        if self._promotion:
-            return self._promotion.apply_promotion(self, quantity)
-        else:
-            return self._price * quantity
+        if not isinstance(quantity, int):
+            raise ValueError("Purchase quantity must be a whole number.")
 
-    def __str__(self) -> str:
-        """Return the string representation of the non-stocked product."""
-        if self._promotion:
-            promo_text = f", Promotion: {self._promotion}"
-        else:
-            promo_text = ", Promotion: None"
-        return f"{self._name}, Price: ${self._price}, Quantity: Unlimited" + promo_text
+    def _take_stock(self, quantity: int):
+        """
+        Non-stocked products have no stock to update.
+
+        :param quantity: The quantity bought
+        """
+
+    def _render(self) -> str:
+        """Build the string representation of the non-stocked product."""
+        return f"{self.name}, Price: ${format_price(self.price)}, Quantity: Unlimited" + self._promo_text()
 
 
 class LimitedProduct(Product):
     """A product that has a purchase limit per order (e.g., shipping fee)."""
 
-    def __init__(self, name: str, price: float, quantity: int, maximum: int):
+    __slots__ = ()
+
+    def __init__(self, name: str, price: float, quantity: int, maximum: int,
+                 sku: Optional[str] = None):
         """
         Initialize a limited product with name, price, quantity, and maximum purchase limit.
 
@@ -273,26 +788,33 @@ class LimitedProduct(Product):
         :param price: The price of the product
         :param quantity: The initial quantity of the product
         :param maximum: The maximum quantity allowed per order
+        :param sku: Optional stock keeping unit identifying the product
         """
-        super().__init__(name, price, quantity)
-        self._maximum = maximum  # Maximum quantity allowed per order
+        super().__init__(name, price, quantity, sku=sku)
+        self._table.maximums[self._row] = maximum  # Maximum quantity allowed per order
 
-    def buy(self, quantity: int) -> float:
+    @property
+    def maximum(self) -> int:
+        """
+        Get the maximum quantity allowed per order (read-only).
+
+        :return: The purchase limit
+        """
+        return self._table.maximums[self._row]
+
+    def _check_purchase(self, quantity: int, claimed: int = 0):
         """
         Prevents buying more than the allowed quantity per order.
 
         :param quantity: The quantity to buy
-        :return: The total price
+        :param claimed: Stock already promised to earlier purchases not yet taken
         :raises ValueError: If quantity exceeds the maximum allowed
         """
-        if quantity > self._maximum:
-            raise ValueError(f"Error while making order! Only {self._maximum} is allowed from this product!")
-        return super().buy(quantity)
+        maximum = self._table.maximums[self._row]
+        if quantity > maximum:
+            raise ValueError(f"Error while making order! Only {maximum} is allowed from this product!")
+        super()._check_purchase(quantity, claimed)
 
-    def __str__(self) -> str:
-        """Return the string representation of the limited product."""
-        if self._promotion:
-            promo_text = f", Promotion: {self._promotion}"
-        else:
-            promo_text = ", Promotion: None"
-        return f"{self._name}, Price: ${self._price}, Limited to {self._maximum} per order!" + promo_text
+    def _render(self) -> str:
+        """Build the string representation of the limited product."""
+        return f"{self.name}, Price: ${format_price(self.price)}, Limited to {self.maximum} per order!" + self._promo_text()
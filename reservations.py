@@ -0,0 +1,137 @@
+"""
+Time-limited stock reservations.
+
+A reservation ("hold") sets stock aside for a cart: the held quantity is
+counted in the product's ``held`` column and excluded from what orders can
+buy until the hold is committed, released, or expires. Expiry runs on a
+hashed timer wheel: every hold is filed in the slot of the tick it expires
+at, and advancing the wheel only visits the slots of the ticks that have
+passed, so expiring holds costs amortized O(1) each however many are
+outstanding. Holds expire up to one tick late. The wheel is advanced by the
+store's own operations rather than by a background thread.
+"""
+
+import itertools
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from products import Product
+
+
+class Reservations:
+    """Outstanding holds of one store and the timer wheel that expires them."""
+
+    def __init__(self, tick: float = 0.1, slots: int = 4096,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initializes an empty set of holds.
+
+        Holds longer than ``tick * slots`` seconds stay in their slot for
+        more than one turn of the wheel and are passed over until due.
+
+        :param tick: Resolution of expiry in seconds
+        :param slots: Number of slots in the wheel
+        :param clock: Source of the current time in seconds
+        """
+        self._tick = tick
+        self._clock = clock
+        self._slots: List[List[Tuple[int, int]]] = [[] for _ in range(slots)]  # (due tick, hold id)
+        self._current_tick = math.floor(clock() / tick)  # Last tick whose slot was expired
+        self._holds: Dict[int, Tuple[Product, int]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()  # Guards the wheel and the holds
+
+    def __len__(self) -> int:
+        """Return the number of outstanding holds."""
+        return len(self._holds)
+
+    def reserve(self, product: Product, quantity: int, ttl: float) -> int:
+        """
+        Sets stock aside for a limited time.
+
+        :param product: The product
+        :param quantity: The quantity to hold
+        :param ttl: Seconds until the hold expires
+        :return: The hold id
+        :raises ValueError: If the quantity could not be bought right now or the TTL is not positive
+        """
+        if ttl <= 0:
+            raise ValueError("Reservation TTL must be greater than zero.")
+        due_tick = math.ceil((self._clock() + ttl) / self._tick)
+        with product._lock:
+            product._check_purchase(quantity)
+            product._table.held[product._row] += quantity
+            with self._lock:
+                hold_id = next(self._ids)
+                self._holds[hold_id] = (product, quantity)
+                self._slots[due_tick % len(self._slots)].append((due_tick, hold_id))
+        return hold_id
+
+    def take(self, hold_id: int) -> Tuple[Product, int]:
+        """
+        Ends a hold and returns its stock to the available quantity.
+
+        Callers that go on to buy the stock must hold the product's lock
+        across both steps.
+
+        :param hold_id: The hold id
+        :return: The held product and quantity
+        :raises ValueError: If there is no such hold, e.g. because it expired
+        """
+        with self._lock:
+            hold = self._holds.pop(hold_id, None)
+        if hold is None:
+            raise ValueError(f"Reservation {hold_id} does not exist or has expired.")
+        product, quantity = hold
+        with product._lock:
+            product._table.held[product._row] -= quantity
+        return hold
+
+    def product_of(self, hold_id: int) -> Product:
+        """
+        Looks up the product of a hold.
+
+        :param hold_id: The hold id
+        :return: The product
+        :raises ValueError: If there is no such hold, e.g. because it expired
+        """
+        hold = self._holds.get(hold_id)
+        if hold is None:
+            raise ValueError(f"Reservation {hold_id} does not exist or has expired.")
+        return hold[0]
+
+    def expire(self) -> int:
+        """
+        Advances the wheel to the current time, releasing every hold that is due.
+
+        :return: The number of holds that expired
+        """
+        if not self._holds:
+            return 0
+        now_tick = math.floor(self._clock() / self._tick)
+        if now_tick <= self._current_tick:
+            return 0
+        expired = []
+        with self._lock:
+            slots = self._slots
+            for tick in range(self._current_tick + 1,
+                              min(now_tick, self._current_tick + len(slots)) + 1):
+                slot = slots[tick % len(slots)]
+                if not slot:
+                    continue
+                remaining = []
+                for due_tick, hold_id in slot:
+                    if hold_id not in self._holds:
+                        continue  # Committed or released already
+                    if due_tick <= now_tick:
+                        expired.append(self._holds.pop(hold_id))
+                    else:
+                        remaining.append((due_tick, hold_id))
+                slots[tick % len(slots)] = remaining
+            self._current_tick = now_tick
+        for product, quantity in expired:
+            with product._lock:
+                product._table.held[product._row] -= quantity
+        return len(expired)
@@ -0,0 +1,234 @@
+"""
+Declarative promotion rules compiled into pricing functions.
+
+Rules are plain data, e.g. loaded from JSON::
+
+    {"type": "percent", "products": ["Laptop"], "percent": 10}
+    {"type": "buy_x_get_y", "products": ["Mouse"], "buy": 2, "free": 1}
+    {"type": "tiered", "tiers": [[10, 5], [50, 12]]}
+    {"type": "bundle", "items": {"Laptop": 1, "Mouse": 1}, "price": 990}
+
+A rule without ``products`` applies to every product. Every rule may have a
+``priority`` (higher runs first, default 0) and line rules may be
+``exclusive``: once an exclusive rule discounts a line, lower-priority rules
+are skipped for it. Otherwise line rules stack, each multiplying the line
+price by its own factor. Factors are exact fractions and a line is rounded
+to the cent only once, half up, after all of them are applied.
+
+``compile_rules`` turns the definitions into a ``RuleSet`` once: the rules of
+each product are folded into a single pricing function, constant discounts
+are multiplied together ahead of time and volume tiers become a lookup table,
+so pricing a line is one dictionary lookup and one call. A store with a rule
+set prices whole orders through it; bundles are matched across the lines of
+an order first, and the remaining units go through the line rules. Products
+no rule mentions keep their own ``Promotion``; for the others the rule set
+replaces it.
+"""
+
+from bisect import bisect_right
+from fractions import Fraction
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from money import scale, to_cents
+from products import Product
+
+LinePricer = Callable[[int, int], int]  # (unit price, quantity) -> line price, in cents
+Factor = Tuple[int, int]  # Price factor as (numerator, denominator)
+
+
+def _percent_factor(definition: dict) -> Fraction:
+    """
+    Returns the price factor of a percentage discount.
+
+    :param definition: The rule definition
+    :return: The factor, e.g. 9/10 for 10% off
+    :raises ValueError: If the percentage is not between 0 and 100
+    """
+    percent = definition["percent"]
+    if not 0 <= percent <= 100:
+        raise ValueError("Rule discount percentage must be between 0 and 100.")
+    return 1 - Fraction(repr(percent) if isinstance(percent, float) else percent) / 100
+
+
+def _quantity_step(definition: dict) -> Callable[[int], Factor]:
+    """
+    Compiles a quantity-dependent line rule into a function of the quantity.
+
+    :param definition: A ``buy_x_get_y`` or ``tiered`` rule definition
+    :return: A function returning the price factor for a quantity
+    :raises ValueError: If the definition is invalid
+    """
+    if definition["type"] == "buy_x_get_y":
+        buy, free = definition["buy"], definition["free"]
+        if buy < 1 or free < 1:
+            raise ValueError("Buy-X-get-Y rules need at least one bought and one free item.")
+        group = buy + free
+        return lambda quantity: (quantity - quantity // group * free, quantity)
+
+    tiers = sorted(definition["tiers"])
+    if not tiers or tiers[0][0] < 1:
+        raise ValueError("Tiered rules need tiers starting at a quantity of at least 1.")
+    thresholds = [minimum for minimum, _ in tiers]
+    factors = [(1, 1)] + [(factor.numerator, factor.denominator) for factor in
+                          (_percent_factor({"percent": percent}) for _, percent in tiers)]
+    return lambda quantity: factors[bisect_right(thresholds, quantity)]
+
+
+def _compile_line(definitions: List[dict]) -> LinePricer:
+    """
+    Folds the line rules of one product into a single pricing function.
+
+    Leading constant discounts are multiplied into one exact factor; the
+    function only loops over the quantity-dependent rules that follow. The
+    stacked factor is applied once, rounding half up to the cent.
+
+    :param definitions: The product's line rules, highest priority first
+    :return: The pricing function
+    """
+    factor = Fraction(1)
+    steps: List[Tuple[Callable[[int], Factor], bool]] = []
+    for definition in definitions:
+        exclusive = definition.get("exclusive", False)
+        if definition["type"] == "percent" and not steps:
+            rule_factor = _percent_factor(definition)
+            factor *= rule_factor
+            if exclusive and rule_factor < 1:
+                break  # Always applies, so nothing after it ever does
+        elif definition["type"] == "percent":
+            rule_factor = _percent_factor(definition)
+            constant = (rule_factor.numerator, rule_factor.denominator)
+            steps.append((lambda quantity, constant=constant: constant, exclusive))
+        else:
+            steps.append((_quantity_step(definition), exclusive))
+
+    numerator, denominator = factor.numerator, factor.denominator
+    if not steps:
+        doubled_numerator, doubled_denominator = 2 * numerator, 2 * denominator
+        return lambda price, quantity: ((price * quantity * doubled_numerator + denominator)
+                                        // doubled_denominator)
+
+    def price_line(price: int, quantity: int) -> int:
+        line_numerator, line_denominator = numerator, denominator
+        for step, exclusive in steps:
+            step_numerator, step_denominator = step(quantity)
+            line_numerator *= step_numerator
+            line_denominator *= step_denominator
+            if exclusive and step_numerator < step_denominator:
+                break
+        return scale(price * quantity, line_numerator, line_denominator)
+
+    return price_line
+
+
+class RuleSet:
+    """Compiled promotion rules, ready to price orders."""
+
+    def __init__(self, line_pricers: Dict[str, LinePricer], default_pricer: Optional[LinePricer],
+                 bundles: List[Tuple[Dict[str, int], int]]):
+        """
+        Initializes the rule set. Use ``compile_rules`` to build one.
+
+        :param line_pricers: Pricing function of each product named by a line rule
+        :param default_pricer: Pricing function of every other product, or None
+        :param bundles: Each bundle's item counts and price in cents, highest priority first
+        """
+        self._line_pricers = line_pricers
+        self._default_pricer = default_pricer
+        self._bundles = bundles
+
+    def price_lines(self, consolidated_list: Dict[Product, int]) -> List[int]:
+        """
+        Prices every line of a consolidated order.
+
+        Complete bundles are taken out of the order first; each bundle's price
+        is shared among its lines in proportion to their list prices, rounded
+        down to the cent with the remainder going to the bundle's last item,
+        so the shares add up to the bundle price exactly. The remaining units
+        are priced by the line rules, or by the product's own promotion when
+        no line rule applies to it.
+
+        :param consolidated_list: Mapping of each product to its total quantity
+        :return: The price of each line in cents, in the order of ``consolidated_list``
+        """
+        remaining = {product.name: quantity for product, quantity in consolidated_list.items()}
+        bundled: Dict[str, int] = {}
+        if self._bundles:
+            prices = {product.name: product.price_cents for product in consolidated_list}
+            for items, bundle_price in self._bundles:
+                sets = min(remaining.get(name, 0) // count for name, count in items.items())
+                if not sets:
+                    continue
+                weights = {name: prices[name] * count for name, count in items.items()}
+                if not any(weights.values()):
+                    weights = dict(items)
+                total_weight = sum(weights.values())
+                unallocated = bundle_price * sets
+                for index, (name, count) in enumerate(items.items()):
+                    share = (unallocated if index == len(items) - 1
+                             else bundle_price * sets * weights[name] // total_weight)
+                    unallocated -= share
+                    bundled[name] = bundled.get(name, 0) + share
+                    remaining[name] -= count * sets
+
+        line_pricers, default_pricer = self._line_pricers, self._default_pricer
+        line_prices = []
+        for product in consolidated_list:
+            name = product.name
+            quantity = remaining[name]
+            pricer = line_pricers.get(name, default_pricer)
+            if not quantity:
+                line_price = 0
+            elif pricer is None:
+                line_price = product._price_for(quantity)
+            else:
+                line_price = pricer(product.price_cents, quantity)
+            if bundled:
+                line_price += bundled.get(name, 0)
+            line_prices.append(line_price)
+        return line_prices
+
+
+def compile_rules(definitions: Iterable[dict]) -> RuleSet:
+    """
+    Compiles rule definitions into a rule set.
+
+    :param definitions: The rules, as described in the module documentation
+    :return: The compiled rule set
+    :raises ValueError: If a rule is malformed or of an unknown type
+    """
+    line_rules: List[Tuple[int, int, dict]] = []
+    bundles: List[Tuple[int, int, Dict[str, int], int]] = []
+    for position, definition in enumerate(definitions):
+        rule_type = definition.get("type")
+        priority = definition.get("priority", 0)
+        try:
+            if rule_type == "bundle":
+                items = dict(definition["items"])
+                if not items or min(items.values()) < 1 or definition["price"] < 0:
+                    raise ValueError("Bundles need items with positive counts and a price.")
+                bundles.append((-priority, position, items, to_cents(definition["price"])))
+            elif rule_type in ("percent", "buy_x_get_y", "tiered"):
+                if rule_type == "percent":
+                    _percent_factor(definition)  # Validate now rather than on first use
+                else:
+                    _quantity_step(definition)
+                line_rules.append((-priority, position, definition))
+            else:
+                raise ValueError(f"Unknown rule type '{rule_type}'.")
+        except (KeyError, TypeError) as error:
+            raise ValueError(f"Malformed '{rule_type}' rule: {error!r}.") from error
+
+    line_rules.sort(key=lambda rule: rule[:2])
+    global_rules = [definition for _, _, definition in line_rules
+                    if definition.get("products") is None]
+    names = {name for _, _, definition in line_rules for name in definition.get("products") or ()}
+    line_pricers = {
+        name: _compile_line([definition for _, _, definition in line_rules
+                             if definition.get("products") is None
+                             or name in definition["products"]])
+        for name in names
+    }
+    default_pricer = _compile_line(global_rules) if global_rules else None
+    bundles.sort(key=lambda bundle: bundle[:2])
+    return RuleSet(line_pricers, default_pricer,
+                   [(items, price) for _, _, items, price in bundles])
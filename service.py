@@ -0,0 +1,250 @@
+"""
+Asyncio service layer for the Best Buy store.
+
+Clients talk to the store over a local socket using newline-delimited JSON.
+Each request is one JSON object with an ``op`` field:
+
+    {"op": "list"}
+    {"op": "total"}
+    {"op": "order", "items": [["MacBook Air M2", 2], ["Shipping", 1]]}
+    {"op": "order", "items": [["MacBook Air M2", 2]], "key": "cart-42-attempt"}
+
+and each response is one JSON object with ``ok`` set to true or false.
+An order's optional ``key`` is its idempotency key: a client retrying an
+order with the same key gets the first total back without buying twice.
+Orders from all sessions go through one bounded queue drained by a pool of
+workers; a worker holds a lock per product in the order, so orders touching
+different products run side by side while orders for the same product are
+serialized.
+"""
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from products import LimitedProduct, NonStockedProduct, Product
+from store import Store
+
+
+def describe_product(product: Product) -> dict:
+    """
+    Converts a product into a JSON-serializable dict.
+
+    :param product: The product to describe
+    :return: The product's name, price, quantity, limit and promotion
+    """
+    description = {
+        "name": product.name,
+        "price": product.price,
+        "quantity": None if isinstance(product, NonStockedProduct) else product.quantity,
+        "promotion": str(product.promotion) if product.promotion else None,
+    }
+    if isinstance(product, LimitedProduct):
+        description["maximum"] = product.maximum
+    return description
+
+
+class StoreService:
+    """Serves a store to many concurrent client sessions."""
+
+    def __init__(self, store: Store, max_pending: int = 1000, workers: int = 8):
+        """
+        Initializes the service.
+
+        :param store: The store to serve
+        :param max_pending: Maximum number of queued orders before clients are made to wait
+        :param workers: Number of orders executed concurrently
+        """
+        self._store = store
+        self._max_pending = max_pending
+        self._workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._product_locks: Dict[str, list] = {}  # Name -> [lock, workers holding or awaiting it]
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Starts the order workers on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self._max_pending)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self._workers)]
+
+    async def stop(self):
+        """Stops the order workers."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=True)
+
+    async def serve_unix(self, path: str) -> asyncio.AbstractServer:
+        """
+        Starts listening for sessions on a Unix domain socket.
+
+        :param path: The socket path
+        :return: The running server
+        """
+        if not self._tasks:
+            await self.start()
+        return await asyncio.start_unix_server(self.handle_session, path=path)
+
+    async def handle_session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serves one client session until it disconnects.
+
+        Requests within a session are answered in order; a session waiting on a
+        full order queue stops reading, which pushes back on the client.
+
+        :param reader: The session's input stream
+        :param writer: The session's output stream
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.handle_request(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, line: bytes) -> dict:
+        """
+        Answers a single JSON request.
+
+        :param line: The raw request line
+        :return: The response object
+        """
+        try:
+            request = json.loads(line)
+            op = request["op"]
+        except (ValueError, KeyError, TypeError):
+            return {"ok": False, "error": "Malformed request."}
+
+        if op == "list":
+            return {"ok": True, "products": [describe_product(product)
+                                             for product in self._store.get_all_products()]}
+        if op == "total":
+            return {"ok": True, "total": self._store.get_total_quantity()}
+        if op == "order":
+            try:
+                shopping_list = self._resolve(request.get("items"))
+                total_price = await self.order(shopping_list, request.get("key"))
+            except ValueError as error:
+                return {"ok": False, "error": str(error)}
+            return {"ok": True, "total": total_price}
+        return {"ok": False, "error": f"Unknown operation '{op}'."}
+
+    async def order(self, shopping_list: List[Tuple[Product, int]],
+                    idempotency_key: Optional[str] = None) -> float:
+        """
+        Queues an order and waits for a worker to execute it.
+
+        :param shopping_list: A list of tuples [(Product, quantity)]
+        :param idempotency_key: Optional key identifying the order across retries
+        :return: Total price of the order
+        :raises ValueError: If the order cannot be fulfilled
+        """
+        result = asyncio.get_running_loop().create_future()
+        await self._queue.put((shopping_list, idempotency_key, result))
+        return await result
+
+    def _resolve(self, items) -> List[Tuple[Product, int]]:
+        """
+        Turns the ``items`` of an order request into a shopping list.
+
+        :param items: A list of [product name, quantity] pairs
+        :return: A list of tuples [(Product, quantity)]
+        :raises ValueError: If an item is malformed or names an unknown product
+        """
+        if not isinstance(items, list) or not items:
+            raise ValueError("An order needs a non-empty list of items.")
+        shopping_list = []
+        for item in items:
+            if (not isinstance(item, list) or len(item) != 2 or not isinstance(item[0], str)
+                    or not isinstance(item[1], int) or isinstance(item[1], bool)):
+                raise ValueError("Each item must be a [product name, quantity] pair.")
+            product = self._store.get(item[0])
+            if product is None:
+                raise ValueError(f"Unknown product '{item[0]}'.")
+            shopping_list.append((product, item[1]))
+        return shopping_list
+
+    async def _worker(self):
+        """Executes queued orders, one at a time per product."""
+        loop = asyncio.get_running_loop()
+        while True:
+            shopping_list, idempotency_key, result = await self._queue.get()
+            names = sorted({product.name for product, _ in shopping_list})
+            locks = [self._use_lock(name) for name in names]
+            acquired = []
+            try:
+                for lock in locks:
+                    await lock.acquire()
+                    acquired.append(lock)
+                total_price = await loop.run_in_executor(
+                    self._executor, self._store.order, shopping_list, idempotency_key)
+            except Exception as error:  # Handed back to the session that placed the order
+                if not result.cancelled():
+                    result.set_exception(error)
+            else:
+                if not result.cancelled():
+                    result.set_result(total_price)
+            finally:
+                for lock in reversed(acquired):
+                    lock.release()
+                for name in names:
+                    self._unuse_lock(name)
+                self._queue.task_done()
+
+    def _use_lock(self, name: str) -> asyncio.Lock:
+        """
+        Gets the lock of a product, creating it if no worker is using it.
+
+        :param name: The product name
+        :return: The lock, to be handed back with ``_unuse_lock``
+        """
+        entry = self._product_locks.get(name)
+        if entry is None:
+            entry = self._product_locks[name] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _unuse_lock(self, name: str):
+        """
+        Hands back the lock of a product, dropping it once no worker is using it.
+
+        :param name: The product name
+        """
+        entry = self._product_locks[name]
+        entry[1] -= 1
+        if not entry[1]:
+            del self._product_locks[name]
+
+
+async def serve(store: Store, path: str):
+    """
+    Serves a store on a Unix domain socket until cancelled.
+
+    :param store: The store to serve
+    :param path: The socket path
+    """
+    service = StoreService(store)
+    server = await service.serve_unix(path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    from main import best_buy
+
+    parser = argparse.ArgumentParser(description="Serve the Best Buy store over a Unix socket.")
+    parser.add_argument("socket", help="Path of the Unix domain socket to listen on")
+    asyncio.run(serve(best_buy, parser.parse_args().socket))
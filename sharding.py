@@ -0,0 +1,274 @@
+"""
+Multi-process sharded store.
+
+``ShardedStore`` spreads a catalog over several worker processes, each
+holding an ordinary ``Store`` with the products whose name hashes to it, so
+orders on different shards run on different cores. The coordinator offers
+the same interface as ``Store``. An order whose products all live on one
+shard is sent straight to that shard. An order spanning shards uses two-phase
+commit: every involved shard first buys its lines and holds them as
+"prepared"; if all shards succeed the purchase is committed everywhere,
+otherwise the shards that prepared put the stock back.
+
+Products are copied into the shard processes, so the objects passed to the
+coordinator and the ones returned by ``get_all_products`` are snapshots;
+orders refer to products by name (or by any product with that name).
+"""
+
+import itertools
+import multiprocessing
+import os
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple, Union
+
+from money import from_cents
+from products import Product
+from store import Store
+
+ProductRef = Union[Product, str]
+
+
+def shard_of(name: str, shards: int) -> int:
+    """
+    Returns the shard holding a product.
+
+    A stable hash is used so every process agrees on the placement.
+
+    :param name: The product name
+    :param shards: Number of shards
+    :return: The shard index
+    """
+    return zlib.crc32(name.encode("utf-8")) % shards
+
+
+def _serve_shard(connection, products: List[Product]):
+    """
+    Runs one shard: a store answering the coordinator's requests until told to stop.
+
+    :param connection: The shard's end of the pipe to the coordinator
+    :param products: The shard's products
+    """
+    store = Store(products)
+    prepared: Dict[int, Tuple[Dict[Product, int], Dict[Product, bool]]] = {}  # Lines and prior statuses
+
+    def resolve(lines: List[Tuple[str, int]]) -> Dict[Product, int]:
+        consolidated_list = {}
+        for name, quantity in lines:
+            product = store.get(name)
+            if product is None:
+                raise ValueError(f"Unknown product '{name}'.")
+            consolidated_list[product] = quantity
+        return consolidated_list
+
+    while True:
+        message = connection.recv()
+        try:
+            command, *arguments = message
+            if command == "order":
+                result = sum(store._purchase_lines(resolve(arguments[0])))
+            elif command == "prepare":
+                transaction, lines = arguments
+                consolidated_list = resolve(lines)
+                statuses = {product: product.is_active for product in consolidated_list}
+                result = store._purchase_lines(consolidated_list)
+                prepared[transaction] = (consolidated_list, statuses)
+            elif command == "commit":
+                del prepared[arguments[0]]
+                result = None
+            elif command == "abort":
+                consolidated_list, statuses = prepared.pop(arguments[0])
+                for product, quantity in consolidated_list.items():
+                    with product._lock:
+                        product._take_stock(-quantity)
+                        if statuses[product] and not product.is_active:
+                            product.activate()  # Sold out by the aborted order
+                result = None
+            elif command == "products":
+                result = store.get_all_products()
+            elif command == "total":
+                result = store.get_total_quantity()
+            elif command == "add":
+                result = store.add_product(arguments[0])
+            elif command == "remove":
+                product = store.get(arguments[0])
+                if product is None:
+                    raise ValueError(f"Product '{arguments[0]}' is not in the store.")
+                result = store.remove_product(product)
+            elif command == "stop":
+                connection.send((True, None))
+                return
+            else:
+                raise ValueError(f"Unknown shard command '{command}'.")
+        except Exception as error:  # Answered, so the shard survives and the coordinator can abort
+            try:
+                connection.send((False, error))
+            except Exception:  # The error itself cannot be pickled
+                connection.send((False, ValueError(f"Shard request failed: {error!r}")))
+        else:
+            connection.send((True, result))
+
+
+class ShardedStore:
+    """A store whose products are partitioned across worker processes."""
+
+    def __init__(self, products: List[Product], shards: Optional[int] = None):
+        """
+        Starts the shard processes and hands each its products.
+
+        :param products: List of products to initialize the store with
+        :param shards: Number of worker processes; defaults to the number of CPUs
+        """
+        self._shards = shards or os.cpu_count() or 1
+        partitions: List[List[Product]] = [[] for _ in range(self._shards)]
+        for product in products:
+            partitions[shard_of(product.name, self._shards)].append(product)
+
+        context = multiprocessing.get_context("spawn")
+        self._connections = []
+        self._processes = []
+        for partition in partitions:
+            coordinator_end, shard_end = context.Pipe()
+            process = context.Process(target=_serve_shard, args=(shard_end, partition), daemon=True)
+            process.start()
+            self._connections.append(coordinator_end)
+            self._processes.append(process)
+        self._locks = [threading.Lock() for _ in range(self._shards)]  # One request in flight per shard
+        self._transactions = itertools.count(1)
+
+    def _call(self, shard: int, *message):
+        """
+        Sends a request to one shard and waits for its answer.
+
+        :param shard: The shard index
+        :param message: The command and its arguments
+        :return: The shard's result
+        :raises Exception: The error the shard answered with, usually ValueError
+        """
+        with self._locks[shard]:
+            self._connections[shard].send(message)
+            ok, result = self._connections[shard].recv()
+        if not ok:
+            raise result
+        return result
+
+    def _broadcast(self, shards: List[int], messages: List[tuple]) -> List[Tuple[bool, object]]:
+        """
+        Sends one request to each of several shards and collects every answer.
+
+        Shard locks are taken in ascending order, so concurrent broadcasts
+        cannot deadlock, and all requests are sent before any answer is
+        awaited, so the shards work in parallel.
+
+        :param shards: The shard indexes, in ascending order
+        :param messages: The request for each shard
+        :return: The (ok, result) answer of each shard
+        """
+        for shard in shards:
+            self._locks[shard].acquire()
+        try:
+            for shard, message in zip(shards, messages):
+                self._connections[shard].send(message)
+            return [self._connections[shard].recv() for shard in shards]
+        finally:
+            for shard in reversed(shards):
+                self._locks[shard].release()
+
+    def order(self, shopping_list: List[Tuple[ProductRef, int]]) -> float:
+        """
+        Processes an order, purchasing multiple products at once.
+
+        The order is all-or-nothing across shards and its total is summed
+        exactly in integer cents, like ``Store.order``.
+
+        :param shopping_list: A list of tuples [(Product or product name, quantity)]
+        :return: Total price of the order
+        :raises ValueError: If any line of the order cannot be fulfilled
+        """
+        consolidated_list: Dict[str, int] = {}
+        for item, quantity in shopping_list:
+            name = item if isinstance(item, str) else item.name
+            consolidated_list[name] = consolidated_list.get(name, 0) + quantity
+
+        lines_by_shard: Dict[int, List[Tuple[str, int]]] = {}
+        for name, quantity in consolidated_list.items():
+            lines_by_shard.setdefault(shard_of(name, self._shards), []).append((name, quantity))
+        if len(lines_by_shard) == 1:
+            (shard, lines), = lines_by_shard.items()
+            return from_cents(self._call(shard, "order", lines))
+
+        # Phase one: every shard buys its lines and holds them as prepared
+        transaction = next(self._transactions)
+        shards = sorted(lines_by_shard)
+        answers = self._broadcast(shards, [("prepare", transaction, lines_by_shard[shard])
+                                           for shard in shards])
+        failures = [result for ok, result in answers if not ok]
+
+        # Phase two: commit everywhere, or give prepared stock back
+        prepared = [shard for shard, (ok, _) in zip(shards, answers) if ok]
+        decision = "abort" if failures else "commit"
+        self._broadcast(prepared, [(decision, transaction)] * len(prepared))
+        if failures:
+            raise failures[0]
+
+        line_prices: Dict[str, int] = {}
+        for shard, (_, prices) in zip(shards, answers):
+            for (name, _), price in zip(lines_by_shard[shard], prices):
+                line_prices[name] = price
+        return from_cents(sum(line_prices.values()))
+
+    def get_all_products(self) -> List[Product]:
+        """
+        Returns all active products in the store, shard by shard.
+
+        :return: Copies of the active products with quantity > 0 or non-stocked products
+        """
+        products = []
+        for _, result in self._broadcast(list(range(self._shards)), [("products",)] * self._shards):
+            products.extend(result)
+        return products
+
+    def get_total_quantity(self) -> int:
+        """
+        Returns the total number of items in the store.
+
+        :return: Total quantity of all active products
+        """
+        answers = self._broadcast(list(range(self._shards)), [("total",)] * self._shards)
+        return sum(result for _, result in answers)
+
+    def add_product(self, product: Product):
+        """
+        Adds a new product to the shard its name hashes to.
+
+        :param product: Product to add; the store keeps a copy
+        :raises ValueError: If a product with the same name (or the same SKU on
+                            that shard) is already in the store
+        """
+        self._call(shard_of(product.name, self._shards), "add", product)
+
+    def remove_product(self, product: ProductRef):
+        """
+        Removes a product from the store.
+
+        :param product: Product (or product name) to remove
+        :raises ValueError: If the product is not in the store
+        """
+        name = product if isinstance(product, str) else product.name
+        self._call(shard_of(name, self._shards), "remove", name)
+
+    def close(self):
+        """Stops the shard processes."""
+        for shard, process in enumerate(self._processes):
+            if process.is_alive():
+                self._call(shard, "stop")
+            process.join()
+            self._connections[shard].close()
+
+    def __enter__(self) -> "ShardedStore":
+        """Return the store for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop the shard processes when leaving a with statement."""
+        self.close()
@@ -0,0 +1,245 @@
+"""
+Binary snapshots of a store.
+
+A snapshot is the store's ``ProductTable`` written column by column: a
+fixed preamble, a JSON header describing the promotions, product classes
+and the position of every column, then the raw column bytes, each aligned
+to 8 bytes. Loading memory-maps the file copy-on-write and points the new
+table's columns straight at the mapped pages, so only the names are decoded
+up front and product objects are created on first access to the catalog.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from typing import Dict, Optional
+
+from products import Product, Promotion, locked_all
+from product_table import ProductTable
+from store import Store
+
+MAGIC = b"BBSNAP02"  # 02: prices are integer cents
+_PREAMBLE = struct.Struct("<8sQ")  # Magic, header length
+_COLUMNS = (("prices", "q"), ("quantities", "q"), ("maximums", "q"),
+            ("promotion_ids", "I"), ("kinds", "B"), ("active", "B"))
+
+
+def _class_path(cls: type) -> str:
+    """
+    Returns the importable dotted path of a class.
+
+    :param cls: The class
+    :return: The path, e.g. "products.PercentDiscount"
+    """
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _resolve_class(path: str, base: type) -> type:
+    """
+    Finds the class recorded in a snapshot among the subclasses of ``base``.
+
+    Only classes already defined in this process are considered; nothing is
+    imported on the file's say-so, so loading an untrusted snapshot cannot
+    run arbitrary modules.
+
+    :param path: The dotted path of the class
+    :param base: The class it must be or derive from
+    :return: The class
+    :raises ValueError: If no loaded subclass of ``base`` has that path
+    """
+    pending = [base]
+    while pending:
+        cls = pending.pop()
+        if _class_path(cls) == path:
+            return cls
+        pending.extend(cls.__subclasses__())
+    raise ValueError(f"Snapshot refers to unknown class '{path}'.")
+
+
+def _encode_promotion(promotion: Optional[Promotion]) -> Optional[dict]:
+    """
+    Converts a promotion into a JSON-serializable description.
+
+    :param promotion: The promotion or None
+    :return: The promotion's class and attributes
+    """
+    if promotion is None:
+        return None
+    return {"class": _class_path(type(promotion)), "state": vars(promotion)}
+
+
+def _decode_promotion(description: Optional[dict]) -> Optional[Promotion]:
+    """
+    Rebuilds a promotion from its description.
+
+    :param description: The output of ``_encode_promotion``
+    :return: The promotion or None
+    """
+    if description is None:
+        return None
+    cls = _resolve_class(description["class"], Promotion)
+    promotion = cls.__new__(cls)
+    promotion.__dict__.update(description["state"])
+    return promotion
+
+
+def _encode_strings(values, field: str) -> bytes:
+    """
+    Joins a column of strings with NUL separators; missing values become empty strings.
+
+    :param values: The strings or None values
+    :param field: The column name, for error messages
+    :return: The UTF-8 encoded column
+    :raises ValueError: If a value contains a NUL character
+    """
+    strings = ["" if value is None else value for value in values]
+    blob = "\0".join(strings)
+    if blob.count("\0") != max(len(strings) - 1, 0):
+        raise ValueError(f"Product {field}s cannot contain NUL characters.")
+    return blob.encode("utf-8")
+
+
+def save_snapshot(store: Store, path: str):
+    """
+    Writes a snapshot of a store.
+
+    The columns are copied while every product lock is held, which takes
+    a few memory copies; encoding and writing happen after the locks are
+    released. The file is written next to ``path`` and then renamed over
+    it, so readers never see a partial snapshot. If the store has a journal,
+    the sequence number of the last order included is saved as well, so
+    recovery replays only newer orders.
+
+    :param store: The store to save
+    :param path: The snapshot file
+    """
+    table = store._table
+    with locked_all(), table._lock:
+        columns = {name: bytes(getattr(table, name)) for name, _ in _COLUMNS}
+        names = list(table.names)
+        skus = list(table.skus)
+        promotions = list(table.promotions)
+        kinds = list(table.kind_types)
+        total_quantity = store.get_total_quantity()
+        journal_sequence = store.journal.last_sequence if store.journal is not None else 0
+
+    columns["names"] = _encode_strings(names, "name")
+    columns["skus"] = _encode_strings(skus, "SKU")
+    sections: Dict[str, list] = {}
+    offset = 0
+    for name, data in columns.items():
+        sections[name] = [offset, len(data)]
+        offset += -(-len(data) // 8) * 8
+    header = json.dumps({
+        "rows": len(names),
+        "total_quantity": total_quantity,
+        "journal_sequence": journal_sequence,
+        "kinds": [_class_path(kind) for kind in kinds],
+        "promotions": [_encode_promotion(promotion) for promotion in promotions],
+        "sections": sections,
+    }).encode("utf-8")
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as snapshot_file:
+        snapshot_file.write(_PREAMBLE.pack(MAGIC, len(header)))
+        snapshot_file.write(header)
+        snapshot_file.write(b"\0" * (-(_PREAMBLE.size + len(header)) % 8))
+        for data in columns.values():
+            snapshot_file.write(data)
+            snapshot_file.write(b"\0" * (-len(data) % 8))
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def read_header(path: str) -> dict:
+    """
+    Reads the JSON header of a snapshot without loading it.
+
+    :param path: The snapshot file
+    :return: The header
+    :raises ValueError: If the file is not a snapshot
+    """
+    with open(path, "rb") as snapshot_file:
+        magic, header_length = _PREAMBLE.unpack(snapshot_file.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not a store snapshot.")
+        return json.loads(snapshot_file.read(header_length))
+
+
+def load_snapshot(path: str) -> Store:
+    """
+    Opens a store from a snapshot.
+
+    :param path: The snapshot file
+    :return: The store; its products are created on first access
+    :raises ValueError: If the file is not a snapshot
+    """
+    with open(path, "rb") as snapshot_file:
+        mapping = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_COPY)
+    magic, header_length = _PREAMBLE.unpack_from(mapping)
+    if magic != MAGIC:
+        raise ValueError(f"'{path}' is not a store snapshot.")
+    header = json.loads(mapping[_PREAMBLE.size:_PREAMBLE.size + header_length])
+    data_start = _PREAMBLE.size + header_length + (-(_PREAMBLE.size + header_length) % 8)
+    memory = memoryview(mapping)
+
+    def section(name: str) -> memoryview:
+        offset, length = header["sections"][name]
+        return memory[data_start + offset:data_start + offset + length]
+
+    table = ProductTable()
+    for name, typecode in _COLUMNS:
+        setattr(table, name, section(name).cast(typecode))
+    rows = header["rows"]
+    table.held = array("q", bytes(8 * rows))  # Reservations are not saved
+    names = bytes(section("names")).decode("utf-8").split("\0") if rows else []
+    skus = bytes(section("skus")).decode("utf-8").split("\0") if rows else []
+    table.names = [name or None for name in names]
+    table.skus = [sku or None for sku in skus]
+    table.displays = [None] * rows
+    table._free = [row for row, name in enumerate(table.names) if name is None]
+
+    table.promotions = [_decode_promotion(description) for description in header["promotions"]]
+    table._promotion_ids = {promotion: promotion_id
+                            for promotion_id, promotion in enumerate(table.promotions)
+                            if promotion is not None}
+    table.kind_types = [_resolve_class(class_path, Product) for class_path in header["kinds"]]
+    table._kind_ids = {kind: kind_id for kind_id, kind in enumerate(table.kind_types)}
+    return Store._from_table(table, header["total_quantity"])
+
+
+class PeriodicSnapshot:
+    """Saves a store to a snapshot file at a fixed interval on a background thread."""
+
+    def __init__(self, store: Store, path: str, interval: float):
+        """
+        Initializes the snapshotter.
+
+        :param store: The store to save
+        :param path: The snapshot file
+        :param interval: Seconds between snapshots
+        """
+        self._store = store
+        self._path = path
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Starts taking snapshots."""
+        self._thread.start()
+
+    def stop(self):
+        """Stops taking snapshots and writes a final one."""
+        self._stopped.set()
+        self._thread.join()
+        save_snapshot(self._store, self._path)
+
+    def _run(self):
+        """Takes a snapshot every interval until stopped."""
+        while not self._stopped.wait(self._interval):
+            save_snapshot(self._store, self._path)
@@ -1,17 +1,185 @@
-from typing import List, Tuple
-from products import Product, NonStockedProduct
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+from catalog import CatalogVersion
+from idempotency import IdempotencyCache
+from money import from_cents, to_cents
+from products import Product, NonStockedProduct, locked
+from product_table import ProductTable, default_table
+from reservations import Reservations
 
 
 class Store:
     """Class representing a store with products."""
 
-    def __init__(self, products: List[Product]):
+    def __init__(self, products: List[Product], journal=None, rules=None, events=None):
         """
         Initializes the store with a list of products.
 
+        Products are indexed by name (and by SKU when they have one), so
+        lookups and removals take constant time regardless of catalog size.
+        The index is published as immutable ``CatalogVersion`` objects, so
+        lookups and listings never wait for products being added or removed.
+        The store also subscribes to its products and keeps the set of
+        available products and the total quantity up to date as stock changes,
+        and keeps its products sorted by price for range and top-N queries.
+        Product state is held in the store's own columnar ``ProductTable``.
+
         :param products: List of products to initialize the store with
+        :param journal: Optional ``OrderJournal`` recording every committed order
+        :param rules: Optional compiled ``RuleSet`` pricing every order
+        :param events: Optional ``EventBus`` told about every stock and status change
+        :raises ValueError: If two products share a name or a SKU, or a product
+                            belongs to another store; no product is taken then
+        """
+        self._journal = journal
+        self._rules = rules
+        self._events = events
+        self._table = ProductTable()
+        self._catalog = CatalogVersion.build(())  # Replaced, never changed, by every write
+        self._catalog_lock = threading.RLock()  # Serializes the writers of the field above
+        self._available: Dict[Product, None] = {}  # Set of the products get_all_products lists
+        self._total_quantity = 0
+        self._positions: Dict[Product, int] = {}  # Catalog order, which listings follow
+        self._next_position = 0
+        self._tracking_lock = threading.Lock()  # Guards the four fields above
+        self._price_keys: List[Tuple[int, str]] = []  # Sorted (price in cents, name) of every product
+        self._price_order: List[Product] = []  # Products in the order of _price_keys
+        self._price_lock = threading.Lock()  # Guards the two fields above
+        self._reservations = Reservations()
+        self._idempotency = IdempotencyCache()
+        self._loaded = True  # False until the products of a loaded snapshot are created
+        with self._catalog_lock:
+            self._check_new_products(products)
+            self._publish_products(products)
+
+    @classmethod
+    def _from_table(cls, table: ProductTable, total_quantity: int) -> "Store":
+        """
+        Creates a store over an already populated table.
+
+        Product objects are only created the first time the catalog is
+        accessed, so the store is usable as soon as the table is.
+
+        :param table: The table holding exactly the store's products
+        :param total_quantity: The total quantity of the active products in the table
+        :return: The store
         """
-        self._products = products
+        store = cls([])
+        store._table = table
+        store._total_quantity = total_quantity
+        store._loaded = False
+        return store
+
+    def _ensure_loaded(self):
+        """Creates and indexes the product objects of a lazily loaded table."""
+        if self._loaded:
+            return
+        with self._catalog_lock, self._tracking_lock:
+            if self._loaded:
+                return
+            table = self._table
+            quantities = table.quantities
+            observers = (self,)
+            view = Product._view
+            products = [view(table, row, observers) for row in table.rows()]
+            self._positions = {product: position for position, product in enumerate(products)}
+            self._next_position = len(products)
+            for product in products:
+                row = product._row
+                if table.is_active(row) and (quantities[row] > 0
+                                             or isinstance(product, NonStockedProduct)):
+                    self._available[product] = None
+            self._catalog = CatalogVersion.build(products)
+            self._rebuild_price_index()
+            self._loaded = True
+
+    def save(self, path: str):
+        """
+        Writes a binary snapshot of the store to a file.
+
+        :param path: The snapshot file
+        """
+        from snapshot import save_snapshot
+        save_snapshot(self, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Store":
+        """
+        Opens a store from a binary snapshot written by ``save``.
+
+        :param path: The snapshot file
+        :return: The store
+        """
+        from snapshot import load_snapshot
+        return load_snapshot(path)
+
+    @property
+    def journal(self):
+        """
+        Get the journal recording committed orders.
+
+        :return: The ``OrderJournal`` or None if orders are not journaled
+        """
+        return self._journal
+
+    @journal.setter
+    def journal(self, new_journal):
+        """
+        Set the journal recording committed orders.
+
+        :param new_journal: The ``OrderJournal`` or None to stop journaling
+        """
+        self._journal = new_journal
+
+    @property
+    def rules(self):
+        """
+        Get the promotion rules pricing orders.
+
+        :return: The compiled ``RuleSet`` or None if products price themselves
+        """
+        return self._rules
+
+    @rules.setter
+    def rules(self, new_rules):
+        """
+        Set the promotion rules pricing orders.
+
+        :param new_rules: A ``RuleSet`` from ``rules.compile_rules``, or None
+        """
+        self._rules = new_rules
+
+    @property
+    def events(self):
+        """
+        Get the event bus told about stock and status changes.
+
+        :return: The ``EventBus`` or None if no events are published
+        """
+        return self._events
+
+    @events.setter
+    def events(self, new_events):
+        """
+        Set the event bus told about stock and status changes.
+
+        :param new_events: An ``events.EventBus``, or None to stop publishing
+        """
+        self._events = new_events
+
+    @property
+    def catalog(self) -> CatalogVersion:
+        """
+        Get the current version of the catalog.
+
+        The version never changes, so it can be used for as long as needed
+        without locking; later writes publish new versions instead.
+
+        :return: The catalog version
+        """
+        self._ensure_loaded()
+        return self._catalog
 
     @property
     def products(self) -> List[Product]:
@@ -20,32 +188,294 @@ class Store:
 
         :return: List of products
         """
-        return self._products
+        self._ensure_loaded()
+        return self._catalog.products()
 
     @products.setter
     def products(self, new_products: List[Product]):
         """
         Set the list of products in the store.
 
+        The new catalog is published as one version once every product is in.
+
         :param new_products: New list of products
+        :raises ValueError: If two products share a name or a SKU, or a
+                            product belongs to another store; nothing is changed then
+        """
+        self._ensure_loaded()
+        with self._catalog_lock:
+            self._check_new_products(new_products)
+            for product in self._catalog:
+                product.unsubscribe(self)
+                product._move_to(default_table)
+            with self._tracking_lock:
+                self._available = {}
+                self._total_quantity = 0
+                self._positions = {}
+            self._publish_products(new_products)
+
+    def _publish_products(self, new_products: List[Product]):
+        """
+        Takes validated products into an empty store as one catalog version.
+
+        The catalog is built and the price index sorted once for the whole
+        list, so building a store takes O(n log n) rather than a copy and a
+        list insertion per product. Callers must hold the catalog lock.
+
+        :param new_products: The products, already checked by ``_check_new_products``
+        """
+        for product in new_products:
+            self._attach(product, index_price=False)
+        self._catalog = CatalogVersion.build(new_products, self._catalog.number + 1)
+        self._rebuild_price_index()
+
+    def _check_new_products(self, new_products: List[Product]):
         """
-        self._products = new_products
+        Validates a complete new catalog before any product is taken into the store.
+
+        :param new_products: The products the store would hold
+        :raises ValueError: If two products share a name or a SKU, or a
+                            product belongs to another store
+        """
+        names, skus = set(), set()
+        for product in new_products:
+            if product._table is not default_table and product not in self:
+                raise ValueError(f"Product '{product.name}' belongs to another store.")
+            if product.name in names:
+                raise ValueError(f"Product '{product.name}' is already in the store.")
+            if product.sku is not None and product.sku in skus:
+                raise ValueError(f"SKU '{product.sku}' is already in the store.")
+            names.add(product.name)
+            skus.add(product.sku)
 
     def add_product(self, product: Product):
         """
         Adds a new product to the store.
 
         :param product: Product to add
+        :raises ValueError: If a product with the same name or SKU is already in the store,
+                            or the product belongs to another store
+        """
+        self._ensure_loaded()
+        with self._catalog_lock:
+            catalog = self._catalog
+            if product._table is not default_table and product not in self:
+                raise ValueError(f"Product '{product.name}' belongs to another store.")
+            if product.name in catalog:
+                raise ValueError(f"Product '{product.name}' is already in the store.")
+            if product.sku is not None and catalog.get_by_sku(product.sku) is not None:
+                raise ValueError(f"SKU '{product.sku}' is already in the store.")
+            self._attach(product)
+            self._catalog = catalog.with_products((product,))
+
+    def _attach(self, product: Product, index_price: bool = True):
         """
-        self._products.append(product)
+        Moves a product into the store's table and starts tracking it.
+
+        Callers must hold the catalog lock and publish a catalog version
+        with the product afterwards.
+
+        :param product: The product
+        :param index_price: False if the caller rebuilds the price index afterwards
+        """
+        product._move_to(self._table)
+        self._place((product,))
+        with product._lock:  # No price change may slip between indexing and subscribing
+            product.subscribe(self)
+            self._track(product, 0, False)
+            if index_price:
+                with self._price_lock:
+                    self._insert_price(product, product.price_cents)
 
     def remove_product(self, product: Product):
         """
         Removes a product from the store.
 
         :param product: Product to remove
+        :raises ValueError: If the product is not in the store
+        """
+        self._ensure_loaded()
+        with self._catalog_lock:
+            if self._catalog.get(product.name) is not product:
+                raise ValueError(f"Product '{product.name}' is not in the store.")
+            self._catalog = self._catalog.without_product(product)
+            with product._lock:
+                product.unsubscribe(self)
+                with self._price_lock:
+                    self._remove_price(product, product.price_cents)
+            product._move_to(default_table)
+            with self._tracking_lock:
+                self._available.pop(product, None)
+                del self._positions[product]
+                if product.is_active:
+                    self._total_quantity -= product.quantity
+
+    def product_changed(self, product: Product, old_quantity: int, old_active: bool):
+        """
+        Observer callback invoked by a product whenever its stock or status changes.
+
+        :param product: The product that changed
+        :param old_quantity: The quantity before the change
+        :param old_active: The active status before the change
+        """
+        self._track(product, old_quantity, old_active)
+        events = self._events
+        if events is not None:
+            events.product_changed(product, old_quantity, old_active)
+
+    def price_changed(self, product: Product, old_price: int):
+        """
+        Observer callback invoked by a product whenever its price changes.
+
+        :param product: The product that changed
+        :param old_price: The price in cents before the change
+        """
+        with self._price_lock:
+            self._remove_price(product, old_price)
+            self._insert_price(product, product.price_cents)
+
+    def _insert_price(self, product: Product, price: int):
+        """
+        Adds a product to the price index. Callers must hold the price lock.
+
+        :param product: The product
+        :param price: The price in cents to index it under
+        """
+        key = (price, product.name)
+        index = bisect_left(self._price_keys, key)
+        if index < len(self._price_keys) and self._price_keys[index] == key:
+            return  # Already indexed by a rebuild that saw the new price
+        self._price_keys.insert(index, key)
+        self._price_order.insert(index, product)
+
+    def _remove_price(self, product: Product, price: int):
+        """
+        Removes a product from the price index. Callers must hold the price lock.
+
+        Only the entry of this product at this price is removed; if there is
+        none, the index is left as it is.
+
+        :param product: The product
+        :param price: The price in cents it is indexed under
+        """
+        key = (price, product.name)
+        index = bisect_left(self._price_keys, key)
+        if (index == len(self._price_keys) or self._price_keys[index] != key
+                or self._price_order[index] is not product):
+            return
+        del self._price_keys[index]
+        del self._price_order[index]
+
+    def _rebuild_price_index(self):
+        """Sorts every product into the price index from scratch."""
+        prices, names = self._table.prices, self._table.names
+        products = self._catalog.products()
+        with self._price_lock:  # Prices read here are current for every observer still waiting
+            keys = [(prices[product._row], names[product._row]) for product in products]
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            self._price_keys = [keys[index] for index in order]
+            self._price_order = [products[index] for index in order]
+
+    def _place(self, products: Sequence[Product]):
+        """
+        Gives products the next positions in catalog order, for listings.
+
+        :param products: The products, in the order they join the catalog
+        """
+        with self._tracking_lock:
+            for product in products:
+                self._positions[product] = self._next_position
+                self._next_position += 1
+
+    def _track(self, product: Product, old_quantity: int, old_active: bool):
+        """
+        Updates the available set and the running total for one product.
+
+        :param product: The product to re-evaluate
+        :param old_quantity: The quantity previously counted for the product
+        :param old_active: Whether the product was previously counted as active
         """
-        self._products.remove(product)
+        with self._tracking_lock:
+            if old_active:
+                self._total_quantity -= old_quantity
+            if product.is_active:
+                self._total_quantity += product.quantity
+                if product.quantity > 0 or isinstance(product, NonStockedProduct):
+                    self._available[product] = None
+                    return
+            self._available.pop(product, None)
+
+    def get(self, name: str) -> Optional[Product]:
+        """
+        Looks up a product by name.
+
+        :param name: The product name
+        :return: The product or None if the store has no product with that name
+        """
+        self._ensure_loaded()
+        return self._catalog.get(name)
+
+    def get_by_sku(self, sku: str) -> Optional[Product]:
+        """
+        Looks up a product by SKU.
+
+        :param sku: The product SKU
+        :return: The product or None if the store has no product with that SKU
+        """
+        self._ensure_loaded()
+        return self._catalog.get_by_sku(sku)
+
+    def __contains__(self, item: Union[Product, str]) -> bool:
+        """
+        Checks whether a product (or a product name) is in the store.
+
+        :param item: A product or a product name
+        :return: True if the store holds the product
+        """
+        self._ensure_loaded()
+        if isinstance(item, Product):
+            return self._catalog.get(item.name) is item
+        return item in self._catalog
+
+    def __len__(self) -> int:
+        """Return the number of products in the store."""
+        return len(self._table)
+
+    def products_in_price_range(self, low: float, high: float) -> List[Product]:
+        """
+        Returns the products priced between two bounds, cheapest first.
+
+        :param low: The lowest price included
+        :param high: The highest price included
+        :return: Every product in the store with low <= price <= high
+        """
+        self._ensure_loaded()
+        with self._price_lock:
+            start = bisect_left(self._price_keys, (to_cents(low),))
+            end = bisect_left(self._price_keys, (to_cents(high) + 1,))
+            return self._price_order[start:end]
+
+    def cheapest(self, count: int) -> List[Product]:
+        """
+        Returns the cheapest products, cheapest first.
+
+        :param count: How many products to return
+        :return: Up to ``count`` products
+        """
+        self._ensure_loaded()
+        with self._price_lock:
+            return self._price_order[:max(count, 0)]
+
+    def most_expensive(self, count: int) -> List[Product]:
+        """
+        Returns the most expensive products, most expensive first.
+
+        :param count: How many products to return
+        :return: Up to ``count`` products
+        """
+        self._ensure_loaded()
+        with self._price_lock:
+            return self._price_order[:-max(count, 0) - 1:-1] if count > 0 else []
 
     def get_total_quantity(self) -> int:
         """
@@ -53,40 +483,295 @@ class Store:
 
         :return: Total quantity of all active products
         """
-        return sum(product.quantity for product in self._products if product.is_active)
+        return self._total_quantity
 
     def get_all_products(self) -> List[Product]:
         """
-        Returns all active products in the store.
+        Returns all active products in the store, in catalog order.
+
+        Products keep their place when they sell out and come back, so the
+        menu numbering stays stable. Only the available products are sorted,
+        and they are nearly in order already, so the sort is close to linear.
 
         :return: List of active products with quantity > 0 or non-stocked products
         """
-        return [product for product in self._products 
-                if product.is_active and 
-                (product.quantity > 0 or isinstance(product, NonStockedProduct))]
+        self._ensure_loaded()
+        with self._tracking_lock:
+            return sorted(self._available, key=self._positions.__getitem__)
+
+    def listing_pages(self, page_size: int = 100) -> Iterator[str]:
+        """
+        Renders the available products as numbered lines, one page of text at a time.
+
+        Numbering runs across pages in the order of ``get_all_products``, and
+        each product's cached display string is reused.
+
+        :param page_size: Number of products per page
+        :return: An iterator over the pages
+        :raises ValueError: If the page size is not positive
+        """
+        if page_size <= 0:
+            raise ValueError("Page size must be greater than zero.")
+        products = self.get_all_products()
+        for start in range(0, len(products), page_size):
+            yield self._listing_page(products, start, page_size)
+
+    def write_listing(self, output: TextIO, page: Optional[int] = None,
+                      page_size: int = 100) -> int:
+        """
+        Writes the numbered product listing to a text stream, one write per page.
 
-    def order(self, shopping_list: List[Tuple[Product, int]]) -> float:
+        :param output: The stream, e.g. ``sys.stdout``
+        :param page: The 1-based page to write, or None for every page
+        :param page_size: Number of products per page
+        :return: The number of products written
+        :raises ValueError: If the page or page size is not positive
+        """
+        if page is not None and page < 1:
+            raise ValueError("Page number must be at least 1.")
+        if page_size <= 0:
+            raise ValueError("Page size must be greater than zero.")
+        products = self.get_all_products()
+        if page is None:
+            starts = range(0, len(products), page_size)
+        else:
+            start = (page - 1) * page_size
+            starts = [start] if start < len(products) else []
+        written = 0
+        for start in starts:
+            output.write(self._listing_page(products, start, page_size))
+            written += len(products[start:start + page_size])
+        return written
+
+    @staticmethod
+    def _listing_page(products: List[Product], start: int, page_size: int) -> str:
+        """
+        Renders one page of the numbered listing.
+
+        :param products: Every listed product
+        :param start: Index of the page's first product
+        :param page_size: Number of products per page
+        :return: The page's lines
+        """
+        return "".join([f"{number}. {product}\n" for number, product
+                        in enumerate(products[start:start + page_size], start + 1)])
+
+    def order(self, shopping_list: List[Tuple[Product, int]],
+              idempotency_key: Optional[str] = None) -> float:
         """
         Processes an order, purchasing multiple products at once.
 
         This method consolidates quantities for the same product and then
-        processes the order by calling the buy method on each product.
+        processes the order atomically: the locks of every product in the
+        order are taken, every line is validated, and only then is stock
+        removed. If any line is rejected, no stock changes at all. Committed
+        orders are recorded in the journal, if there is one, before the
+        locks are released; with a synchronous journal the order returns
+        only once its entry is on disk.
+
+        Retries of an order should pass the same idempotency key: once an
+        order with the key has been placed, repeating it returns the
+        original total without buying anything again.
 
         :param shopping_list: A list of tuples [(Product, quantity)]
+        :param idempotency_key: Optional key identifying the order across retries
         :return: Total price of the order
+        :raises ValueError: If any line of the order cannot be fulfilled, or the
+                            key was already used for a different order
+        """
+        consolidated_list = self._consolidate(shopping_list)
+        self._reservations.expire()
+        if idempotency_key is None:
+            return from_cents(sum(self._purchase_lines(consolidated_list)))
+        fingerprint = frozenset((product.name, quantity)
+                                for product, quantity in consolidated_list.items())
+        return self._idempotency.execute(
+            idempotency_key, fingerprint,
+            lambda: from_cents(sum(self._purchase_lines(consolidated_list))))
+
+    @property
+    def idempotency(self) -> IdempotencyCache:
+        """
+        Get the cache of idempotency keys of placed orders.
+
+        :return: The cache
+        """
+        return self._idempotency
+
+    def _purchase_lines(self, consolidated_list: Dict[Product, int]) -> List[int]:
+        """
+        Atomically buys every line of a consolidated order.
+
+        Expired reservations are not dropped here: expiring takes the locks
+        of other products, so callers expire them before taking any product
+        lock, keeping every caller's locks in ascending stripe order.
+
+        :param consolidated_list: Mapping of each product to its total quantity
+        :return: The price of each line in cents, in the order of ``consolidated_list``
+        :raises ValueError: If any line cannot be fulfilled; nothing is bought then.
+                            Also if the journal fails before the order is on disk
+        """
+        journal, sequence = self._journal, None
+        with locked(consolidated_list):
+            for product, quantity in consolidated_list.items():
+                product._check_purchase(quantity)
+            if journal is not None:  # Recorded first so a failed journal rejects the order
+                sequence = journal.record([(product.name, quantity)
+                                           for product, quantity in consolidated_list.items()])
+            if self._rules is None:
+                line_prices = [product._purchase(quantity)
+                               for product, quantity in consolidated_list.items()]
+            else:
+                line_prices = self._rules.price_lines(consolidated_list)
+                for product, quantity in consolidated_list.items():
+                    product._take_stock(quantity)
+        if sequence is not None and journal.synchronous:
+            journal.wait_durable(sequence)  # Outside the locks, so one fsync covers many orders
+        return line_prices
+
+    def quote(self, shopping_list: List[Tuple[Product, int]]) -> float:
+        """
+        Prices an order without placing it.
+
+        Lines are consolidated and validated exactly like ``order``, but no
+        stock is removed and no product locks are taken, so quotes can run
+        alongside real orders at any rate.
+
+        :param shopping_list: A list of tuples [(Product, quantity)]
+        :return: Total price the order would cost
+        :raises ValueError: If any line of the order could not be fulfilled right now
+        """
+        self._reservations.expire()
+        consolidated_list = self._consolidate(shopping_list)
+        for product, quantity in consolidated_list.items():
+            product._check_purchase(quantity)
+        if self._rules is None:
+            line_prices = [product._price_for(quantity)
+                           for product, quantity in consolidated_list.items()]
+        else:
+            line_prices = self._rules.price_lines(consolidated_list)
+        return from_cents(sum(line_prices))
+
+    def order_many(self, orders: Sequence[List[Tuple[Product, int]]]
+                   ) -> Tuple[List[Optional[float]], Dict[int, ValueError]]:
+        """
+        Processes a batch of orders as if each were passed to ``order`` in turn.
+
+        Orders are validated one after another against the stock left by the
+        orders before them, exactly like the sequential path. Accepted lines
+        are then priced per product in one batch call to the promotion (or
+        order by order through the store's rules, if it has any), and each
+        product's stock is decremented once for the whole batch.
+
+        :param orders: The orders to process, each a list of tuples [(Product, quantity)]
+        :return: The total of each order (None if it was rejected) and the
+                 error of each rejected order, keyed by its position in ``orders``
+        """
+        self._reservations.expire()
+        consolidated_orders = [self._consolidate(shopping_list) for shopping_list in orders]
+        totals: List[Optional[float]] = [None] * len(consolidated_orders)
+        failures: Dict[int, ValueError] = {}
+        involved = {product for lines in consolidated_orders for product in lines}
+        journal, sequence = self._journal, None
+
+        with locked(involved):
+            # Validate in order, tracking the stock promised to accepted orders
+            claimed: Dict[Product, int] = {}
+            batches: Dict[Product, List[int]] = {}  # Accepted quantities per product
+            positions: Dict[Product, List[Tuple[int, int]]] = {}  # (order, line) of each
+            line_prices: Dict[int, List[float]] = {}
+            for index, lines in enumerate(consolidated_orders):
+                try:
+                    for product, quantity in lines.items():
+                        product._check_purchase(quantity, claimed.get(product, 0))
+                except ValueError as error:
+                    failures[index] = error
+                    continue
+                for line, (product, quantity) in enumerate(lines.items()):
+                    claimed[product] = claimed.get(product, 0) + quantity
+                    batches.setdefault(product, []).append(quantity)
+                    positions.setdefault(product, []).append((index, line))
+                if self._rules is None:
+                    line_prices[index] = [0] * len(lines)
+                else:
+                    line_prices[index] = self._rules.price_lines(lines)
+
+            if journal is not None:  # Recorded first so a failed journal rejects the batch
+                for index in line_prices:
+                    sequence = journal.record([(product.name, quantity) for product, quantity
+                                               in consolidated_orders[index].items()])
+
+            # Price every product's lines at once and take its stock in one step
+            for product, quantities in batches.items():
+                if self._rules is None:
+                    for (index, line), price in zip(positions[product],
+                                                    product._price_for_batch(quantities)):
+                        line_prices[index][line] = price
+                product._take_stock(claimed[product])
+
+        if sequence is not None and journal.synchronous:
+            journal.wait_durable(sequence)
+        for index, prices in line_prices.items():
+            totals[index] = from_cents(sum(prices))
+        return totals, failures
+
+    def reserve(self, product: Product, quantity: int, ttl: float) -> int:
+        """
+        Holds stock for a limited time, e.g. while it sits in a cart.
+
+        Held stock cannot be bought by orders until the hold is committed,
+        released, or expires after ``ttl`` seconds.
+
+        :param product: The product to hold
+        :param quantity: The quantity to hold
+        :param ttl: Seconds until the hold expires
+        :return: The hold id
+        :raises ValueError: If the product is not in the store, the quantity
+                            could not be bought right now, or the TTL is not positive
+        """
+        self._ensure_loaded()
+        if self._catalog.get(product.name) is not product:
+            raise ValueError(f"Product '{product.name}' is not in the store.")
+        self._reservations.expire()
+        return self._reservations.reserve(product, quantity, ttl)
+
+    def commit(self, hold_id: int) -> float:
+        """
+        Buys the stock of a hold, as an order of that product and quantity.
+
+        The hold ends even if the purchase is rejected.
+
+        :param hold_id: The hold id returned by ``reserve``
+        :return: Total price of the purchase
+        :raises ValueError: If the hold does not exist or has expired, or the purchase is rejected
         """
-        total_price = 0
+        self._reservations.expire()
+        product = self._reservations.product_of(hold_id)
+        with product._lock:  # Nothing may buy the released stock before this order does
+            _, quantity = self._reservations.take(hold_id)
+            return from_cents(self._purchase_lines({product: quantity})[0])
 
-        # Consolidate quantities for the same product
+    def release(self, hold_id: int):
+        """
+        Ends a hold, making its stock available again.
+
+        :param hold_id: The hold id returned by ``reserve``
+        :raises ValueError: If the hold does not exist or has expired
+        """
+        self._reservations.take(hold_id)
+
+    @staticmethod
+    def _consolidate(shopping_list: List[Tuple[Product, int]]) -> Dict[Product, int]:
+        """
+        Merges the quantities of repeated products in a shopping list.
+
+        :param shopping_list: A list of tuples [(Product, quantity)]
+        :return: Mapping of each product to its total quantity, in first-seen order
+        """
         consolidated_list = {}
         for product, quantity in shopping_list:
             if product in consolidated_list:
                 consolidated_list[product] += quantity
             else:
                 consolidated_list[product] = quantity
-
-        # Process the consolidated order
-        for product, quantity in consolidated_list.items():
-            total_price += product.buy(quantity)
-
-        return total_price
+        return consolidated_list
@@ -0,0 +1,21 @@
+import copy
+from benchmarks import compare, run
+
+
+def test_benchmark_run_and_baseline_comparison():
+    """Test that a small benchmark run reports every scenario and flags regressions."""
+    current = run(sizes=[50], ops=20, threads=2)
+    names = set(current["results"])
+    assert {"store.order[50]", "store.get_all_products[50]", "store.get_total_quantity[50]",
+            "promotion.PercentDiscount", "promotion.SecondHalfPrice",
+            "promotion.ThirdOneFree", "order_pricing.promotions[50lines]",
+            "order_pricing.rules[50lines]", "catalog_import.per_object[50]",
+            "money.cents[50lines]", "money.float[50lines]",
+            "catalog_import.bulk[50]", "catalog.add_remove[50]",
+            "catalog.lookup[50x2threads]", "mixed[50x2threads]"} == names
+    assert all(result["ops_per_sec"] > 0 for result in current["results"].values())
+
+    faster_baseline = copy.deepcopy(current)
+    faster_baseline["results"]["store.order[50]"]["ops_per_sec"] *= 2
+    regressions = compare(current, faster_baseline, tolerance=0.1)
+    assert len(regressions) == 1 and regressions[0].startswith("store.order[50]")
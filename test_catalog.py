@@ -0,0 +1,61 @@
+import threading
+
+from catalog import CHUNK_SIZE, CatalogVersion
+from products import Product
+from store import Store
+
+
+def test_versions_are_immutable_and_share_structure():
+    """Test that writes build new versions, leaving older ones and untouched parts as they were."""
+    products = [Product(f"Product {index}", 10, 1, sku=f"SKU-{index}")
+                for index in range(3 * CHUNK_SIZE)]
+    first = CatalogVersion.build(products)
+    extra = Product("Extra", 5, 1, sku="SKU-EXTRA")
+    second = first.with_products([extra])
+    third = second.without_product(products[0])
+
+    assert (len(first), len(second), len(third)) == (3 * CHUNK_SIZE, 3 * CHUNK_SIZE + 1, 3 * CHUNK_SIZE)
+    assert first.get("Extra") is None and second.get_by_sku("SKU-EXTRA") is extra
+    assert "Product 0" in second and "Product 0" not in third
+    assert list(third) == products[1:] + [extra]
+    assert third._chunks[1] is first._chunks[1]  # Untouched chunks are shared
+    assert (first.number, second.number, third.number) == (0, 1, 2)
+
+    compacted = third
+    for product in products[1:]:
+        compacted = compacted.without_product(product)
+    assert list(compacted) == [extra] and len(compacted._chunks) <= 2
+
+
+def test_readers_see_whole_catalog_versions_while_writers_run():
+    """Test that a store's catalog version never changes under a reader."""
+    store = Store([Product(f"Product {index}", 10, 1) for index in range(100)])
+    expected = [f"Product {index}" for index in range(100)]
+    stop = threading.Event()
+
+    def churn():
+        while not stop.is_set():
+            product = Product("Churn", 1, 1)
+            store.add_product(product)
+            store.remove_product(product)
+
+    writer = threading.Thread(target=churn)
+    writer.start()
+    try:
+        for _ in range(200):
+            catalog = store.catalog
+            names = [product.name for product in catalog]
+            assert len(names) == len(catalog) and names[:100] == expected
+    finally:
+        stop.set()
+        writer.join()
+    assert [product.name for product in store.products] == expected
+
+
+def test_store_is_built_as_one_catalog_version():
+    """Test that constructing a store publishes a single version and sorts its price index once."""
+    products = [Product(f"Product {index}", (index * 37) % 101 + 1, 1) for index in range(1000)]
+    store = Store(products)
+    assert store.catalog.number == 1
+    assert store.catalog.products() == products
+    assert [p.price for p in store.cheapest(1000)] == sorted(p.price for p in products)
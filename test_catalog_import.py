@@ -0,0 +1,82 @@
+import io
+import threading
+import pytest
+from catalog_import import bulk_import, read_csv, read_jsonl
+from products import Product, NonStockedProduct, LimitedProduct, SecondHalfPrice
+from store import Store
+
+
+def test_csv_import_updates_and_adds_products():
+    """Test that a CSV import reprices existing products and adds new ones."""
+    laptop = Product("Laptop", 1000, 10, sku="LAP-001")
+    laptop.promotion = SecondHalfPrice("Second Half price!")
+    phone = Product("Phone", 500, 5)
+    store = Store([laptop, phone])
+    assert laptop.quote(2) == 1500
+
+    columns = read_csv(io.StringIO(
+        "name,price,quantity,sku,kind,maximum\n"
+        "Laptop,800,,,,\n"
+        "Phone,,0,,,\n"
+        "Windows License,125,,WIN-1,non_stocked,\n"
+        "Shipping,10,250,,limited,1\n"))
+    assert bulk_import(store, columns) == {"updated": 2, "added": 2}
+
+    assert laptop.price == 800 and laptop.quantity == 10
+    assert laptop.quote(2) == 1200
+    assert not phone.is_active
+    shipping = store.get("Shipping")
+    assert isinstance(shipping, LimitedProduct) and shipping.maximum == 1
+    assert isinstance(store.get_by_sku("WIN-1"), NonStockedProduct)
+    assert store.get_total_quantity() == 260
+    assert store.cheapest(2) == [shipping, store.get("Windows License")]
+    assert store.order([(shipping, 1), (laptop, 1)]) == 810
+
+
+def test_invalid_import_changes_nothing():
+    """Test that one invalid row rejects the whole import."""
+    laptop = Product("Laptop", 1000, 10, sku="LAP-001")
+    store = Store([laptop])
+    columns = read_jsonl(io.StringIO(
+        '{"name": "Laptop", "price": 900}\n'
+        '{"name": "Phone", "price": -5, "quantity": 3}\n'
+        '{"name": "Tablet", "price": 300, "quantity": 1.5, "sku": "LAP-001"}\n'
+        '{"name": "Cable", "price": 5, "quantity": 9, "kind": "limited"}\n'))
+    with pytest.raises(ValueError) as error:
+        bulk_import(store, columns)
+    message = str(error.value)
+    assert "Row 2" in message and "Row 3" in message and "Row 4" in message
+    assert "Row 1" not in message
+    assert laptop.price == 1000 and len(store) == 1
+
+
+def test_import_cannot_cut_stock_below_reservations():
+    """Test that an import lowering a quantity under the reserved stock is rejected whole."""
+    laptop = Product("Laptop", 1000, 10)
+    store = Store([laptop])
+    hold = store.reserve(laptop, 8, ttl=60)
+    columns = read_jsonl(io.StringIO('{"name": "Laptop", "price": 900, "quantity": 2}\n'))
+    with pytest.raises(ValueError, match="reserved"):
+        bulk_import(store, columns)
+    assert (laptop.price, laptop.quantity, laptop.available) == (1000, 10, 2)
+    bulk_import(store, read_jsonl(io.StringIO('{"name": "Laptop", "quantity": 8}\n')))
+    assert store.commit(hold) == 8000
+    assert (laptop.quantity, laptop.is_active) == (0, False)
+
+
+def test_orders_never_see_a_partial_import():
+    """Test that an order racing an import is priced entirely before or after it."""
+    products = [Product(f"Product {index}", 10, 10 ** 6) for index in range(200)]
+    store = Store(products)
+    columns = {"name": [product.name for product in products], "price": [20.0] * 200}
+    totals = []
+
+    def order():
+        for _ in range(50):
+            totals.append(store.order([(products[0], 1), (products[-1], 1)]))
+
+    thread = threading.Thread(target=order)
+    thread.start()
+    bulk_import(store, columns)
+    thread.join()
+    assert set(totals) <= {20, 40}
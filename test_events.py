@@ -0,0 +1,53 @@
+from events import DEACTIVATED, LOW_STOCK, STOCK_CHANGED, EventBus
+from products import Product
+from store import Store
+
+
+def test_orders_publish_stock_events_in_batches():
+    """Test that selling out publishes stock, low-stock and deactivation events to subscribers."""
+    laptop = Product("Laptop", 1000, 10)
+    phone = Product("Phone", 500, 3)
+    bus = EventBus(low_stock_threshold=5, interval=60)  # Only flush() delivers
+    store = Store([laptop, phone], events=bus)
+    everything, replenishment = [], []
+    bus.subscribe(everything.append)
+    bus.subscribe(replenishment.append, kinds=[LOW_STOCK, DEACTIVATED])
+
+    store.order([(laptop, 6), (phone, 1)])
+    store.order([(phone, 2)])
+    assert not phone.is_active
+    assert store.get_all_products() == [laptop]
+    assert everything == []  # Orders only enqueue
+
+    assert bus.flush(timeout=5)
+    assert everything == [[
+        (STOCK_CHANGED, laptop, 4, 10), (LOW_STOCK, laptop, 4, 10),
+        (STOCK_CHANGED, phone, 2, 3),
+        (STOCK_CHANGED, phone, 0, 2), (DEACTIVATED, phone, 0, 2),
+    ]]
+    assert replenishment == [[(LOW_STOCK, laptop, 4, 10), (DEACTIVATED, phone, 0, 2)]]
+    bus.close()
+
+
+def test_failing_subscriber_does_not_stop_delivery():
+    """Test that a subscriber raising an exception is counted and others still get events."""
+    product = Product("Cable", 10, 100)
+    bus = EventBus(interval=0.01)
+    product.subscribe(bus)
+    received = []
+
+    def broken(events):
+        raise RuntimeError("Subscriber failure")
+
+    bus.subscribe(broken)
+    bus.subscribe(received.extend)
+    product.buy(1)
+    assert bus.flush(timeout=5)
+    assert received == [(STOCK_CHANGED, product, 99, 100)] and bus.errors == 1
+
+    bus.unsubscribe(broken)
+    product.quantity = 0
+    bus.close()
+    assert received[1:] == [(STOCK_CHANGED, product, 0, 99), (LOW_STOCK, product, 0, 99),
+                            (DEACTIVATED, product, 0, 99)]
+    assert bus.errors == 1
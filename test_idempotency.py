@@ -0,0 +1,132 @@
+import threading
+import time
+import pytest
+from idempotency import IdempotencyCache, MAX_KEY_LENGTH
+from products import Product
+from store import Store
+
+
+def test_retried_order_returns_first_total_without_buying_again():
+    """Test that repeating a keyed order replays its total and rejects reuse for other orders."""
+    laptop = Product("Laptop", 1000, 10)
+    phone = Product("Phone", 500, 10)
+    store = Store([laptop, phone])
+
+    assert store.order([(laptop, 2), (phone, 1)], idempotency_key="cart-1") == 2500
+    assert store.order([(phone, 1), (laptop, 1), (laptop, 1)], idempotency_key="cart-1") == 2500
+    assert (laptop.quantity, phone.quantity) == (8, 9)
+    assert store.idempotency.hits == 1
+
+    with pytest.raises(ValueError):
+        store.order([(laptop, 3)], idempotency_key="cart-1")
+    assert laptop.quantity == 8
+
+    assert store.order([(laptop, 2)]) == 2000
+    assert store.order([(laptop, 2)]) == 2000
+    assert laptop.quantity == 4
+
+
+def test_rejected_orders_are_not_remembered():
+    """Test that a key whose order failed can be retried once stock allows it."""
+    laptop = Product("Laptop", 1000, 1)
+    store = Store([laptop])
+    with pytest.raises(ValueError):
+        store.order([(laptop, 2)], idempotency_key="cart-2")
+    assert len(store.idempotency) == 0
+
+    laptop.quantity = 5
+    assert store.order([(laptop, 2)], idempotency_key="cart-2") == 2000
+    assert laptop.quantity == 3
+
+    for key in ("", "k" * (MAX_KEY_LENGTH + 1), 42):
+        with pytest.raises(ValueError):
+            store.order([(laptop, 1)], idempotency_key=key)
+    assert laptop.quantity == 3
+
+
+def test_keys_expire_and_the_cache_stays_bounded(clock):
+    """Test that keys are forgotten after the TTL and the oldest are evicted when full."""
+    cache = IdempotencyCache(ttl=60, maxsize=100, clock=clock)
+    calls = []
+
+    def operation():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.execute("a", 1, operation) == 1
+    clock.now += 30
+    assert cache.execute("a", 1, operation) == 1
+    clock.now += 31
+    assert cache.execute("a", 1, operation) == 2
+
+    for index in range(10_000):
+        cache.execute(f"churn-{index}", index, operation)
+        assert len(cache) <= 100
+    assert cache.evictions == 10_000 + 1 - 100
+    assert cache.execute("churn-9999", 9999, operation) == len(calls)
+
+    clock.now += 61
+    cache.execute("b", 1, operation)
+    assert len(cache) == 1
+
+    with pytest.raises(ValueError):
+        IdempotencyCache(ttl=0)
+    with pytest.raises(ValueError):
+        IdempotencyCache(maxsize=0)
+
+
+def test_concurrent_attempts_run_the_order_once():
+    """Test that attempts racing with the same key wait for the one in flight."""
+    cache = IdempotencyCache()
+    calls = []
+    results = []
+
+    def operation():
+        calls.append(1)
+        time.sleep(0.05)
+        return "placed"
+
+    def attempt():
+        results.append(cache.execute("cart-3", ("Laptop", 1), operation))
+
+    threads = [threading.Thread(target=attempt) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ["placed"] * 8
+    assert cache.hits == 7
+
+
+def test_running_attempts_are_not_evicted():
+    """Test that a full cache keeps the key of an attempt in flight so its retry waits."""
+    cache = IdempotencyCache(maxsize=1)
+    calls = []
+    started = threading.Event()
+    proceed = threading.Event()
+
+    def slow_order():
+        calls.append("k")
+        started.set()
+        proceed.wait(5)
+        return "first"
+
+    first = threading.Thread(target=lambda: cache.execute("k", 1, slow_order))
+    first.start()
+    started.wait(5)
+    assert cache.execute("j", 1, lambda: calls.append("j") or "other") == "other"
+    assert len(cache) == 2
+
+    results = []
+    retry = threading.Thread(target=lambda: results.append(
+        cache.execute("k", 1, lambda: calls.append("k") or "second")))
+    retry.start()
+    proceed.set()
+    first.join()
+    retry.join()
+    assert results == ["first"]
+    assert calls == ["k", "j"]
+
+    cache.execute("i", 1, lambda: "third")
+    assert len(cache) == 1
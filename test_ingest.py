@@ -0,0 +1,51 @@
+import pytest
+
+from ingest import parse_order, replay_file, replay_orders
+from products import Product, LimitedProduct
+from store import Store
+
+
+def test_replay_orders_yields_a_record_per_order():
+    """Test that replayed orders are placed in log order and rejected lines are reported."""
+    laptop = Product("Laptop", 1000, 3, sku="LAP-001")
+    shipping = LimitedProduct("Shipping", 10, 100, maximum=1)
+    store = Store([laptop, shipping])
+    log = [
+        '[["Laptop", 2], ["Shipping", 1]]\n',
+        'not json\n',
+        '\n',
+        '[["LAP-001", 2]]\n',
+        '[["Tablet", 1]]\n',
+        '[["LAP-001", 1]]\n',
+    ]
+
+    records = list(replay_orders(store, iter(log), chunk_size=2))
+
+    assert records == [
+        {"line": 1, "ok": True, "total": 2010},
+        {"line": 2, "ok": False, "error": "Malformed JSON."},
+        {"line": 4, "ok": False, "error": "Not enough stock available."},
+        {"line": 5, "ok": False, "error": "Unknown product 'Tablet'."},
+        {"line": 6, "ok": True, "total": 1000},
+    ]
+    assert laptop.quantity == 0
+
+
+def test_replay_file_reads_lazily(tmp_path):
+    """Test that a log file is replayed as a generator."""
+    store = Store([Product("Laptop", 1000, 10_000)])
+    path = tmp_path / "orders.jsonl"
+    path.write_text('[["Laptop", 1]]\n' * 5000)
+
+    results = replay_file(store, str(path), chunk_size=100)
+    assert next(results) == {"line": 1, "ok": True, "total": 1000}
+    assert store.get("Laptop").quantity == 9900  # Only the first chunk has been placed
+    assert sum(1 for _ in results) == 4999
+
+
+@pytest.mark.parametrize("line", ['[["Laptop", true]]', '[["Laptop", false]]', '[["Laptop", 1.5]]'])
+def test_parse_order_rejects_non_integer_quantities(line):
+    """Test that booleans and fractions are not accepted as quantities."""
+    store = Store([Product("Laptop", 1000, 3)])
+    with pytest.raises(ValueError, match="Each item must be a"):
+        parse_order(store, line)
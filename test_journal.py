@@ -0,0 +1,109 @@
+import threading
+import pytest
+import journal
+from journal import OrderJournal, read_entries, recover
+from store import Store
+
+
+def test_journal_replay_rebuilds_stock(make_catalog, tmp_path):
+    """Test that replaying the journal onto a fresh catalog restores stock."""
+    path = str(tmp_path / "orders.journal")
+    store = Store(make_catalog())
+    store.journal = OrderJournal(path, max_delay=0.001)
+    laptop, _, license_key, shipping = store.products
+    store.order([(laptop, 2), (license_key, 3), (shipping, 1)])
+    store.order_many([[(laptop, 5)], [(shipping, 2)], [(laptop, 1), (shipping, 1)]])
+    sequence = store.journal.last_sequence
+    assert store.journal.wait_durable(sequence, timeout=5)
+    store.journal.close()
+
+    recovered = recover(path, store=Store(make_catalog()))
+    assert recovered.get("Laptop").quantity == 42
+    assert recovered.get("Shipping").quantity == 98
+    assert recovered.journal.last_sequence == sequence
+    recovered.journal.close()
+
+
+def test_recovery_replays_only_orders_newer_than_the_snapshot(make_catalog, tmp_path):
+    """Test that a snapshot plus the journal tail gives the latest state, including after a torn write."""
+    journal_path = str(tmp_path / "orders.journal")
+    snapshot_path = str(tmp_path / "store.snap")
+    store = Store(make_catalog())
+    store.journal = OrderJournal(journal_path)
+    laptop = store.get("Laptop")
+    store.order([(laptop, 10)])
+    store.save(snapshot_path)
+    store.order([(laptop, 5)])
+    store.journal.close()
+    with open(journal_path, "ab") as journal_file:
+        journal_file.write(b'{"seq": 3, "lines": [["Lap')  # Crash mid-write
+
+    recovered = recover(journal_path, snapshot_path=snapshot_path)
+    assert recovered.get("Laptop").quantity == 35
+    recovered.order([(recovered.get("Laptop"), 1)])
+    recovered.journal.close()
+    assert [entry["seq"] for entry in read_entries(journal_path)] == [1, 2, 3]
+
+
+def test_write_failures_reach_callers_and_reject_orders(make_catalog, tmp_path, monkeypatch):
+    """Test that a failed fsync is raised to waiters and later orders change no stock."""
+    store = Store(make_catalog())
+    store.journal = OrderJournal(str(tmp_path / "orders.journal"), max_delay=0.001)
+    laptop = store.get("Laptop")
+
+    def failing_fsync(descriptor):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(journal.os, "fsync", failing_fsync)
+    with pytest.raises(ValueError, match="disk full"):
+        store.order([(laptop, 1)])  # Bought, but never reported as placed
+    with pytest.raises(ValueError, match="disk full"):
+        store.journal.wait_durable(store.journal.last_sequence, timeout=5)
+    with pytest.raises(ValueError, match="disk full"):
+        store.order([(laptop, 2)])
+    assert laptop.quantity == 49
+    store.journal.close()
+
+
+def test_replay_rejects_entries_the_stock_cannot_cover(make_catalog, tmp_path):
+    """Test that replaying onto a catalog with too little stock fails instead of going negative."""
+    path = str(tmp_path / "orders.journal")
+    with open(path, "w", encoding="utf-8") as journal_file:
+        journal_file.write('{"seq": 1, "lines": [["Laptop", 30]]}\n')
+        journal_file.write('{"seq": 2, "lines": [["Shipping", 1], ["Laptop", 30]]}\n')
+    store = Store(make_catalog())
+    with pytest.raises(ValueError, match="Journal entry 2 cannot be replayed"):
+        journal.replay(store, path)
+    assert store.get("Laptop").quantity == 20
+    assert store.get("Shipping").quantity == 100
+
+
+def test_orders_return_once_their_group_is_on_disk(make_catalog, tmp_path):
+    """Test that a synchronous journal makes concurrent orders durable before they return."""
+    store = Store(make_catalog())
+    store.journal = OrderJournal(str(tmp_path / "orders.journal"), max_delay=0.01)
+    laptop, mouse = store.get("Laptop"), store.get("Mouse")
+    durable_on_return = []
+
+    def client(product):
+        for _ in range(5):
+            store.order([(product, 1)])
+            durable_on_return.append(store.journal.durable_sequence)
+
+    threads = [threading.Thread(target=client, args=(product,)) for product in (laptop, mouse)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(durable_on_return) == 10 and min(durable_on_return) >= 1
+    assert store.journal.durable_sequence == store.journal.last_sequence == 10
+    store.order_many([[(laptop, 1)], [(mouse, 1)]])
+    assert store.journal.durable_sequence == 12
+    store.journal.close()
+
+    asynchronous = OrderJournal(str(tmp_path / "async.journal"), max_delay=60, synchronous=False)
+    store.journal = asynchronous
+    store.order([(laptop, 1)])
+    assert asynchronous.durable_sequence == 0
+    asynchronous.close()
+    assert [entry["seq"] for entry in read_entries(str(tmp_path / "async.journal"))] == [1]
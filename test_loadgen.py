@@ -0,0 +1,57 @@
+import io
+from collections import Counter
+
+from ingest import replay_orders
+from benchmarks import build_products
+from loadgen import generate_orders, run_load, write_order_log
+from products import LimitedProduct, NonStockedProduct, Product
+from store import Store
+
+
+def _names(orders):
+    """Return the orders as (product name, quantity) pairs."""
+    return [[(product.name, quantity) for product, quantity in order] for order in orders]
+
+
+def test_generated_load_is_reproducible_and_skewed():
+    """Test that a seed fixes the catalog and orders and that popularity follows Zipf."""
+    products = build_products(100, seed=7)
+    assert {type(product) for product in products} == {Product, NonStockedProduct, LimitedProduct}
+    assert len({type(product.promotion) for product in products}) == 4
+
+    orders = generate_orders(products, 2000, seed=7, zipf_exponent=1.2, basket_mean=3)
+    again = generate_orders(build_products(100, seed=7), 2000, seed=7,
+                            zipf_exponent=1.2, basket_mean=3)
+    assert _names(orders) == _names(again)
+    assert 2.5 < sum(len(order) for order in orders) / len(orders) < 3.5
+
+    popularity = Counter(product.name for order in orders for product, _ in order).most_common()
+    assert popularity[0][1] > 10 * popularity[len(popularity) // 2][1]
+
+
+def test_run_load_reports_throughput_latency_and_rejections():
+    """Test that closed- and open-loop runs account for every order."""
+    store = Store(build_products(20, stock=5))
+    orders = generate_orders(store.products, 300, zipf_exponent=1.5)
+    report = run_load(store, orders, concurrency=3)
+    assert report["mode"] == "closed" and report["orders"] == 300
+    assert report["accepted"] + report["rejected"] == 300 and report["rejected"] > 0
+    assert sum(report["rejections"].values()) == report["rejected"]
+    assert report["throughput"] > 0 and 0 < report["p50_us"] <= report["p99_us"] <= report["max_us"]
+
+    store = Store(build_products(20, stock=1000))
+    report = run_load(store, generate_orders(store.products, 50), concurrency=2, rate=5000)
+    assert report["mode"] == "open" and report["accepted"] == 50
+
+
+def test_orders_can_be_replayed_from_a_log():
+    """Test that written order logs replay against a fresh catalog with the same outcome."""
+    store = Store(build_products(30, stock=10))
+    orders = generate_orders(store.products, 100)
+    log = io.StringIO()
+    write_order_log(orders, log)
+    report = run_load(store, orders)
+
+    replayed = list(replay_orders(Store(build_products(30, stock=10)),
+                                  io.StringIO(log.getvalue())))
+    assert sum(not record["ok"] for record in replayed) == report["rejected"]
@@ -0,0 +1,75 @@
+import io
+import os
+import subprocess
+import sys
+import time
+
+import main
+
+STARTUP_BUDGET = 1.0  # Seconds a one-off command may add to bare interpreter startup; generous for slow CI
+HERE = os.path.dirname(os.path.abspath(__file__))
+UNNEEDED_BY_CLI = {"snapshot", "journal", "ingest", "service", "sharding", "metrics",
+                   "events", "rules", "catalog_import", "asyncio", "json"}
+
+
+def _fastest_run(arguments, runs=3):
+    """Return the fastest wall-clock time of running the Python interpreter with arguments."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *arguments], check=True, capture_output=True, cwd=HERE)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def _loaded_modules(probe, watched):
+    """Run Python code in a fresh interpreter and return the watched modules it loaded."""
+    script = f"import sys; {probe}; print(sorted(name for name in sys.modules if name in {watched!r}))"
+    result = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True,
+                            text=True, cwd=HERE)
+    return result.stdout.splitlines()[-1]
+
+
+def test_import_is_lazy():
+    """Test that importing main loads no store code and builds no catalog."""
+    watched = {"products", "store", "argparse"} | UNNEEDED_BY_CLI
+    assert _loaded_modules("import main", watched) == "[]"
+    assert main.best_buy is main.best_buy
+    assert main.best_buy.get("Shipping") is not None
+
+
+def test_one_off_commands_load_only_what_they_use():
+    """Test that a one-off command imports the store but none of the optional subsystems."""
+    assert _loaded_modules("import main; main.main(['total'])", UNNEEDED_BY_CLI) == "[]"
+    assert _loaded_modules("import main; main.main(['list'])", {"store"}) == "['store']"
+
+
+def test_cli_startup_stays_within_budget():
+    """Test that a one-off command adds little to the interpreter's own startup time."""
+    bare = _fastest_run(["-c", "pass"])
+    total = _fastest_run(["main.py", "total"])
+    assert total - bare < STARTUP_BUDGET
+
+
+def test_subcommands(capsys, monkeypatch, tmp_path):
+    """Test the list, total and order subcommands, with items and from standard input."""
+    assert main.main(["total"]) == 0
+    assert capsys.readouterr().out == "1850\n"
+
+    assert main.main(["list"]) == 0
+    assert capsys.readouterr().out.splitlines()[4] == \
+        "5. Shipping, Price: $10, Limited to 1 per order!, Promotion: None"
+
+    assert main.main(["order", "MacBook Air M2=2", "Shipping=1"]) == 0
+    assert capsys.readouterr().out == "2185.00\n"
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO('[["Shipping", 1]]\n\n[["Shipping", 2]]\n'))
+    assert main.main(["order"]) == 1
+    output = capsys.readouterr()
+    assert output.out == "10.00\n" and output.err.startswith("Line 3: Order failed:")
+
+    snapshot = str(tmp_path / "store.snap")
+    main.build_store().save(snapshot)
+    assert main.main(["--snapshot", snapshot, "order", "Google Pixel 7=50"]) == 0
+    assert main.main(["--snapshot", snapshot, "total"]) == 0
+    assert capsys.readouterr().out == "25000.00\n1800\n"
@@ -0,0 +1,81 @@
+import threading
+import time
+import pytest
+from metrics import Metrics, SamplingProfiler
+from products import Product, LimitedProduct, PercentDiscount
+from store import Store
+
+
+def test_metrics_record_operations_by_class_and_restore_methods():
+    """Test that enabled metrics time each operation per class and disabling unwraps them."""
+    originals = (Store.order, Product._take_stock, PercentDiscount.apply_promotion_cents)
+    metrics = Metrics()
+    laptop = Product("Laptop", 1000, 10)
+    laptop.promotion = PercentDiscount("10% off!", 10)
+    cable = LimitedProduct("Cable", 5, 10, maximum=1)
+    store = Store([laptop, cable])
+
+    metrics.enable()
+    try:
+        assert metrics.enabled
+        store.order([(laptop, 3)])
+        cable.buy(1)
+        with pytest.raises(ValueError):
+            store.order([(cable, 2)])
+        laptop.buy(7)
+    finally:
+        metrics.disable()
+    assert (Store.order, Product._take_stock, PercentDiscount.apply_promotion_cents) == originals
+    store.order([(cable, 1)])
+
+    snapshot = metrics.snapshot()
+    assert snapshot["histograms"]["store_order[Store]"]["count"] == 2
+    assert snapshot["histograms"]["product_take_stock[LimitedProduct]"]["count"] == 1
+    assert snapshot["histograms"]["product_take_stock[Product]"]["count"] == 2
+    assert snapshot["histograms"]["promotion_apply[PercentDiscount]"]["count"] >= 1
+    assert snapshot["counters"] == {"store_order_errors[Store]": 1}
+
+    text = metrics.prometheus()
+    assert '# TYPE store_order_seconds histogram' in text
+    assert 'store_order_seconds_count{type="Store"} 2' in text
+    assert 'store_order_errors_total{type="Store"} 1' in text
+    metrics.reset()
+    assert metrics.snapshot()["histograms"] == {}
+
+
+def test_metrics_merge_the_records_of_every_thread():
+    """Test that orders placed from many threads are all counted in the exported metrics."""
+    metrics = Metrics()
+    products = [Product(f"Product {index}", 10, 1000) for index in range(4)]
+    store = Store(products)
+
+    def client(product):
+        for _ in range(50):
+            store.order([(product, 1)])
+
+    metrics.enable()
+    try:
+        threads = [threading.Thread(target=client, args=(product,)) for product in products]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        metrics.disable()
+    histograms = metrics.snapshot()["histograms"]
+    assert histograms["store_order[Store]"]["count"] == 200
+    assert histograms["product_take_stock[Product]"]["count"] == 200
+    assert sum(histograms["store_order[Store]"]["buckets"]) == 200
+
+
+def test_sampling_profiler_sees_busy_functions():
+    """Test that the profiler attributes samples to the function that is running."""
+    def spin():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+
+    with SamplingProfiler(interval=0.001) as profiler:
+        spin()
+    assert any(name.endswith(":spin") for name, _ in profiler.top(5))
+    assert "test_metrics.py:spin" in profiler.collapsed()
@@ -0,0 +1,34 @@
+from decimal import Decimal
+
+from money import from_cents, remaining_fraction, scale, to_cents
+from products import Product, PercentDiscount, SecondHalfPrice
+from store import Store
+
+
+def test_amounts_convert_to_cents_rounding_half_up():
+    """Test that amounts become cents by their decimal value, with halves rounded up."""
+    assert to_cents(1450) == 145000
+    assert to_cents(249.99) == 24999
+    assert to_cents("19.955") == 1996
+    assert to_cents(Decimal("0.004")) == 0
+    assert from_cents(24999) == 249.99
+    assert remaining_fraction(12.5) == (7, 8)
+    assert scale(5, 1, 2) == 3 and scale(4, 1, 2) == 2
+
+
+def test_promotions_round_each_line_to_the_cent():
+    """Test that promotions compute in cents with explicit half-up rounding."""
+    product = Product("Cable", 0.99, 100)
+    product.promotion = SecondHalfPrice("Second Half price!")
+    assert product.quote(2) == 1.49  # 0.99 + 0.495 rounded up
+    product.promotion = PercentDiscount("30% off!", 30)
+    assert product.quote(3) == 2.08  # 2.97 * 0.7 = 2.079
+    assert product.promotion.apply_promotion_batch(product, [1, 3]) == [0.69, 2.08]
+
+
+def test_order_totals_do_not_drift():
+    """Test that totals of many small lines are exact where float sums drift."""
+    products = [Product(f"Sticker {index}", 0.1, 10) for index in range(1000)]
+    store = Store(products)
+    assert sum(product.price for product in products) != 100
+    assert store.order([(product, 1) for product in products]) == 100
@@ -0,0 +1,48 @@
+import threading
+
+from pricing import PricingCache, pricing_cache
+from products import Product, SecondHalfPrice, ThirdOneFree
+
+
+def test_pricing_cache_evicts_least_recently_used():
+    """Test that the cache stays within its bound and keeps recently used prices."""
+    cache = PricingCache(maxsize=2)
+    cache.put("promo", 10.0, 1, 10.0)
+    cache.put("promo", 10.0, 2, 15.0)
+    assert cache.get("promo", 10.0, 1) == 10.0
+    cache.put("promo", 10.0, 3, 25.0)
+
+    assert len(cache) == 2
+    assert cache.get("promo", 10.0, 2) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lookups_do_not_wait_for_writers():
+    """Test that a lookup completes while another thread holds the cache's write lock."""
+    cache = PricingCache()
+    cache.put("promo", 10.0, 2, 15.0)
+    found = []
+    with cache._lock:
+        reader = threading.Thread(target=lambda: found.append(cache.get("promo", 10.0, 2)))
+        reader.start()
+        reader.join(timeout=5)
+    assert found == [15.0]
+
+
+def test_repeated_quotes_hit_the_cache_and_changes_invalidate():
+    """Test that identical purchases reuse cached prices and price changes drop them."""
+    pricing_cache.clear()
+    macbook = Product("MacBook Air M2", price=1450, quantity=100)
+    macbook.promotion = SecondHalfPrice("Second Half price!")
+
+    assert macbook.buy(2) == 2175.0
+    assert macbook.buy(2) == 2175.0
+    assert (pricing_cache.hits, pricing_cache.misses) == (1, 1)
+
+    macbook.price = 1000
+    assert len(pricing_cache) == 0
+    assert macbook.buy(2) == 1500.0
+
+    macbook.promotion = ThirdOneFree("Third One Free!")
+    assert len(pricing_cache) == 0
+    assert macbook.buy(3) == 2000.0
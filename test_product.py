@@ -1,5 +1,6 @@
 import pytest
-from products import Product
+from products import Product, PercentDiscount
+from store import Store
 
 def test_product_creation():
     """Test that creating a normal product works."""
@@ -39,3 +40,38 @@ def test_creating_prod_invalid_details():
 
     with pytest.raises(ValueError):
         Product("MacBook Air M2", -10, 100)  # ✅ Negative price
+
+
+def test_product_is_a_view_over_a_table_row():
+    """Test that product state lives in a columnar table, not in a per-object dict."""
+    product = Product("Laptop", 1000, 10, sku="LAP-001")
+    assert not hasattr(product, "__dict__")
+
+    store = Store([product])
+    table = store._table
+    assert product._table is table
+    table.prices[product._row] = 90000  # Prices are stored in cents
+    assert product.price == 900
+
+    product.buy(4)
+    assert table.quantities[product._row] == 6
+    store.remove_product(product)
+    assert product._table is not table
+    assert (product.name, product.sku, product.price, product.quantity) == ("Laptop", "LAP-001", 900, 6)
+
+
+def test_display_string_is_cached_until_the_product_changes():
+    """Test that str() reuses its cached text and changes to price, stock or promotion refresh it."""
+    product = Product("Laptop", 1000, 10)
+    text = str(product)
+    assert text == "Laptop, Price: $1000, Quantity: 10, Promotion: None"
+    assert str(product) is text
+
+    product.buy(1)
+    assert str(product) == "Laptop, Price: $1000, Quantity: 9, Promotion: None"
+    product.price = 999.5
+    assert str(product) == "Laptop, Price: $999.5, Quantity: 9, Promotion: None"
+    product.promotion = PercentDiscount("10% off!", 10)
+    assert str(product) == "Laptop, Price: $999.5, Quantity: 9, Promotion: 10% off!"
+    product.quantity = 3
+    assert str(product) == "Laptop, Price: $999.5, Quantity: 3, Promotion: 10% off!"
@@ -1,5 +1,5 @@
 import pytest
-from products import Product, SecondHalfPrice, ThirdOneFree, PercentDiscount
+from products import Product, Promotion, SecondHalfPrice, ThirdOneFree, PercentDiscount
 from store import Store
 
 
@@ -65,3 +65,23 @@ def test_percent_discount_promotion():
     total_price = store.order(shopping_list)
 
     assert total_price == 1400.0  # 2000 * 0.7
+
+
+def test_promotions_overriding_only_apply_promotion_still_work():
+    """Test that a promotion written against the float API prices orders and batches in cents."""
+    class TenOff(Promotion):
+        def apply_promotion(self, product, quantity):
+            return product.price * quantity - 10
+
+    laptop = Product("Laptop", 99.99, 10)
+    laptop.promotion = TenOff("$10 off")
+    store = Store([laptop])
+    assert store.order([(laptop, 2)]) == 189.98
+    assert store.order_many([[(laptop, 1)], [(laptop, 3)]])[0] == [89.99, 289.97]
+
+    class Unfinished(Promotion):
+        pass
+
+    for abstract in (Promotion, Unfinished):
+        with pytest.raises(TypeError):
+            abstract("Broken")
@@ -0,0 +1,105 @@
+import pytest
+import products
+from products import Product
+from reservations import Reservations
+from store import Store
+
+
+def test_holds_exclude_stock_until_committed_or_released():
+    """Test that held stock cannot be ordered and commit/release end the hold."""
+    laptop = Product("Laptop", 1000, 10)
+    store = Store([laptop])
+
+    hold = store.reserve(laptop, 8, ttl=60)
+    assert (laptop.quantity, laptop.held, laptop.available) == (10, 8, 2)
+    with pytest.raises(ValueError):
+        store.order([(laptop, 3)])
+    with pytest.raises(ValueError):
+        store.reserve(laptop, 3, ttl=60)
+
+    assert store.commit(hold) == 8000
+    assert (laptop.quantity, laptop.held) == (2, 0)
+    with pytest.raises(ValueError):
+        store.commit(hold)
+
+    hold = store.reserve(laptop, 2, ttl=60)
+    store.release(hold)
+    assert store.order([(laptop, 2)]) == 2000
+    with pytest.raises(ValueError):
+        store.reserve(Product("Phone", 500, 5), 1, ttl=60)
+
+
+def test_expired_holds_return_their_stock(clock):
+    """Test that holds lapse after their TTL once the store next advances the wheel."""
+    laptop = Product("Laptop", 1000, 10)
+    store = Store([laptop])
+    store._reservations = Reservations(tick=1, slots=8, clock=clock)
+    hold = store.reserve(laptop, 10, ttl=5)
+    clock.now += 4
+    with pytest.raises(ValueError):
+        store.order([(laptop, 1)])
+    clock.now += 2
+
+    assert store.order([(laptop, 10)]) == 10000
+    with pytest.raises(ValueError):
+        store.commit(hold)
+
+
+def test_timer_wheel_expires_only_due_holds_across_rounds(clock):
+    """Test that the wheel expires holds at their tick, including ones longer than a turn."""
+    reservations = Reservations(tick=1, slots=8, clock=clock)
+    product = Product("Laptop", 1000, 100)
+    short = reservations.reserve(product, 1, ttl=3)
+    long = reservations.reserve(product, 2, ttl=20)
+    released = reservations.reserve(product, 4, ttl=3)
+    reservations.take(released)
+    assert product.held == 3
+
+    clock.now += 2
+    assert reservations.expire() == 0
+    clock.now += 2
+    assert reservations.expire() == 1
+    assert product.held == 2
+    with pytest.raises(ValueError):
+        reservations.take(short)
+
+    clock.now += 10  # A full turn of the wheel passes over the long hold
+    assert reservations.expire() == 0
+    clock.now += 100
+    assert reservations.expire() == 1
+    assert product.held == 0 and len(reservations) == 0
+    with pytest.raises(ValueError):
+        reservations.take(long)
+
+
+def test_quantity_cannot_drop_below_held_stock():
+    """Test that restocking down to less than the reserved quantity is rejected."""
+    laptop = Product("Laptop", 1000, 10)
+    store = Store([laptop])
+    hold = store.reserve(laptop, 6, ttl=60)
+    with pytest.raises(ValueError):
+        laptop.quantity = 5
+    assert (laptop.quantity, laptop.available) == (10, 4)
+    laptop.quantity = 6
+    assert laptop.available == 0
+    assert store.commit(hold) == 6000
+    assert (laptop.quantity, laptop.is_active) == (0, False)
+
+
+def test_expiry_never_runs_under_a_product_lock(clock, monkeypatch):
+    """Test that commit and order drop expired holds before taking any lock, so they cannot deadlock."""
+    laptop, phone = Product("Laptop", 1000, 10), Product("Phone", 500, 10)
+    store = Store([laptop, phone])
+    store._reservations = Reservations(tick=1, slots=8, clock=clock)
+    expire = store._reservations.expire
+
+    def checked_expire():
+        assert not any(lock._is_owned() for lock in products._locks)
+        return expire()
+
+    monkeypatch.setattr(store._reservations, "expire", checked_expire)
+    store.reserve(phone, 2, ttl=1)
+    hold = store.reserve(laptop, 3, ttl=60)
+    clock.now += 5
+    assert store.commit(hold) == 3000
+    assert store.order([(laptop, 1), (phone, 10)]) == 6000
@@ -0,0 +1,65 @@
+import pytest
+from products import PercentDiscount
+from rules import compile_rules
+from store import Store
+
+
+def test_line_rules_stack_by_priority(make_catalog):
+    """Test percent, buy-X-get-Y and tiered rules, stacking and exclusivity."""
+    laptop, mouse, license_key, _ = make_catalog()
+    rules = compile_rules([
+        {"type": "percent", "products": ["Laptop"], "percent": 10},
+        {"type": "buy_x_get_y", "products": ["Mouse"], "buy": 2, "free": 1, "priority": 1},
+        {"type": "tiered", "products": ["Mouse"], "tiers": [[10, 50], [3, 10]]},
+        {"type": "percent", "products": ["Windows License"], "percent": 50,
+         "exclusive": True, "priority": 5},
+        {"type": "percent", "products": ["Windows License"], "percent": 90},
+    ])
+    store = Store([laptop, mouse, license_key], rules=rules)
+
+    assert store.quote([(laptop, 2)]) == pytest.approx(1800)
+    assert store.quote([(mouse, 2)]) == pytest.approx(40)
+    assert store.quote([(mouse, 3)]) == pytest.approx(2 * 20 * 0.9)
+    assert store.quote([(mouse, 12)]) == pytest.approx(8 * 20 * 0.5)
+    assert store.quote([(license_key, 1)]) == pytest.approx(50)
+
+
+def test_bundles_price_across_lines(make_catalog):
+    """Test that complete bundles are priced as a set and leftovers by line rules."""
+    laptop, mouse, license_key, _ = make_catalog()
+    laptop.promotion = PercentDiscount("30% off!", 30)
+    rules = compile_rules([
+        {"type": "bundle", "items": {"Laptop": 1, "Mouse": 2}, "price": 990},
+        {"type": "percent", "products": ["Mouse"], "percent": 50},
+    ])
+    store = Store([laptop, mouse, license_key], rules=rules)
+
+    line_prices = rules.price_lines({laptop: 2, mouse: 3, license_key: 1})
+    assert sum(line_prices[:2]) == (990 + 700 + 10) * 100  # Line prices are in cents
+    assert line_prices[2] == 10000
+
+    assert store.order([(laptop, 1), (mouse, 2)]) == pytest.approx(990)
+    assert (laptop.quantity, mouse.quantity) == (49, 98)
+    totals, failures = store.order_many([[(laptop, 1), (mouse, 2)], [(mouse, 1000)]])
+    assert totals[0] == pytest.approx(990) and list(failures) == [1]
+
+
+def test_rules_without_products_apply_to_everything(make_catalog):
+    """Test that a global rule covers every product, stacked with specific ones."""
+    laptop, mouse, license_key, _ = make_catalog()
+    rules = compile_rules([
+        {"type": "percent", "percent": 10},
+        {"type": "percent", "products": ["Laptop"], "percent": 50},
+    ])
+    line_prices = rules.price_lines({laptop: 1, mouse: 1})
+    assert line_prices == [45000, 1800]
+
+
+def test_malformed_rules_are_rejected():
+    """Test that invalid definitions invoke an exception when compiled."""
+    for definition in ({"type": "percent", "percent": 120},
+                       {"type": "buy_x_get_y", "buy": 2},
+                       {"type": "bundle", "items": {}, "price": 10},
+                       {"type": "mystery"}):
+        with pytest.raises(ValueError):
+            compile_rules([definition])
@@ -0,0 +1,63 @@
+import asyncio
+import json
+from products import Product, NonStockedProduct
+from service import StoreService
+from store import Store
+
+
+async def _request(reader, writer, request):
+    """Send one request over a session and return the decoded response."""
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+def test_service_serves_concurrent_sessions(tmp_path):
+    """Test that many sessions can list, count and order at the same time."""
+    laptop = Product("Laptop", 1000, 40)
+    phone = Product("Phone", 500, 1000)
+    store = Store([laptop, phone, NonStockedProduct("Windows License", 125)])
+    path = str(tmp_path / "store.sock")
+
+    async def client():
+        reader, writer = await asyncio.open_unix_connection(path)
+        responses = [await _request(reader, writer, {"op": "order", "items": [["Laptop", 1], ["Phone", 2]]})
+                     for _ in range(3)]
+        writer.close()
+        return responses
+
+    async def scenario():
+        service = StoreService(store, max_pending=4, workers=4)
+        server = await service.serve_unix(path)
+        results = await asyncio.gather(*(client() for _ in range(20)))
+
+        reader, writer = await asyncio.open_unix_connection(path)
+        listing = await _request(reader, writer, {"op": "list"})
+        total = await _request(reader, writer, {"op": "total"})
+        unknown = await _request(reader, writer, {"op": "order", "items": [["Tablet", 1]]})
+        malformed = [await _request(reader, writer, {"op": "order", "items": items})
+                     for items in ([[["Phone"], 1]], [["Phone", True]], [["Phone", "1"]])]
+        keyed = [await _request(reader, writer, {"op": "order", "items": [["Phone", 1]], "key": "retry-1"})
+                 for _ in range(2)]
+        writer.close()
+
+        server.close()
+        await server.wait_closed()
+        await service.stop()
+        locks_left = len(service._product_locks)
+        responses = [r for session in results for r in session]
+        return responses, listing, total, unknown, keyed, malformed, locks_left
+
+    responses, listing, total, unknown, keyed, malformed, locks_left = asyncio.run(scenario())
+
+    accepted = [r for r in responses if r["ok"]]
+    assert len(accepted) == 40
+    assert all(r["total"] == 2000 for r in accepted)
+    assert all(r["error"] == "Not enough stock available." for r in responses if not r["ok"])
+    assert laptop.quantity == 0 and phone.quantity == 919
+    assert [p["name"] for p in listing["products"]] == ["Phone", "Windows License"]
+    assert total["total"] == 920
+    assert unknown == {"ok": False, "error": "Unknown product 'Tablet'."}
+    assert keyed == [{"ok": True, "total": 500}] * 2
+    assert malformed == [{"ok": False, "error": "Each item must be a [product name, quantity] pair."}] * 3
+    assert locks_left == 0
@@ -0,0 +1,55 @@
+import pytest
+from products import Product
+from sharding import ShardedStore, shard_of
+from store import Store
+
+
+def test_sharded_store_matches_store(make_catalog):
+    """Test that single- and cross-shard orders behave exactly like a single Store."""
+    names = [f"Product {index}" for index in range(12)]
+    assert len({shard_of(name, 3) for name in names}) == 3
+    orders = [
+        [("Product 0", 3), ("Product 1", 4), ("Product 0", 1)],
+        [("Product 2", 1), ("Shipping", 1)],
+        [("Product 3", 60)],
+        [("Product 4", 10), ("Shipping", 2)],
+        [("Product 6", 50), ("Shipping", 2)],  # Sells Product 6 out on one shard, then aborts
+        [(name, 2) for name in names],
+    ]
+    local = Store(make_catalog(12))
+
+    with ShardedStore(make_catalog(12), shards=3) as sharded:
+        for order in orders:
+            try:
+                expected = local.order([(local.get(name), quantity) for name, quantity in order])
+            except ValueError as error:
+                with pytest.raises(ValueError, match=str(error)):
+                    sharded.order(order)
+            else:
+                assert sharded.order(order) == expected
+
+        assert sharded.get_total_quantity() == local.get_total_quantity()
+        assert sorted(str(p) for p in sharded.get_all_products()) == \
+            sorted(str(p) for p in local.get_all_products())
+
+        sharded.add_product(Product("Tablet", 300, 5))
+        assert sharded.order([("Tablet", 5), ("Product 5", 1)]) == \
+            pytest.approx(1500 + local.quote([(local.get("Product 5"), 1)]))
+        sharded.remove_product("Product 5")
+        with pytest.raises(ValueError):
+            sharded.order([("Product 5", 1)])
+        assert sharded.get_total_quantity() == local.get_total_quantity() - local.get("Product 5").quantity
+
+
+def test_shards_survive_malformed_requests(make_catalog):
+    """Test that a shard answers any failing request with its error and keeps serving."""
+    with ShardedStore(make_catalog(12), shards=2) as sharded:
+        total = sharded.get_total_quantity()
+        with pytest.raises(TypeError):
+            sharded._call(0, "order", None)
+        with pytest.raises(ValueError):
+            sharded._call(1)
+        with pytest.raises(KeyError):
+            sharded._call(0, "commit", 12345)
+        assert sharded.order([("Product 0", 1), ("Product 1", 1), ("Shipping", 1)]) > 0
+        assert sharded.get_total_quantity() == total - 3
@@ -0,0 +1,71 @@
+import sys
+import pytest
+from products import (
+    Product, NonStockedProduct, LimitedProduct,
+    PercentDiscount, Promotion, SecondHalfPrice
+)
+from snapshot import PeriodicSnapshot, _resolve_class, read_header
+from store import Store
+
+
+def _describe(store):
+    """Summarize a store's catalog as comparable tuples."""
+    return sorted((type(p).__name__, p.name, p.sku, p.price, p.quantity, p.is_active,
+                   str(p.promotion), str(p)) for p in store.products)
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Test that a loaded snapshot reproduces every product, status and promotion."""
+    second_half_price = SecondHalfPrice("Second Half price!")
+    products = [
+        Product("MacBook Air M2", price=1450, quantity=100, sku="MBA-M2"),
+        Product("Google Pixel 7", price=499.99, quantity=250),
+        NonStockedProduct("Windows License", price=125),
+        LimitedProduct("Shipping", price=10, quantity=1000, maximum=1),
+        Product("Sold Out", price=5, quantity=0),
+    ]
+    products[0].promotion = second_half_price
+    products[2].promotion = PercentDiscount("30% off!", 30)
+    store = Store(products)
+    store.order([(products[0], 2), (products[3], 1)])
+    store.remove_product(products[1])
+    path = str(tmp_path / "store.snap")
+
+    store.save(path)
+    loaded = Store.load(path)
+
+    assert loaded.get_total_quantity() == store.get_total_quantity()
+    assert _describe(loaded) == _describe(store)
+    assert loaded.get_by_sku("MBA-M2").promotion.name == "Second Half price!"
+    assert [p.name for p in loaded.get_all_products()] == [p.name for p in store.get_all_products()]
+    assert read_header(path)["rows"] == 5  # Includes the row freed by the removal
+
+
+def test_loaded_store_is_fully_usable(tmp_path):
+    """Test that a loaded store takes orders and new products, leaving the file untouched."""
+    path = str(tmp_path / "store.snap")
+    Store([Product("Laptop", 1000, 10), LimitedProduct("Shipping", 10, 100, maximum=1)]).save(path)
+
+    loaded = Store.load(path)
+    laptop, shipping = loaded.get("Laptop"), loaded.get("Shipping")
+    assert loaded.order([(laptop, 3), (shipping, 1)]) == 3010
+    loaded.add_product(Product("Phone", 500, 5))
+    assert loaded.get_total_quantity() == 7 + 99 + 5
+    assert Store.load(path).get("Laptop").quantity == 10
+
+    snapshotter = PeriodicSnapshot(loaded, path, interval=60)
+    snapshotter.start()
+    snapshotter.stop()
+    assert Store.load(path).get_total_quantity() == 111
+
+
+def test_snapshot_classes_are_never_imported_from_the_file(tmp_path, monkeypatch):
+    """Test that class paths in a snapshot only resolve to product and promotion classes already loaded."""
+    (tmp_path / "planted.py").write_text("class Product:\n    pass\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for path, base in (("planted.Product", Product), ("os.system", Product),
+                       ("products.Product", Promotion)):
+        with pytest.raises(ValueError):
+            _resolve_class(path, base)
+    assert "planted" not in sys.modules
+    assert _resolve_class("products.LimitedProduct", Product) is LimitedProduct
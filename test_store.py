@@ -0,0 +1,265 @@
+import io
+import sys
+import threading
+import pytest
+from products import (
+    Product, NonStockedProduct, LimitedProduct,
+    PercentDiscount, SecondHalfPrice, ThirdOneFree
+)
+from store import Store
+
+
+def test_store_lookup_by_name_and_sku():
+    """Test that products can be found by name and SKU."""
+    laptop = Product("Laptop", 1000, 10, sku="LAP-001")
+    license_key = NonStockedProduct("Windows License", 125)
+    store = Store([laptop, license_key])
+
+    assert store.get("Laptop") is laptop
+    assert store.get_by_sku("LAP-001") is laptop
+    assert store.get("Phone") is None
+    assert "Laptop" in store
+    assert license_key in store
+    assert len(store) == 2
+
+
+def test_store_remove_product_updates_index():
+    """Test that removing a product drops it from every index."""
+    laptop = Product("Laptop", 1000, 10, sku="LAP-001")
+    store = Store([laptop])
+
+    store.remove_product(laptop)
+    assert laptop not in store
+    assert store.get_by_sku("LAP-001") is None
+    with pytest.raises(ValueError):
+        store.remove_product(laptop)
+
+
+def test_store_rejects_duplicate_names():
+    """Test that adding two products with the same name invokes an exception."""
+    store = Store([Product("Laptop", 1000, 10)])
+    with pytest.raises(ValueError):
+        store.add_product(Product("Laptop", 900, 5))
+
+    phone, tablet = Product("Phone", 500, 5), Product("Tablet", 300, 5)
+    with pytest.raises(ValueError):
+        Store([phone, tablet, Product("Phone", 400, 1)])
+    assert Store([phone, tablet]).get_total_quantity() == 10
+
+
+def test_store_tracks_stock_changes():
+    """Test that the available list and total quantity follow product changes."""
+    laptop = Product("Laptop", 1000, 10)
+    phone = Product("Phone", 500, 5)
+    license_key = NonStockedProduct("Windows License", 125)
+    store = Store([laptop, phone, license_key])
+    assert store.get_total_quantity() == 15
+
+    store.order([(laptop, 4)])
+    assert store.get_total_quantity() == 11
+
+    phone.quantity = 0
+    assert store.get_all_products() == [laptop, license_key]
+    assert store.get_total_quantity() == 6
+
+    laptop.deactivate()
+    assert store.get_all_products() == [license_key]
+    assert store.get_total_quantity() == 0
+
+    laptop.activate()
+    store.remove_product(laptop)
+    assert store.get_total_quantity() == 0
+    laptop.quantity = 50  # No longer tracked by the store
+    assert store.get_total_quantity() == 0
+
+
+def test_order_is_all_or_nothing():
+    """Test that a rejected line leaves the rest of the order untouched."""
+    laptop = Product("Laptop", 1000, 10)
+    shipping = LimitedProduct("Shipping", 10, 100, maximum=1)
+    store = Store([laptop, shipping])
+
+    with pytest.raises(ValueError):
+        store.order([(laptop, 2), (shipping, 2)])
+    assert laptop.quantity == 10
+    assert shipping.quantity == 100
+
+    license_key = NonStockedProduct("Windows License", 125)
+    store.add_product(license_key)
+    for bad_line in ((shipping, 0.5), (license_key, 1.5)):
+        with pytest.raises(ValueError):
+            store.order([(laptop, 1), bad_line])
+    with pytest.raises(ValueError):
+        laptop.quantity = 2.5
+    assert (laptop.quantity, shipping.quantity) == (10, 100)
+
+
+def test_concurrent_orders_never_oversell():
+    """Test that orders from many threads never sell more than the stock."""
+    laptop = Product("Laptop", 1000, 100)
+    phone = Product("Phone", 500, 100)
+    store = Store([laptop, phone])
+    sold = []
+
+    def buyer():
+        for _ in range(50):
+            try:
+                store.order([(phone, 1), (laptop, 1)])
+                sold.append(1)
+            except ValueError:
+                pass
+
+    threads = [threading.Thread(target=buyer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(sold) == 100
+    assert laptop.quantity == 0 and phone.quantity == 0
+    assert store.get_total_quantity() == 0
+
+
+def _promotion_catalog():
+    """Build a small catalog covering every promotion type."""
+    macbook = Product("MacBook Air M2", price=1450.5, quantity=20)
+    macbook.promotion = SecondHalfPrice("Second Half price!")
+    earbuds = Product("Bose QuietComfort Earbuds", price=249.99, quantity=30)
+    earbuds.promotion = ThirdOneFree("Third One Free!")
+    license_key = NonStockedProduct("Windows License", price=125.1)
+    license_key.promotion = PercentDiscount("30% off!", 30)
+    shipping = LimitedProduct("Shipping", price=10, quantity=1000, maximum=1)
+    return [macbook, earbuds, license_key, shipping]
+
+
+def test_order_many_matches_sequential_orders():
+    """Test that batch ordering gives the same totals, failures and stock as ordering one by one."""
+    plan = [[(0, 3), (1, 4), (0, 2)], [(2, 7), (3, 1)], [(3, 2)], [(0, 16)],
+            [(1, 26), (2, 1)], [(0, 15), (1, 1)], [(1, 1), (3, 1)]]
+
+    sequential_products = _promotion_catalog()
+    sequential_store = Store(sequential_products)
+    expected = []
+    for lines in plan:
+        try:
+            expected.append(sequential_store.order([(sequential_products[i], q) for i, q in lines]))
+        except ValueError:
+            expected.append(None)
+
+    batch_products = _promotion_catalog()
+    batch_store = Store(batch_products)
+    totals, failures = batch_store.order_many(
+        [[(batch_products[i], q) for i, q in lines] for lines in plan])
+
+    assert totals == expected
+    assert sorted(failures) == [2, 3, 5, 6]
+    assert [p.quantity for p in batch_products] == [p.quantity for p in sequential_products]
+    assert batch_store.get_total_quantity() == sequential_store.get_total_quantity()
+
+
+def test_quote_prices_without_touching_stock():
+    """Test that quoting an order gives the order's price and leaves stock alone."""
+    macbook, earbuds, license_key, shipping = _promotion_catalog()
+    store = Store([macbook, earbuds, license_key, shipping])
+    shopping_list = [(macbook, 1), (earbuds, 3), (macbook, 1), (license_key, 2), (shipping, 1)]
+
+    quoted = store.quote(shopping_list)
+    assert macbook.quantity == 20 and earbuds.quantity == 30
+    assert store.get_total_quantity() == 1050
+    assert earbuds.quote(3) == 2 * 249.99
+    assert earbuds.quantity == 30
+    assert store.order(shopping_list) == quoted
+
+    with pytest.raises(ValueError):
+        store.quote([(shipping, 2)])
+
+
+def test_price_index_follows_catalog_and_price_changes():
+    """Test that price range and top-N queries track additions, removals and repricing."""
+    laptop = Product("Laptop", 1000, 10)
+    phone = Product("Phone", 500, 0)
+    mouse = Product("Mouse", 25, 50)
+    license_key = NonStockedProduct("Windows License", 125)
+    store = Store([laptop, phone, mouse, license_key])
+
+    assert store.cheapest(2) == [mouse, license_key]
+    assert store.most_expensive(2) == [laptop, phone]
+    assert store.products_in_price_range(125, 500) == [license_key, phone]
+    assert store.cheapest(0) == [] and store.most_expensive(0) == []
+
+    phone.price = 20
+    assert store.cheapest(1) == [phone]
+    assert store.products_in_price_range(21, 1000) == [mouse, license_key, laptop]
+
+    store.remove_product(laptop)
+    store.add_product(Product("Monitor", 300, 4))
+    assert [p.name for p in store.most_expensive(10)] == ["Monitor", "Windows License",
+                                                         "Mouse", "Phone"]
+    laptop.price = 5
+    assert laptop not in store.cheapest(10)
+
+
+def test_concurrent_repricing_keeps_the_price_index_consistent():
+    """Test that racing price changes on one product leave it indexed once, at its final price."""
+    products = [Product(f"Product {index}", 100 + index, 10) for index in range(20)]
+    store = Store(products)
+    target = products[10]
+
+    errors = []
+
+    def reprice(offset):
+        try:
+            for step in range(3000):
+                target.price = (offset * 3000 + step) % 997 + 1
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=reprice, args=(offset,)) for offset in range(4)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads often enough for the race to show
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    ordered = store.cheapest(100)
+    assert sorted(ordered, key=lambda p: p.name) == sorted(products, key=lambda p: p.name)
+    assert [p.price for p in ordered] == sorted(p.price for p in products)
+
+
+def test_listing_is_paginated_into_buffered_writes():
+    """Test that the listing numbers products across pages and writes one chunk per page."""
+    products = [Product(f"Product {index}", 10, 1) for index in range(5)]
+    store = Store(products + [Product("Sold out", 10, 0)])
+
+    pages = list(store.listing_pages(page_size=2))
+    assert len(pages) == 3
+    assert pages[1] == (f"3. {products[2]}\n"
+                        f"4. {products[3]}\n")
+
+    output = io.StringIO()
+    assert store.write_listing(output) == 5
+    assert output.getvalue() == "".join(pages)
+    output = io.StringIO()
+    assert store.write_listing(output, page=3, page_size=2) == 1
+    assert output.getvalue() == f"5. {products[4]}\n"
+    assert store.write_listing(io.StringIO(), page=4, page_size=2) == 0
+    with pytest.raises(ValueError):
+        store.write_listing(output, page=0)
+
+
+def test_listing_keeps_catalog_order_when_products_come_back():
+    """Test that a sold-out product returns to its place in the menu when restocked."""
+    a, b, c = Product("A", 10, 1), Product("B", 20, 5), Product("C", 30, 5)
+    store = Store([a, b, c])
+    store.order([(a, 1)])
+    assert [p.name for p in store.get_all_products()] == ["B", "C"]
+    a.quantity = 3
+    a.activate()
+    assert [p.name for p in store.get_all_products()] == ["A", "B", "C"]
+    store.remove_product(a)
+    store.add_product(a)
+    assert [p.name for p in store.get_all_products()] == ["B", "C", "A"]